@@ -0,0 +1,386 @@
+"""Runs the pipelines of the app without Streamlit over many Excel files at once.
+
+Run from the eligibility_app directory:
+    python batch.py update "exports/*.xls" --researchers-list researchers_list.xlsx --output-dir output
+    python batch.py eligibility output/*_researchers_list.xlsx --output-dir output --workers 4
+
+Every file is processed in a separate worker process and written to its own output file. The results of all files
+that succeeded are also combined into one output file. A file that fails is reported and does not stop the batch.
+"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+from menu_eligibility_list_creation import (
+    REQUIRED_COLUMNS,
+    create_eligibility_list,
+    create_eligibility_projection,
+    parse_call_deadlines,
+)
+from menu_hr_researcher_update import (
+    create_researchers_list,
+    translate_hr_columns,
+    validate_hr_and_researchers_lists,
+)
+from seeds.function_names import (
+    function_names_excluded_researchers,
+    function_names_researchers,
+)
+from utils.match_researchers import VALIDATION_MODES
+from utils.partitioned import PARTITION_MODES
+from utils.pipeline_cache import content_hash
+from utils.read_excel_file import RESEARCHERS_HEADER_ROW, read_hr_researchers
+from utils.save_df_as_excel import save_and_format_df_as_excel
+from utils.snapshot_store import read_researchers_list, save_snapshot
+from utils.validate_input import count_invalid_rows, validate_input
+
+EXCEL_EXTENSIONS = (".xls", ".xlsx")
+
+# The column of the combined output with the file every row comes from.
+SOURCE_FILE_COLUMN = "Source file"
+
+# The combined outputs of both pipelines. They are never inputs, so a glob over the output directory does not process
+# every list twice.
+COMBINED_OUTPUTS = {
+    "update": "combined_researchers_list.xlsx",
+    "eligibility": "combined_eligibility_list.xlsx",
+}
+
+
+def find_excel_files(patterns: list) -> list:
+    """Expands the input arguments to the Excel files to process.
+
+    Args:
+        patterns (list): Files, directories (all Excel files directly inside them) or glob patterns.
+
+    Returns:
+        The sorted paths of the Excel files, without duplicates and without the combined outputs.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*"))
+        else:
+            matches = glob.glob(pattern) or [pattern]
+        paths.update(
+            path
+            for path in matches
+            if path.lower().endswith(EXCEL_EXTENSIONS)
+            and os.path.basename(path) not in COMBINED_OUTPUTS.values()
+        )
+    return sorted(paths)
+
+
+def output_path(input_path: str, output_dir: str, suffix: str) -> str:
+    """Returns the path of the output file of an input file, e.g. output/hr_faculty_a_researchers_list.xlsx."""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem}_{suffix}.xlsx")
+
+
+def write_output(df: pd.DataFrame, path: str) -> None:
+    """Writes the dataframe as an Excel file and stores its snapshot, so the file is loaded fast when it is used as
+    input again."""
+    excel_data = save_and_format_df_as_excel(df)
+    with open(path, "wb") as output_file:
+        output_file.write(excel_data)
+    save_snapshot(df, content_hash(excel_data))
+
+
+@lru_cache(maxsize=1)
+def read_previous_researchers_list(path: str) -> pd.DataFrame:
+    """Reads the previous researchers list once per worker process, the dates are checked per HR export."""
+    return read_researchers_list(path, parse_dates=False)
+
+
+def update_hr_export(
+    hr_path: str,
+    researchers_path: str,
+    output_dir: str,
+    incremental: bool,
+    merge_options: dict,
+    skip_invalid_rows: bool,
+    partition_options: dict,
+) -> dict:
+    """Creates the new researchers list of a single HR export and writes it to the output directory. The partition
+    options (workers and partition_mode, see utils.partitioned) split the stages of a large export over processes.
+
+    Returns:
+        The path of the output file, the new researchers list, the number of ambiguous matches and the number of
+        skipped rows with invalid values.
+    """
+    filtered_df, researchers_df, invalid_values = validate_hr_and_researchers_lists(
+        translate_hr_columns(
+            read_hr_researchers(
+                hr_path, function_names_researchers, function_names_excluded_researchers
+            ),
+            parse_dates=False,
+        ),
+        read_previous_researchers_list(researchers_path),
+        skip_invalid_rows=skip_invalid_rows,
+        **partition_options,
+    )
+    merged_df, ambiguous_matches, _ = create_researchers_list(
+        filtered_df,
+        researchers_df,
+        incremental=incremental,
+        workers=partition_options["workers"],
+        **merge_options,
+    )
+
+    path = output_path(hr_path, output_dir, "researchers_list")
+    write_output(merged_df, path)
+    return {
+        "output": path,
+        "result": merged_df,
+        "ambiguous": len(ambiguous_matches),
+        "invalid": count_invalid_rows(invalid_values),
+    }
+
+
+def create_eligibility_file(
+    researchers_path: str,
+    output_dir: str,
+    reference_year: int,
+    skip_invalid_rows: bool,
+    partition_options: dict,
+    projection: dict | None = None,
+) -> dict:
+    """Creates the eligibility list of a single researchers list and writes it to the output directory. With a
+    projection (the arguments of create_eligibility_projection) the projection is written next to it. The partition
+    options (workers and partition_mode, see utils.partitioned) split the stages of a large list over processes.
+
+    Returns:
+        The path of the output file, the eligibility list and the number of skipped rows with invalid values.
+    """
+    researchers_df, invalid_values = validate_input(
+        read_researchers_list(researchers_path, parse_dates=False),
+        header=RESEARCHERS_HEADER_ROW,
+        required_columns=REQUIRED_COLUMNS,
+        skip_invalid_rows=skip_invalid_rows,
+        **partition_options,
+    )
+    eligibility_list_df = create_eligibility_list(
+        researchers_df, reference_year, **partition_options
+    )
+
+    path = output_path(researchers_path, output_dir, "eligibility_list")
+    write_output(eligibility_list_df, path)
+    if projection:
+        write_output(
+            create_eligibility_projection(researchers_df, **projection),
+            output_path(researchers_path, output_dir, "eligibility_projection"),
+        )
+    return {
+        "output": path,
+        "result": eligibility_list_df,
+        "ambiguous": 0,
+        "invalid": count_invalid_rows(invalid_values),
+    }
+
+
+def timed_task(task, path: str, **task_arguments) -> dict:
+    """Runs the task in the worker process and adds its duration in seconds to the result."""
+    start = time.perf_counter()
+    result = task(path, **task_arguments)
+    return {**result, "seconds": time.perf_counter() - start}
+
+
+def run_batch(task, paths: list, workers: int, **task_arguments) -> tuple[dict, dict]:
+    """Runs the task for every file in a process pool and reports the progress.
+
+    Args:
+        task: update_hr_export or create_eligibility_file.
+        paths (list): The input files.
+        workers (int): The number of worker processes.
+        **task_arguments: The other arguments of the task.
+
+    Returns:
+        The results of the files that succeeded and the errors of the files that failed, both by input path.
+    """
+    results, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(timed_task, task, path, **task_arguments): path
+            for path in paths
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                errors[path] = f"{type(e).__name__}: {e}"
+                print(f"[{done}/{len(paths)}] FAILED {path}: {errors[path]}", flush=True)
+                continue
+
+            result = results[path]
+            ambiguous = (
+                f", {result['ambiguous']} ambiguous matches" if result["ambiguous"] else ""
+            )
+            invalid = (
+                f", {result['invalid']} invalid rows skipped" if result["invalid"] else ""
+            )
+            print(
+                f"[{done}/{len(paths)}] {path} -> {result['output']} "
+                f"({len(result['result'])} rows{ambiguous}{invalid}, {result['seconds']:.1f} s)",
+                flush=True,
+            )
+    return results, errors
+
+
+def write_combined_output(results: dict, path: str) -> None:
+    """Writes the results of all files to one Excel file, in the order of the input files, with their source file."""
+    combined_df = pd.concat(
+        [
+            result["result"].assign(**{SOURCE_FILE_COLUMN: os.path.basename(input_path)})
+            for input_path, result in sorted(results.items())
+        ],
+        ignore_index=True,
+    )
+    write_output(combined_df, path)
+    print(f"Combined {len(results)} files ({len(combined_df)} rows) -> {path}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="pipeline", required=True)
+
+    update_parser = subparsers.add_parser(
+        "update", help="Update the researchers list with every HR export."
+    )
+    update_parser.add_argument(
+        "inputs", nargs="+", help="HR exports: files, directories or glob patterns."
+    )
+    update_parser.add_argument(
+        "--researchers-list", required=True, help="The previous researchers list."
+    )
+    update_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only reprocess the employees that were added or changed since the researchers list.",
+    )
+    update_parser.add_argument(
+        "--validate", choices=VALIDATION_MODES, default="one_to_many"
+    )
+    update_parser.add_argument("--include-tussenvoegsel", action="store_true")
+    update_parser.add_argument("--include-birth-date", action="store_true")
+    update_parser.add_argument(
+        "--fuzzy-matching",
+        action="store_true",
+        help="Also link the employees that are not found on their exact name to a researcher with a similar name.",
+    )
+
+    eligibility_parser = subparsers.add_parser(
+        "eligibility", help="Create the eligibility list of every researchers list."
+    )
+    eligibility_parser.add_argument(
+        "inputs", nargs="+", help="Researchers lists: files, directories or glob patterns."
+    )
+    eligibility_parser.add_argument(
+        "--reference-year", type=int, default=datetime.now().year
+    )
+    eligibility_parser.add_argument(
+        "--call-years",
+        nargs=2,
+        type=int,
+        metavar=("FIRST", "LAST"),
+        help="Also write a projection of the eligibility for the calls of these years.",
+    )
+    eligibility_parser.add_argument(
+        "--call-deadline",
+        action="append",
+        default=[],
+        metavar="GRANT=YYYY-MM-DD",
+        help="A known call deadline for the projection, e.g. \"MSCA PF=2025-09-10\". Can be repeated.",
+    )
+    eligibility_parser.add_argument(
+        "--wide",
+        action="store_true",
+        help="Write the projection with a column per scheme and call year instead of a row per call year.",
+    )
+
+    for subparser in (update_parser, eligibility_parser):
+        subparser.add_argument("--output-dir", default="output")
+        subparser.add_argument(
+            "--skip-invalid-rows",
+            action="store_true",
+            help="Continue with the valid rows of a file that has invalid dates, genders or numbers of children.",
+        )
+        subparser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="The number of worker processes."
+        )
+        subparser.add_argument(
+            "--partition-workers",
+            type=int,
+            default=1,
+            help="The number of worker processes per file, that process partitions of a large file. Use with "
+            "--workers 1 to spread a single file over all cores.",
+        )
+        subparser.add_argument(
+            "--partition-by",
+            choices=PARTITION_MODES,
+            default="chunks",
+            help="Partition the rows in chunks of equal size or by faculty. The merge always partitions on the names.",
+        )
+    arguments = parser.parse_args()
+
+    paths = find_excel_files(arguments.inputs)
+    if not paths:
+        parser.error(f"No Excel files found in {arguments.inputs}")
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    print(f"Processing {len(paths)} files with {arguments.workers} workers", flush=True)
+    partition_options = dict(
+        workers=arguments.partition_workers, partition_mode=arguments.partition_by
+    )
+
+    if arguments.pipeline == "update":
+        results, errors = run_batch(
+            update_hr_export,
+            paths,
+            arguments.workers,
+            researchers_path=arguments.researchers_list,
+            output_dir=arguments.output_dir,
+            incremental=arguments.incremental,
+            merge_options=dict(
+                validate=arguments.validate,
+                include_tussenvoegsel=arguments.include_tussenvoegsel,
+                include_birth_date=arguments.include_birth_date,
+                fuzzy_matching=arguments.fuzzy_matching,
+            ),
+            skip_invalid_rows=arguments.skip_invalid_rows,
+            partition_options=partition_options,
+        )
+    else:
+        results, errors = run_batch(
+            create_eligibility_file,
+            paths,
+            arguments.workers,
+            output_dir=arguments.output_dir,
+            reference_year=arguments.reference_year,
+            skip_invalid_rows=arguments.skip_invalid_rows,
+            partition_options=partition_options,
+            projection=arguments.call_years
+            and dict(
+                call_years=range(arguments.call_years[0], arguments.call_years[1] + 1),
+                call_deadlines=parse_call_deadlines(arguments.call_deadline),
+                wide=arguments.wide,
+            ),
+        )
+
+    if results:
+        write_combined_output(
+            results, os.path.join(arguments.output_dir, COMBINED_OUTPUTS[arguments.pipeline])
+        )
+    print(f"{len(results)} files succeeded, {len(errors)} failed")
+    for path, error in sorted(errors.items()):
+        print(f"  {path}: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""Benchmark of the Excel export on generated researchers lists.
+
+Run from the eligibility_app directory:
+    python -m benchmarks.benchmark_excel_export --rows 10000 100000 500000
+"""
+
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+from utils.create_test_dataset import create_researchers_dataset
+from utils.parse_dates import format_date_columns
+from utils.save_df_as_excel import save_and_format_df_as_excel
+
+
+def export_with_pandas(researchers_df: pd.DataFrame) -> bytes:
+    """Reference export with pandas' own to_excel, without the formatting of the app."""
+    excel_buffer = BytesIO()
+    format_date_columns(researchers_df).to_excel(
+        excel_buffer, startrow=1, index=False, engine="xlsxwriter"
+    )
+    return excel_buffer.getvalue()
+
+
+EXPORTS = {
+    "pandas to_excel": export_with_pandas,
+    "in memory": lambda df: save_and_format_df_as_excel(df, constant_memory=False),
+    "constant memory": lambda df: save_and_format_df_as_excel(df, constant_memory=True),
+}
+
+
+def measure_export(export, researchers_df: pd.DataFrame) -> dict:
+    """Measures the wall-clock time and (in a second run) the peak Python memory of an export."""
+    start = time.perf_counter()
+    excel_data = export(researchers_df)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    export(researchers_df)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time (s)": round(seconds, 3),
+        "peak memory (MB)": round(peak_bytes / 1024**2, 1),
+        "file size (MB)": round(len(excel_data) / 1024**2, 1),
+    }
+
+
+def benchmark_excel_export(row_counts: list, exports: list) -> pd.DataFrame:
+    """Measures every export on generated researchers lists of the given sizes.
+
+    Args:
+        row_counts (list): The sizes of the researchers lists to generate.
+        exports (list): The names of the exports to compare, see EXPORTS.
+
+    Returns:
+        A dataframe with the time, peak memory and file size per list size and export.
+    """
+    results = []
+    for num_rows in row_counts:
+        researchers_df = create_researchers_dataset(num_rows)
+        for export in exports:
+            results.append(
+                {
+                    "rows": num_rows,
+                    "export": export,
+                    **measure_export(EXPORTS[export], researchers_df),
+                }
+            )
+            print(results[-1])
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000]
+    )
+    parser.add_argument("--exports", nargs="+", default=list(EXPORTS))
+    arguments = parser.parse_args()
+
+    print(
+        benchmark_excel_export(arguments.rows, arguments.exports).to_string(
+            index=False
+        )
+    )
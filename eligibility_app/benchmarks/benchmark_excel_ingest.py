@@ -0,0 +1,82 @@
+"""Benchmark of the Excel reader engines on generated HR lists.
+
+Run from the eligibility_app directory:
+    python -m benchmarks.benchmark_excel_ingest --rows 10000 100000 500000
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+from utils.create_test_dataset import create_hr_dataset, save_hr_dataset
+from utils.read_excel_file import available_engines, pandas_engine, read_hr_excel
+
+
+def time_call(function, repeat: int) -> float:
+    """Returns the fastest wall-clock time in seconds of calling the function."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_excel_ingest(
+    row_counts: list, engines: list, directory: str, repeat: int
+) -> pd.DataFrame:
+    """Times reading generated HR lists with every engine, with and without the column projection and dtypes.
+
+    Args:
+        row_counts (list): The sizes of the HR lists to generate.
+        engines (list): The reader engines to compare.
+        directory (str): Where the generated HR lists are stored, existing files are reused.
+        repeat (int): The number of times every read is repeated.
+
+    Returns:
+        A dataframe with the read time per HR list size, engine and read mode.
+    """
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    for num_rows in row_counts:
+        path = os.path.join(directory, f"hr_list_{num_rows}.xlsx")
+        if not os.path.exists(path):
+            print(f"Generating {path}")
+            save_hr_dataset(create_hr_dataset(num_rows), path)
+
+        for engine in engines:
+            full_read = time_call(
+                lambda: pd.read_excel(path, header=2, engine=pandas_engine(engine)),
+                repeat,
+            )
+            projected_read = time_call(
+                lambda: read_hr_excel(path, engine=engine), repeat
+            )
+            results.append(
+                {
+                    "rows": num_rows,
+                    "engine": engine,
+                    "full read (s)": round(full_read, 3),
+                    "projected read (s)": round(projected_read, 3),
+                }
+            )
+            print(results[-1])
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000]
+    )
+    parser.add_argument("--engines", nargs="+", default=available_engines())
+    parser.add_argument("--directory", default="benchmark_data")
+    parser.add_argument("--repeat", type=int, default=1)
+    arguments = parser.parse_args()
+
+    print(
+        benchmark_excel_ingest(
+            arguments.rows, arguments.engines, arguments.directory, arguments.repeat
+        ).to_string(index=False)
+    )
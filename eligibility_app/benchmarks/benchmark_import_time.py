@@ -0,0 +1,121 @@
+"""Benchmark of the import time of the app entry point and of the menus.
+
+Run from the eligibility_app directory:
+    python -m benchmarks.benchmark_import_time
+    python -m benchmarks.benchmark_import_time --max-home-page-ms 500
+
+Every target is run in a new interpreter with `python -X importtime`, like the cold start of the app. The report shows
+the time until the target is loaded, which heavy libraries it loads and its slowest imports. With --max-home-page-ms
+the command fails when the home page loads slower, so a menu import that is moved back to the entry point shows up.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+# What is imported and run for every target, the home page is drawn without a Streamlit server.
+TARGETS = {
+    "home page": "import streamlit_app; streamlit_app.eligibility_app()",
+    "update menu": "import menu_hr_researcher_update",
+    "eligibility menu": "import menu_eligibility_list_creation",
+}
+
+# The libraries the home page should not load.
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "xlsxwriter", "openpyxl", "xlrd"]
+
+
+def parse_import_times(stderr: str) -> pd.DataFrame:
+    """Parses the output of `python -X importtime`.
+
+    Returns:
+        A row per imported module with its own and cumulative import time in milliseconds, and its depth (0 for the
+        imports of the target itself).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "own (ms)": int(own) / 1000,
+                "cumulative (ms)": int(cumulative) / 1000,
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            }
+        )
+    return pd.DataFrame(rows, columns=["module", "own (ms)", "cumulative (ms)", "depth"])
+
+
+def measure_target(statement: str, repeat: int) -> tuple[dict, pd.DataFrame]:
+    """Runs the statement in a new interpreter and measures its imports, the fastest of the repeats counts.
+
+    Returns:
+        The wall-clock time of the interpreter (including its start), the total import time and the heavy modules it
+        loaded. And the imports of the fastest run.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append((time.perf_counter() - start, parse_import_times(completed.stderr)))
+    seconds, imports = min(runs, key=lambda run: run[0])
+    loaded = set(imports["module"])
+    return {
+        "wall (ms)": round(seconds * 1000),
+        "imports (ms)": round(imports["own (ms)"].sum()),
+        "heavy modules": ", ".join(module for module in HEAVY_MODULES if module in loaded),
+    }, imports
+
+
+def benchmark_import_time(repeat: int, top: int) -> tuple[pd.DataFrame, dict]:
+    """Measures the imports of every target.
+
+    Args:
+        repeat (int): The number of interpreters started per target.
+        top (int): The number of slowest imports reported per target.
+
+    Returns:
+        A row per target, and the slowest modules the target imports directly by target.
+    """
+    results, slowest = [], {}
+    for target, statement in TARGETS.items():
+        result, imports = measure_target(statement, repeat)
+        results.append({"target": target, **result})
+        slowest[target] = imports[imports["depth"].eq(1)].nlargest(top, "cumulative (ms)")[
+            ["module", "cumulative (ms)"]
+        ]
+    return pd.DataFrame(results), slowest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--max-home-page-ms",
+        type=float,
+        help="Fail when the imports of the home page take longer than this.",
+    )
+    arguments = parser.parse_args()
+
+    results, slowest = benchmark_import_time(arguments.repeat, arguments.top)
+    print(results.to_string(index=False))
+    for target, imports in slowest.items():
+        print(f"\nSlowest imports of the {target}:")
+        print(imports.to_string(index=False))
+
+    home_page_ms = results.set_index("target").loc["home page", "imports (ms)"]
+    if arguments.max_home_page_ms is not None and home_page_ms > arguments.max_home_page_ms:
+        print(
+            f"\nThe imports of the home page take {home_page_ms} ms, more than {arguments.max_home_page_ms} ms"
+        )
+        raise SystemExit(1)
@@ -0,0 +1,258 @@
+"""Benchmark of every stage of the pipelines on generated HR and researchers lists.
+
+Run from the eligibility_app directory:
+    python -m benchmarks.benchmark_pipeline --rows 1000 10000 100000 1000000
+    python -m benchmarks.benchmark_pipeline --compare benchmark_results/old.json benchmark_results/new.json
+
+Every run is saved as a JSON file with the commit it ran on, so runs on different commits can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+from menu_hr_researcher_update import (
+    calculate_phd_date_corrected_for_children,
+    merge_two_df,
+    translate_hr_columns,
+)
+from seeds.function_names import (
+    function_names_excluded_researchers,
+    function_names_researchers,
+)
+from seeds.grant_rules import grant_rules
+from utils.compile_grant_rules import compile_grant_rules
+from utils.create_test_dataset import (
+    create_hr_dataset,
+    create_researchers_dataset,
+    save_hr_dataset,
+)
+from utils.filter_hr_list import filter_out_function_names
+from utils.read_excel_file import (
+    read_hr_excel,
+    read_hr_researchers,
+    read_researchers_excel,
+)
+from utils.save_df_as_excel import save_and_format_df_as_excel
+
+# The eligibility of every grant scheme is measured separately.
+SCHEME_EVALUATORS = {
+    column: compile_grant_rules([rule for rule in grant_rules if rule["column"] == column])
+    for column in dict.fromkeys(rule["column"] for rule in grant_rules)
+}
+
+
+def measure_stage(function, repeat: int) -> tuple[dict, object]:
+    """Measures the fastest wall-clock time and (in a separate run) the peak Python memory of a stage.
+
+    Returns:
+        The measurements and the result of the stage.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time (s)": round(min(timings), 4),
+        "peak memory (MB)": round(peak_bytes / 1024**2, 2),
+    }, result
+
+
+def generate_input_files(num_rows: int, directory: str, dataset_options: dict) -> tuple[str, str]:
+    """Generates the HR list and researchers list Excel files, existing files with the same options are reused."""
+    os.makedirs(directory, exist_ok=True)
+    name = "_".join([str(num_rows)] + [f"{key}={value}" for key, value in sorted(dataset_options.items())])
+    hr_path = os.path.join(directory, f"pipeline_hr_list_{name}.xlsx")
+    researchers_path = os.path.join(directory, f"pipeline_researchers_list_{name}.xlsx")
+
+    if not os.path.exists(hr_path):
+        print(f"Generating {hr_path}")
+        save_hr_dataset(create_hr_dataset(num_rows, **dataset_options), hr_path)
+    if not os.path.exists(researchers_path):
+        print(f"Generating {researchers_path}")
+        with open(researchers_path, "wb") as researchers_file:
+            researchers_file.write(
+                save_and_format_df_as_excel(create_researchers_dataset(num_rows, **dataset_options))
+            )
+    return hr_path, researchers_path
+
+
+def benchmark_pipeline(
+    row_counts: list, directory: str, repeat: int, reference_year: int, dataset_options: dict
+) -> pd.DataFrame:
+    """Measures every stage of the HR update and eligibility pipelines on generated lists of the given sizes.
+
+    Args:
+        row_counts (list): The sizes of the HR and researchers lists to generate.
+        directory (str): Where the generated Excel files are stored.
+        repeat (int): The number of times every stage is timed.
+        reference_year (int): The year the eligibility is calculated for.
+        dataset_options (dict): The options of create_hr_dataset, e.g. the fraction of malformed dates.
+
+    Returns:
+        A dataframe with the time and peak memory per list size and stage.
+    """
+    results = []
+
+    def measure(num_rows: int, stage: str, function):
+        measurements, result = measure_stage(function, repeat)
+        results.append({"rows": num_rows, "stage": stage, **measurements})
+        print(results[-1], flush=True)
+        return result
+
+    for num_rows in row_counts:
+        hr_path, researchers_path = generate_input_files(num_rows, directory, dataset_options)
+
+        # Reading the whole HR list and filtering it afterwards, as the stages of older runs.
+        whole_hr_df = measure(num_rows, "ingest HR list", lambda: read_hr_excel(hr_path))
+        measure(
+            num_rows,
+            "filter_out_function_names",
+            lambda: filter_out_function_names(
+                whole_hr_df, function_names_researchers, function_names_excluded_researchers
+            ),
+        )
+        del whole_hr_df
+
+        # Like the app, only the researchers of the HR list are read.
+        hr_df = measure(
+            num_rows,
+            "ingest HR researchers",
+            lambda: read_hr_researchers(
+                hr_path, function_names_researchers, function_names_excluded_researchers
+            ),
+        )
+        researchers_df = measure(
+            num_rows, "ingest researchers list", lambda: read_researchers_excel(researchers_path)
+        )
+        filtered_df = measure(
+            num_rows, "translate_hr_columns", lambda: translate_hr_columns(hr_df)
+        )
+        merged_df, _ = measure(
+            num_rows, "merge_two_df", lambda: merge_two_df(researchers_df, filtered_df)
+        )
+        merged_df["Children corrected PhD date"] = measure(
+            num_rows,
+            "children correction",
+            lambda: calculate_phd_date_corrected_for_children(merged_df),
+        )
+        for column, evaluate in SCHEME_EVALUATORS.items():
+            measure(
+                num_rows,
+                f"eligibility {column}",
+                lambda: evaluate(merged_df, reference_year=reference_year),
+            )
+        measure(num_rows, "Excel export", lambda: save_and_format_df_as_excel(merged_df))
+
+    return pd.DataFrame(results)
+
+
+def run_metadata(arguments: argparse.Namespace) -> dict:
+    """Describes the commit, environment and settings of a benchmark run."""
+
+    def git(*command) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", *command], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "uncommitted changes": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "repeat": arguments.repeat,
+        "reference year": arguments.reference_year,
+        "dataset options": dataset_options(arguments),
+    }
+
+
+def dataset_options(arguments: argparse.Namespace) -> dict:
+    """Returns the options of create_hr_dataset given on the command line."""
+    return {
+        "researcher_fraction": arguments.researcher_fraction,
+        "missing_date_fraction": arguments.missing_date_fraction,
+        "malformed_date_fraction": arguments.malformed_date_fraction,
+        "duplicate_name_fraction": arguments.duplicate_name_fraction,
+    }
+
+
+def compare_runs(baseline_path: str, candidate_path: str) -> pd.DataFrame:
+    """Compares the stage timings and peak memory of two saved benchmark runs.
+
+    Returns:
+        A dataframe per list size and stage with both measurements and the ratio candidate / baseline.
+    """
+    runs = []
+    for path in (baseline_path, candidate_path):
+        with open(path) as run_file:
+            runs.append(pd.DataFrame(json.load(run_file)["results"]))
+    # Keep the stages in the order they were run in.
+    stages = pd.concat(runs)[["rows", "stage"]].drop_duplicates()
+    comparison = stages.merge(
+        runs[0].merge(
+            runs[1], on=["rows", "stage"], how="outer", suffixes=(" baseline", " candidate")
+        ),
+        on=["rows", "stage"],
+    )
+    for measurement in ("time (s)", "peak memory (MB)"):
+        comparison[f"{measurement} ratio"] = (
+            comparison[f"{measurement} candidate"] / comparison[f"{measurement} baseline"]
+        ).round(2)
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-year", type=int, default=datetime.now().year)
+    parser.add_argument("--researcher-fraction", type=float, default=0.5)
+    parser.add_argument("--missing-date-fraction", type=float, default=0.3)
+    parser.add_argument("--malformed-date-fraction", type=float, default=0.01)
+    parser.add_argument("--duplicate-name-fraction", type=float, default=0.02)
+    parser.add_argument("--directory", default="benchmark_data")
+    parser.add_argument("--results-directory", default="benchmark_results")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="Compare two saved runs."
+    )
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        print(compare_runs(*arguments.compare).to_string(index=False))
+    else:
+        results = benchmark_pipeline(
+            arguments.rows,
+            arguments.directory,
+            arguments.repeat,
+            arguments.reference_year,
+            dataset_options(arguments),
+        )
+        print(results.to_string(index=False))
+
+        metadata = run_metadata(arguments)
+        os.makedirs(arguments.results_directory, exist_ok=True)
+        results_path = os.path.join(
+            arguments.results_directory,
+            f"pipeline_{metadata['date'].replace(':', '')}_{metadata['commit'] or 'unknown'}.json",
+        )
+        with open(results_path, "w") as results_file:
+            json.dump({**metadata, "results": results.to_dict("records")}, results_file, indent=2)
+        print(f"Saved the results to {results_path}")
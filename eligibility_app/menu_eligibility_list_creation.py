@@ -1,255 +1,295 @@
 from datetime import datetime
-import streamlit as st
 
+import numpy as np
 import pandas as pd
+import streamlit as st
+from seeds.grant_rules import grant_rules
+from utils.compile_grant_rules import (
+    compile_grant_projection,
+    compile_grant_rules,
+    grant_rule_columns,
+    grant_rules_version,
+)
+from utils.dtype_schema import compact_dtypes, memory_report
+from utils.partitioned import concat_in_order, partition_positions, run_partitioned
+from utils.pipeline_cache import content_hash
+from utils.preview import show_preview
+from utils.read_excel_file import RESEARCHERS_HEADER_ROW
 from utils.save_df_as_excel import save_and_format_df_as_excel
-
-
-def strip_datetime_str(researcher: pd.Series, phd_column_to_choose) -> datetime | None:
-    """Strips datetime strings of the PhD Defense Date to be the correct format.
+from utils.session_handoff import updated_researchers_list
+from utils.snapshot_store import read_researchers_list, save_snapshot
+from utils.stage_timer import StageTimer
+from utils.validate_input import (
+    InvalidInputError,
+    count_invalid_rows,
+    validate_input,
+)
+
+# Evaluates all grant schemes of the rule table in a single pass.
+evaluate_grant_rules = compile_grant_rules(grant_rules)
+
+# Evaluates all grant schemes for a range of call years in a single pass.
+project_grant_rules = compile_grant_projection(grant_rules)
+
+# The columns of the researchers list the grant rules need.
+REQUIRED_COLUMNS = grant_rule_columns(grant_rules)
+
+# Part of the keys of the persisted results, so changing a rule invalidates them.
+RULES_VERSION = grant_rules_version(grant_rules)
+
+# The columns of the researchers list that identify a researcher in the projection.
+PROJECTION_COLUMNS = [
+    "First Name",
+    "Tussenv.",
+    "Last name",
+    "Initials",
+    "Faculty",
+    "Research Group",
+    "Function",
+]
+
+# The number of years before and after the current year that can be projected in the app.
+PROJECTION_YEARS_BACK = 5
+PROJECTION_YEARS_AHEAD = 15
+
+
+def create_eligibility_list(
+    researchers_df: pd.DataFrame,
+    reference_year: int,
+    workers: int = 1,
+    partition_mode: str = "chunks",
+) -> pd.DataFrame:
+    """Adds the eligibility of every grant scheme to the researchers list.
 
     Args:
-        researcher (pd.Series): the row corresponding with one researcher.
-        phd_column_to_choose (str|datetime): Which column to reference against. Used when children are applicable.
-    """
-    phd_date = researcher[phd_column_to_choose]
-
-    # Convert the PhD date string to a datetime object
-    try:
-        phd_date = datetime.strptime(str(phd_date), "%Y-%m-%d")
-        return phd_date
-    except ValueError as e:
-        st.error(
-            f"There seems to be a problem with converting the PhD defense date of researcher "
-            f"{researcher['First Name']} {researcher['Last name']}"
-            f"original error: {e}"
-        )
-        return None  # Return None if there's an error in date conversion
-
-
-def calculate_nwo_talent_eligibility(researcher: pd.Series) -> str | None:
-    """
-    A function to calculate whether a researcher is eligible for an NWO talent grant.
-    Args:
-        researcher: The row of the researchers dataframe corresponding to a single researcher.
+        researchers_df (pd.DataFrame): The researchers list with typed date columns.
+        reference_year (int): The year the eligibility is calculated for.
+        workers (int): The number of worker processes that calculate partitions of the list, see utils.partitioned.
+        partition_mode (str): How the list is partitioned, see utils.partitioned.PARTITION_MODES.
 
     Returns:
-        The grant the researcher can apply for and until when.
+        The researchers list with a column per grant scheme.
     """
-    if pd.isna(researcher["Children corrected PhD date"]):
-        return None
+    if workers > 1 and len(researchers_df) > 1:
+        results = run_partitioned(
+            create_eligibility_list,
+            (researchers_df,),
+            [
+                (positions,)
+                for positions in partition_positions(researchers_df, workers, partition_mode)
+            ],
+            workers,
+            reference_year=reference_year,
+        )
+        # The partitions have their own categories, which concatenate to object columns.
+        return compact_dtypes(concat_in_order(results, researchers_df.index))
+    return compact_dtypes(
+        researchers_df.assign(
+            **evaluate_grant_rules(researchers_df, reference_year=reference_year)
+        )
+    )
 
-    # Define the reference dates for the grants eligibility check
-    reference_date_veni = datetime(year=datetime.now().year, month=1, day=1)
-    reference_date_vidi = datetime(year=datetime.now().year, month=10, day=1)
-    reference_date_vici = datetime(year=datetime.now().year, month=3, day=1)
 
-    # Read the PhD defense date from the row
-    phd_date = strip_datetime_str(
-        researcher=researcher, phd_column_to_choose="Children corrected PhD date"
-    )
+def parse_call_deadlines(lines: list) -> dict:
+    """Parses known call deadlines written as "GRANT=YYYY-MM-DD", e.g. "MSCA PF=2025-09-10".
 
-    # Calculate the difference in years between the reference dates and the PhD defense date
-    years_diff_veni = (reference_date_veni - phd_date).days / 365.25
-    years_diff_vidi = (reference_date_vidi - phd_date).days / 365.25
-    years_diff_vici = (reference_date_vici - phd_date).days / 365.25
-
-    # Check Veni eligibility first
-    if (
-        -5 <= years_diff_veni < 3
-    ):  # Veni eligibility within three years after the defense.
-        last_eligible_year_veni = phd_date.year + 3
-        return "Veni " + str(last_eligible_year_veni)
-
-    # If not eligible for Veni, check Vidi eligibility
-    elif (
-        3 <= years_diff_vidi < 8
-    ):  # Vidi eligibility within eight years after the defense.
-        last_eligible_year_vidi = phd_date.year + 8
-        return "Vidi " + str(last_eligible_year_vidi)
-
-    # If not eligible for Vidi, check Vici eligibility
-    elif (
-        8 <= years_diff_vici < 15
-    ):  # Vici eligibility within fifteen years after the defense.
-        last_eligible_year_vici = phd_date.year + 15
-        return "Vici " + str(last_eligible_year_vici)
-
-    # If not eligible for any return none
-    else:
-        return None
-
-
-def calculate_nwo_oc_eligibility(researcher: pd.Series) -> str | None:
-    """
-    A function to calculate whether a researcher is eligible for an NWO other grant.
     Args:
-        researcher: The row of the researchers dataframe corresponding to a single researcher.
+        lines (list): The call deadlines, empty lines are skipped.
 
     Returns:
-        The grant the researcher can apply for and until when.
+        The deadlines by grant name and call year, see utils.compile_grant_rules.compile_grant_projection.
     """
-    if pd.isna(researcher["PhD Defense Date"]):
-        return None
+    call_deadlines = {}
+    for line in filter(str.strip, lines):
+        grant, separator, deadline = line.rpartition("=")
+        if not separator:
+            raise ValueError(f"Call deadline {line!r} is not written as GRANT=YYYY-MM-DD")
+        deadline = datetime.strptime(deadline.strip(), "%Y-%m-%d")
+        call_deadlines.setdefault(grant.strip(), {})[deadline.year] = deadline.strftime("%Y-%m-%d")
+    return call_deadlines
+
+
+def create_eligibility_projection(
+    researchers_df: pd.DataFrame,
+    call_years: list,
+    call_deadlines: dict | None = None,
+    wide: bool = False,
+) -> pd.DataFrame:
+    """Calculates the eligibility of every grant scheme for every researcher in every call year.
 
-    # Define the reference dates for the grants eligibility check
-    reference_date_xs = datetime(year=datetime.now().year, month=3, day=19)
-    reference_date_m = datetime(year=datetime.now().year, month=11, day=1)
-    reference_date_l = datetime(year=datetime.now().year, month=9, day=1)
-
-    # Read the PhD defense date from the row
-    phd_date = strip_datetime_str(
-        researcher=researcher, phd_column_to_choose="PhD Defense Date"
-    )
-
-    # Calculate the difference in years between the reference dates and the PhD defense date
-    years_diff_xs = (reference_date_xs - phd_date).days / 365.25
-    years_diff_m = (reference_date_m - phd_date).days / 365.25
-    years_diff_l = (reference_date_l - phd_date).days / 365.25
-
-    # Check xs eligibility first
-    if 5 <= years_diff_xs < 10:  # xs eligibility within three years after the defense.
-        last_eligible_year_xs = phd_date.year + 10
-        return "Xs " + str(last_eligible_year_xs)
-
-    # If not eligible for xs, check M/L eligibility
-    elif 16 < years_diff_l:
-        return "M/L"
-
-    # If not eligible for L, check M eligibility
-    elif 10 < years_diff_m:
-        return "M"
-
-    # If not eligible for any return none
-    else:
-        return None
-
-
-def calculate_erc_eligibility(researcher: pd.Series) -> str | None:
-    """
-    A function to calculate whether a researcher is eligible for an ERC grant.
     Args:
-        researcher: The row of the researchers dataframe corresponding to a single researcher.
+        researchers_df (pd.DataFrame): The researchers list with typed date columns.
+        call_years (list): The call years to project.
+        call_deadlines (dict | None): Known deadlines by grant name and call year, see parse_call_deadlines.
+        wide (bool): Whether to return one row per researcher with a column per scheme and call year, instead of one
+            row per researcher and call year.
 
     Returns:
-        The grant the researcher can apply for and until when.
+        The identifying columns of the researchers list with the eligibility per call year.
     """
-    if pd.isna(researcher["PhD Defense Date"]):
-        return None
-
-    # Define the reference dates for the grants eligibility check
-    reference_date_starting = datetime(year=datetime.now().year, month=1, day=1)
-    reference_date_consolidator = datetime(year=datetime.now().year, month=1, day=1)
-    reference_date_advanced = datetime(year=datetime.now().year, month=1, day=1)
-
-    if researcher["Gender"] == "Female":
-        phd_date = strip_datetime_str(
-            researcher=researcher, phd_column_to_choose="Children corrected PhD date"
-        )
-    else:
-        phd_date = strip_datetime_str(
-            researcher=researcher, phd_column_to_choose="PhD Defense Date"
+    call_years = list(call_years)
+    projection = project_grant_rules(researchers_df, call_years, call_deadlines)
+    names = researchers_df[
+        [column for column in PROJECTION_COLUMNS if column in researchers_df.columns]
+    ]
+    schemes = projection.columns.drop("Call year")
+
+    if not wide:
+        return compact_dtypes(
+            names.iloc[np.repeat(np.arange(len(names)), len(call_years))].assign(
+                **{column: projection[column].to_numpy() for column in projection.columns}
+            )
         )
-    phd_date_advanced = strip_datetime_str(
-        researcher=researcher, phd_column_to_choose="PhD Defense Date"
-    )
-
-    # Calculate the difference in years between the reference dates and the PhD defense date
-    years_diff_starting = (reference_date_starting - phd_date).days / 365.25
-    years_diff_consolidator = (reference_date_consolidator - phd_date).days / 365.25
-    years_diff_advanced = (reference_date_advanced - phd_date_advanced).days / 365.25
-
-    # Check StG eligibility first
-    if (
-        2 <= years_diff_starting < 7
-    ):  # xs eligibility within three years after the defense.
-        last_eligible_year_starting = phd_date.year + 7
-        return "StG " + str(last_eligible_year_starting)
-
-    # If not eligible for StG, check CoG eligibility
-    elif 7 <= years_diff_consolidator < 12:
-        last_eligible_year_consolidator = phd_date.year + 12
-        return "CoG " + str(last_eligible_year_consolidator)
 
-    # If not eligible for L, check M eligibility
-    elif 12 <= years_diff_advanced:
-        return "AdG"
+    # The rows of the projection are ordered by researcher and then call year.
+    wide_columns = {}
+    for column in schemes:
+        years_matrix = projection[column].to_numpy().reshape(len(names), len(call_years))
+        for position, year in enumerate(call_years):
+            wide_columns[f"{column} {year}"] = pd.Categorical(years_matrix[:, position])
+    return compact_dtypes(names).assign(**wide_columns)
 
-    # If not eligible for any return none
-    else:
-        return None
 
+def read_uploaded_list(
+    timer: StageTimer, researchers_list, researchers_hash: str, skip_invalid_rows: bool
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Reads and validates an uploaded researchers list, see utils.validate_input.
 
-def calculate_msca_eligibility(researcher: pd.Series) -> str | None:
-    """
-    A function to calculate whether a researcher is eligible for an MSCA postdoctoral fellowship grant.
-    Args:
-        researcher: The row of the researchers dataframe corresponding to a single researcher.
+    The list is only read when its validated version is not in the result cache on disk.
 
     Returns:
-        The grant the researcher can apply for and until when.
+        The valid rows of the researchers list and the report of the invalid values.
     """
-    if pd.isna(researcher["PhD Defense Date"]):
-        return None
 
-    # Define the reference date for the grants eligibility check
-    reference_date = datetime(year=2024, month=9, day=11)  # Deadline for submission
+    def read_and_validate():
+        raw_researchers_df = timer.cached(
+            "read researchers list",
+            ("read_researchers", researchers_hash),
+            lambda: read_researchers_list(
+                researchers_list, researchers_hash, parse_dates=False
+            ),
+        )
+        return validate_input(
+            raw_researchers_df,
+            header=RESEARCHERS_HEADER_ROW,
+            required_columns=REQUIRED_COLUMNS,
+            skip_invalid_rows=skip_invalid_rows,
+        )
 
-    # Parse the PhD defense date and contract start date
-    phd_date = strip_datetime_str(researcher, phd_column_to_choose="PhD Defense Date")
-    contract_start_date = datetime.strptime(
-        researcher["Employment Start Date"], "%Y-%m-%d"
+    return timer.cached(
+        "validate researchers list",
+        ("validate_researchers", researchers_hash, skip_invalid_rows, RULES_VERSION),
+        read_and_validate,
+        persist=True,
     )
 
-    # Calculate the difference in years between the reference date and the PhD defense date
-    years_since_phd = (reference_date - phd_date).days / 365.25
-
-    # Check eligibility based on years since PhD
-    if years_since_phd >= 8:
-        return None
-
-    # Check if they have been in NL for more than 12 months in the last 3 years
-    months_in_nl = (reference_date - contract_start_date).days / 30.44
-    if months_in_nl > 12:
-        return None
-
-    last_eligible_year_msca = phd_date.year + 8  # 8 years post-PhD rule
-    return f"Eligible until {last_eligible_year_msca}"
-
 
 def calculate_eligibility():
     """Main function to create the eligibility list based on the researchers list."""
     st.subheader("Calculate Eligibility")
-    researchers_list = st.file_uploader("Upload researchers list", type=["xlsx", "xls"])
+    # The researchers list of the update menu is used as it is, without an Excel round-trip.
+    updated_list = updated_researchers_list()
+    use_updated_list = updated_list is not None and st.radio(
+        "Researchers list",
+        [True, False],
+        format_func=lambda use: "The researchers list created in this session"
+        if use
+        else "Upload a researchers list",
+    )
+    researchers_list = (
+        None
+        if use_updated_list
+        else st.file_uploader("Upload researchers list", type=["xlsx", "xls"])
+    )
+    skip_invalid_rows = st.checkbox(
+        "Continue with the valid rows when some rows have invalid values",
+        help="Rows with an invalid date, gender or number of children are left out of the eligibility list.",
+    )
+    current_year = datetime.now().year
+    with st.expander("Projection over several call years"):
+        call_years = st.slider(
+            "Call years",
+            min_value=current_year - PROJECTION_YEARS_BACK,
+            max_value=current_year + PROJECTION_YEARS_AHEAD,
+            value=(current_year, current_year + 4),
+        )
+        call_deadlines_text = st.text_area(
+            "Known call deadlines",
+            placeholder="MSCA PF=2025-09-10",
+            help="One deadline per line as GRANT=YYYY-MM-DD. Other calls use the month and day of the grant rules "
+            "in every call year.",
+        )
+        wide_projection = st.radio(
+            "Layout",
+            [False, True],
+            format_func=lambda wide: "One column per scheme and call year"
+            if wide
+            else "One row per researcher and call year",
+        )
+        show_projection = st.checkbox("Calculate the projection")
 
-    if researchers_list:
+    if researchers_list or use_updated_list:
+        timer = StageTimer("calculate_eligibility")
         try:
-            researchers_df = pd.read_excel(io=researchers_list, header=1)
-
-            st.write("Preview of uploaded Excel file:")
-            st.write(researchers_df)
+            reference_year = current_year
+            if use_updated_list:
+                # The list was validated by the update, its key is the inputs of the update.
+                source_key, researchers_df = updated_list
+                invalid_values = None
+            else:
+                # Reruns with the same file reuse the cached outputs of every stage.
+                source_key = content_hash(researchers_list)
+                researchers_df, invalid_values = read_uploaded_list(
+                    timer, researchers_list, source_key, skip_invalid_rows
+                )
+
+            if invalid_values is not None and len(invalid_values):
+                st.warning(
+                    f"{count_invalid_rows(invalid_values)} rows with invalid values are left out of the "
+                    "eligibility list:"
+                )
+                show_preview(invalid_values, key="skipped_rows")
+
+            st.write("Preview of the researchers list:")
+            show_preview(researchers_df, key="researchers_preview")
             st.write("---\n")
             st.write("Preview of researchers list with calculated grants:")
 
-            researchers_df["Eligible NWO Talent"] = researchers_df.apply(
-                calculate_nwo_talent_eligibility, axis=1
-            )
-
-            researchers_df["Eligible NWO OC"] = researchers_df.apply(
-                calculate_nwo_oc_eligibility, axis=1
-            )
-
-            researchers_df["Eligible ERC"] = researchers_df.apply(
-                calculate_erc_eligibility, axis=1
+            eligibility_list_df = timer.cached(
+                "calculate eligibility",
+                (
+                    "eligibility",
+                    source_key,
+                    skip_invalid_rows,
+                    reference_year,
+                    RULES_VERSION,
+                ),
+                lambda: create_eligibility_list(researchers_df, reference_year),
+                rows_in=len(researchers_df),
+                persist=True,
             )
-
-            researchers_df["eligible MSCA"] = researchers_df.apply(
-                calculate_msca_eligibility, axis=1
+            show_preview(eligibility_list_df, key="eligibility_preview")
+
+            excel_data = timer.cached(
+                "export to Excel",
+                (
+                    "export_eligibility",
+                    source_key,
+                    skip_invalid_rows,
+                    reference_year,
+                    RULES_VERSION,
+                ),
+                lambda: save_and_format_df_as_excel(
+                    updated_researchers_dataframe=eligibility_list_df
+                ),
+                rows_in=len(eligibility_list_df),
+                persist=True,
             )
-            st.write(researchers_df)
-
-            excel_data = save_and_format_df_as_excel(
-                updated_researchers_dataframe=researchers_df
+            # Store the typed list, so it is not parsed from Excel when the downloaded file is uploaded again.
+            timer.measure(
+                "save snapshot",
+                lambda: save_snapshot(eligibility_list_df, content_hash(excel_data)),
+                rows_in=len(eligibility_list_df),
             )
 
             # Create a download button
@@ -261,7 +301,61 @@ def calculate_eligibility():
                 key="download_button",
             )
 
+            if show_projection:
+                st.write("---\n")
+                st.write(
+                    f"Projection of the eligibility for the calls of {call_years[0]} to {call_years[1]}:"
+                )
+                call_deadlines = parse_call_deadlines(call_deadlines_text.splitlines())
+                projection_key = (
+                    source_key,
+                    skip_invalid_rows,
+                    call_years,
+                    tuple(call_deadlines_text.split()),
+                    wide_projection,
+                    RULES_VERSION,
+                )
+                projection_df = timer.cached(
+                    "project eligibility",
+                    ("projection",) + projection_key,
+                    lambda: create_eligibility_projection(
+                        researchers_df,
+                        range(call_years[0], call_years[1] + 1),
+                        call_deadlines,
+                        wide=wide_projection,
+                    ),
+                    rows_in=len(researchers_df),
+                    persist=True,
+                )
+                show_preview(projection_df, key="projection_preview")
+
+                projection_data = timer.cached(
+                    "export projection to Excel",
+                    ("export_projection",) + projection_key,
+                    lambda: save_and_format_df_as_excel(projection_df),
+                    rows_in=len(projection_df),
+                    persist=True,
+                )
+                st.download_button(
+                    label="Download eligibility projection",
+                    data=projection_data,
+                    file_name=f"eligibility_projection_{call_years[0]}_{call_years[1]}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key="download_projection_button",
+                )
+
+        except InvalidInputError as e:
+            st.error(
+                f"{e}. Correct the values below in the Excel file, or continue with the valid rows only."
+            )
+            show_preview(e.report, key="invalid_values")
+
         except Exception as e:
             st.error(
                 f"An error occurred. Feel free to contact me with this error code: {e}"
             )
+
+        if st.sidebar.checkbox("Show stage timings", key="show_stage_timings"):
+            st.sidebar.dataframe(timer.to_dataframe(), hide_index=True)
+        if st.sidebar.checkbox("Show memory per session", key="show_memory_report"):
+            st.sidebar.dataframe(memory_report(timer.frames), hide_index=True)
@@ -1,108 +1,235 @@
 """Streamlit app menu item that filters the HR list to only contain researchers."""
 
-from io import BytesIO
-from typing import List
+import io
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-from seeds.function_names import function_names_researchers
+from seeds.function_names import (
+    function_names_excluded_researchers,
+    function_names_researchers,
+)
 from seeds.translation_dutch_english import translation_dict
-from utils.filter_hr_list import filter_out_function_names
+from utils.background_job import (
+    JobCancelled,
+    parse_in_worker,
+    restart_session_job,
+    session_job,
+    show_job_progress,
+)
+from utils.dtype_schema import compact_dtypes, memory_report
+from utils.incremental_update import compare_hr_lists
+from utils.match_researchers import (
+    VALIDATION_MODES,
+    build_join_keys,
+    find_ambiguous_rows,
+    link_researchers,
+    link_similar_researchers,
+)
+from utils.parse_dates import DATE_DTYPE, parse_date_columns
+from utils.partitioned import concat_in_order, key_partitions, run_partitioned
+from utils.pipeline_cache import content_hash
+from utils.preview import show_preview
+from utils.read_excel_file import (
+    HR_HEADER_ROW,
+    RESEARCHERS_HEADER_ROW,
+    read_hr_researchers,
+)
+from utils.save_df_as_excel import save_and_format_df_as_excel
+from utils.session_handoff import hand_over_researchers_list, open_menu
+from utils.snapshot_store import read_researchers_list, save_snapshot
+from utils.stage_timer import StageTimer
+from utils.validate_input import (
+    InvalidInputError,
+    count_invalid_rows,
+    validate_input,
+)
+
+# The columns of the researchers list, in order.
+RESEARCHERS_LIST_COLUMNS = [
+    "First Name",
+    "Tussenv.",
+    "Last name",
+    "Initials",
+    "FTE",
+    "Faculty",
+    "Research Group",
+    "PhD Defense Date",
+    "Employment Start Date",
+    "Employment Termination Date",
+    "Function",
+    "Birth Date",
+    "Gender",
+    "Count of children applicable",
+    "Remarks",
+]
+
+
+# The columns that are taken over from the researchers list for a matched employee.
+LOOKUP_COLUMNS = [
+    "First Name",
+    "Gender",
+    "Count of children applicable",
+    "Remarks",
+    "PhD Defense Date",
+]
+
+# The stages of run_update_pipeline, for the progress of the update.
+UPDATE_STAGES = 7
+# The stages that write the researchers list to Excel, skipped when it is only kept in the session.
+EXPORT_STAGES = 2
+
+# The number of months the PhD defense date is moved per child.
+MONTHS_PER_CHILD = {"Female": 18, "Male": 6}
+
+
+def add_calendar_months(dates: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Adds a number of calendar months to every date, like pd.DateOffset(months=...). A day that does not exist in
+    the resulting month becomes the last day of that month.
 
+    Args:
+        dates (np.ndarray): The dates, as datetime64[D].
+        months (np.ndarray): The number of months to add to every date.
+
+    Returns:
+        The shifted dates as datetime64[D], NaT stays NaT.
+    """
+    start_of_month = dates.astype("datetime64[M]")
+    day_of_month = dates - start_of_month.astype("datetime64[D]")
 
-def calculate_phd_date_corrected_for_children(row):
+    target_month = start_of_month + months.astype("timedelta64[M]")
+    target_month_start = target_month.astype("datetime64[D]")
+    target_month_length = (target_month + 1).astype("datetime64[D]") - target_month_start
+
+    return target_month_start + np.minimum(
+        day_of_month, target_month_length - np.timedelta64(1, "D")
+    )
 
-    if pd.isna(row["PhD Defense Date"]):
-        return None  # Return None if there is no PhD Defense Date
 
+def calculate_phd_date_corrected_for_children(merged_df: pd.DataFrame) -> pd.Series:
+    """Moves the PhD defense date of every researcher 18 months (female) or 6 months (male) per child. The date is
+    not adjusted when the gender is not specified.
+
+    Args:
+        merged_df (pd.DataFrame): The merged researchers dataframe.
+
+    Returns:
+        The children corrected PhD defense date of every researcher, NaT when there is no PhD defense date.
+    """
     children_count = (
-        row["Count of children applicable"]
-        if pd.notna(row["Count of children applicable"])
-        else 0
+        merged_df["Count of children applicable"].fillna(0).to_numpy(dtype=np.float64)
+    )
+    months_per_child = (
+        merged_df["Gender"].map(MONTHS_PER_CHILD).astype(np.float64).fillna(0).to_numpy()
     )
 
     # Calculate the adjustment period
-    if row["Gender"] == "Female":
-        months_to_subtract = 18 * children_count
-    elif row["Gender"] == "Male":
-        months_to_subtract = 6 * children_count
-    else:
-        return row["PhD Defense Date"]  # No adjustment if gender is not specified
+    months_to_add = (months_per_child * children_count).astype(np.int64)
 
     # Adjust the PhD Defense Date
-    adjusted_date = pd.to_datetime(row["PhD Defense Date"]) + pd.DateOffset(
-        months=months_to_subtract
+    adjusted_dates = add_calendar_months(
+        merged_df["PhD Defense Date"].to_numpy(dtype="datetime64[D]"), months_to_add
     )
-    formatted_date = adjusted_date.strftime('%Y-%m-%d')
-    return formatted_date
+    return pd.Series(adjusted_dates, index=merged_df.index).astype(DATE_DTYPE)
 
 
-def filter_df_add_column(
-    hr_df: pd.DataFrame, function_name_parts: List
-) -> pd.DataFrame:
-    """Filters the hr dataframe on function name, makes all columns English.
+def translate_hr_columns(filtered_df: pd.DataFrame, parse_dates: bool = True) -> pd.DataFrame:
+    """Makes all columns of the HR list English, for a list that only has the researchers already, e.g. as read
+    with utils.read_excel_file.read_hr_researchers.
 
     Args:
-        hr_df (pd.DataFrame): The HR list formatted as a dataframe by the example.
-        function_name_parts (List): A list with function names to filter the HR list on.
-
+        filtered_df (pd.DataFrame): The researchers of the HR list.
+        parse_dates (bool): Whether to type the date columns, turn this off to check them with
+            validate_hr_and_researchers_lists first.
     """
-    # Filter out all other functions of the function_names.
-    filtered_df = filter_out_function_names(
-        hr_list=hr_df, function_names=function_name_parts
-    )
-
     # Rename columns
     filtered_df = filtered_df.rename(columns=translation_dict)
     filtered_df = filtered_df.drop(columns=["Medewerkersgroep"])
 
-    # Convert datetime columns to the desired format.
-    for column in filtered_df.select_dtypes(include="datetime").columns:
-        filtered_df[column] = filtered_df[column].dt.strftime("%Y-%m-%d")
-
-    # Also filters the termination date column as the date 9999 doesn't get recognized as a datetype format.
-    filtered_df["Employment Termination Date"] = (
-        filtered_df["Employment Termination Date"].astype(str).apply(lambda x: x[:-9])
-    )
+    # Type all date columns, this includes the open-ended termination dates in the year 9999.
+    if parse_dates:
+        filtered_df = compact_dtypes(parse_date_columns(filtered_df))
 
     return filtered_df
 
 
+def validate_hr_and_researchers_lists(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    skip_invalid_rows: bool = False,
+    **partition_options,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Checks the values of both lists at once and types their date columns, see utils.validate_input.
+
+    Args:
+        filtered_hr_df (pd.DataFrame): The HR list as returned by translate_hr_columns without parsing the dates.
+        researchers_df (pd.DataFrame): The previous researchers list as read without parsing the dates.
+        skip_invalid_rows (bool): Whether to continue with the valid rows only instead of raising an
+            InvalidInputError.
+        **partition_options: The workers and partition_mode of validate_input.
+
+    Returns:
+        The valid rows of the HR list and of the researchers list, and one report of the invalid values of both.
+    """
+    valid_hr_df, hr_report = validate_input(
+        filtered_hr_df, header=HR_HEADER_ROW, skip_invalid_rows=True, **partition_options
+    )
+    valid_researchers_df, researchers_report = validate_input(
+        researchers_df,
+        header=RESEARCHERS_HEADER_ROW,
+        required_columns=RESEARCHERS_LIST_COLUMNS,
+        skip_invalid_rows=True,
+        **partition_options,
+    )
+    report = pd.concat(
+        [
+            hr_report.assign(List="HR list"),
+            researchers_report.assign(List="Researchers list"),
+        ],
+        ignore_index=True,
+    )
+    report = report[["List"] + list(hr_report.columns)]
+    if len(report) and not skip_invalid_rows:
+        raise InvalidInputError(report)
+    return valid_hr_df, valid_researchers_df, report
+
+
 def merge_two_df(
-    researchers_df: pd.DataFrame, filtered_hr_df: pd.DataFrame
-) -> pd.DataFrame:
+    researchers_df: pd.DataFrame,
+    filtered_hr_df: pd.DataFrame,
+    validate: str = "one_to_many",
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Function to merge the researchers dataframe and the Hr dataframe. This has to be done, so we do not lose the
     information that the grants office already filled in for researchers (Like sex and children.)
 
     Args:
         researchers_df (pd): The researchers dataframe.
         filtered_hr_df (pd): The hr list converted to a pandas dataframe.
+        validate (str): one_to_many or one_to_one, see utils.match_researchers.VALIDATION_MODES.
+        include_tussenvoegsel (bool): Whether to also match on the tussenvoegsel.
+        include_birth_date (bool): Whether to also match on the birth date.
 
     Returns:
-        A pandas dataframe where the current researchers dataframe gets left joined on the filtered hr dataframe.
+        A pandas dataframe where the current researchers dataframe gets left joined on the filtered hr dataframe. The
+        rows keep the index of the filtered hr dataframe. And a report of the ambiguous matches, these rows are not
+        joined.
     """
-    # Select columns to keep from researchers_df
-    columns_to_keep = [
-        "First Name",
-        "Gender",
-        "Count of children applicable",
-        "Remarks",
-        "Last name",
-        "Initials",
-        "PhD Defense Date",
-    ]
-
-    # Merge the dataframes on the specified keys
-    merged_df = pd.merge(
+    # Drop duplicate rows of the hr list.
+    filtered_hr_df = filtered_hr_df[~filtered_hr_df.duplicated()]
+
+    # Look up the researchers on their normalized last name and initials.
+    linked_df, ambiguous_matches = link_researchers(
         filtered_hr_df,
-        researchers_df[columns_to_keep],
-        how="left",
-        left_on=["Last name", "Initials"],
-        right_on=["Last name", "Initials"],
+        researchers_df,
+        columns=LOOKUP_COLUMNS,
+        validate=validate,
+        include_tussenvoegsel=include_tussenvoegsel,
+        include_birth_date=include_birth_date,
     )
-
-    # Drop duplicates (in case there are duplicates after the merge)
-    merged_df.drop_duplicates(inplace=True)
+    merged_df = filtered_hr_df.join(linked_df, lsuffix="_x", rsuffix="_y")
 
     # Merge the "PhD Defense Date_x" and "PhD Defense Date_y" columns
     merged_df["PhD Defense Date"] = merged_df["PhD Defense Date_y"].fillna(
@@ -111,99 +238,357 @@ def merge_two_df(
 
     # Drop the extra "PhD Defense Date_y" column (We prioritize the grants office's PhD date.)
     merged_df.drop(columns=["PhD Defense Date_y"], inplace=True)
-    # Convert date column to datetime first.
-    merged_df["PhD Defense Date"] = pd.to_datetime(merged_df["PhD Defense Date"])
-    # Convert date column to right format
-    merged_df["PhD Defense Date"] = merged_df["PhD Defense Date"].dt.strftime(
-        "%Y-%m-%d"
-    )
 
-    reordered_df = merged_df[
-        [
-            "First Name",
-            "Tussenv.",
-            "Last name",
-            "Initials",
-            "FTE",
-            "Faculty",
-            "Research Group",
-            "PhD Defense Date",
-            "Employment Start Date",
-            "Employment Termination Date",
-            "Function",
-            "Birth Date",
-            "Gender",
-            "Count of " "children " "applicable",
-            "Remarks",
-        ]
-    ]
-
-    return reordered_df
-
-
-def save_and_format_df_as_excel(updated_researchers_dataframe: pd.DataFrame) -> BytesIO:
-    """Function to save the updated hr dataframe as an Excel file with the correct formatting.
+    reordered_df = merged_df[RESEARCHERS_LIST_COLUMNS]
+
+    return reordered_df, ambiguous_matches
+
+
+def merge_two_df_partitioned(
+    researchers_df: pd.DataFrame,
+    filtered_hr_df: pd.DataFrame,
+    workers: int,
+    **merge_options,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Gives the same result as merge_two_df, but merges partitions of both lists in parallel worker processes.
+
+    The lists are partitioned on the normalized last name and initials, so every row of the HR list is in the same
+    partition as all rows of the researchers list it can match, and as all HR rows it can share them with.
 
     Args:
-        updated_researchers_dataframe (pd.DataFrame): The updated researchers dataframe.
+        researchers_df (pd): The researchers dataframe.
+        filtered_hr_df (pd): The hr list converted to a pandas dataframe.
+        workers (int): The number of worker processes and partitions.
+        **merge_options: The matching options of merge_two_df.
 
     Returns:
-        BytesIO: The Excel file in the requested format.
+        The merged dataframe and a report of the ambiguous matches, as returned by merge_two_df.
     """
-    excel_buffer = BytesIO()
+    hr_keys, researchers_keys = build_join_keys(filtered_hr_df, researchers_df)
+    results = run_partitioned(
+        merge_two_df,
+        (researchers_df, filtered_hr_df),
+        [
+            (researchers_positions, hr_positions)
+            for hr_positions, researchers_positions in key_partitions(
+                (hr_keys, researchers_keys), workers
+            )
+        ],
+        workers,
+        **merge_options,
+    )
+    return (
+        concat_in_order([merged_part for merged_part, _ in results], filtered_hr_df.index),
+        concat_in_order([ambiguous_part for _, ambiguous_part in results], filtered_hr_df.index),
+    )
 
-    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-        # Write the DataFrame to Excel starting from the second row.
-        updated_researchers_dataframe.to_excel(
-            writer, startrow=1, index=False, sheet_name="Sheet1"
-        )
 
-        # Get the xlsxwriter workbook and worksheet objects.
-        workbook = writer.book
-        worksheet = writer.sheets["Sheet1"]
+def merge_two_df_incrementally(
+    researchers_df: pd.DataFrame,
+    filtered_hr_df: pd.DataFrame,
+    validate: str = "one_to_many",
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Gives the same result as merge_two_df, but only merges the employees that were added or changed since the
+    researchers list. The rows of unchanged employees are taken over from the researchers list, unless merge_two_df
+    would find them ambiguous.
+
+    Args:
+        researchers_df (pd): The researchers dataframe.
+        filtered_hr_df (pd): The hr list converted to a pandas dataframe.
+        validate (str): one_to_many or one_to_one, see merge_two_df.
+        include_tussenvoegsel (bool): Whether to also match on the tussenvoegsel.
+        include_birth_date (bool): Whether to also match on the birth date.
+
+    Returns:
+        The merged dataframe, a report of the ambiguous matches and a report of the added, removed and modified
+        employees.
+    """
+    merge_options = dict(
+        validate=validate,
+        include_tussenvoegsel=include_tussenvoegsel,
+        include_birth_date=include_birth_date,
+    )
+    previous_positions, change_report = compare_hr_lists(filtered_hr_df, researchers_df)
+
+    # An unchanged employee whose name matches several researchers, or (one_to_one) several HR rows, is merged like
+    # in a full update, so it is left unlinked and reported. The HR rows with the same key are merged with it.
+    deduplicated_hr_df = filtered_hr_df[~filtered_hr_df.duplicated()]
+    ambiguous = find_ambiguous_rows(
+        deduplicated_hr_df, researchers_df, LOOKUP_COLUMNS, **merge_options
+    ).reindex(filtered_hr_df.index, fill_value=True)
+    unchanged = previous_positions.ge(0) & ~ambiguous
+
+    # Merge the new, changed and ambiguous employees.
+    changed_df, ambiguous_matches = merge_two_df(
+        researchers_df=researchers_df,
+        filtered_hr_df=filtered_hr_df[~unchanged],
+        **merge_options,
+    )
 
-        # Define cell formats.
-        header_format = workbook.add_format(
+    # Take over the unchanged employees, a PhD date missing in the researchers list is still taken from the HR list.
+    unchanged_df = researchers_df.iloc[previous_positions[unchanged]][
+        RESEARCHERS_LIST_COLUMNS
+    ].set_axis(filtered_hr_df.index[unchanged])
+    unchanged_df["PhD Defense Date"] = unchanged_df["PhD Defense Date"].fillna(
+        filtered_hr_df.loc[unchanged, "PhD Defense Date"]
+    )
+
+    # Restore the order of the hr list. Empty and all-NA columns would change the dtypes of the concatenation in a
+    # future pandas, so they get the dtype of the other part first.
+    parts = [unchanged_df, changed_df]
+    for first, second in ((0, 1), (1, 0)):
+        parts[first] = parts[first].astype(
             {
-                "bold": True,
-                "text_wrap": True,
-                "valign": "top",
-                "fg_color": "#D7E4BC",
-                "border": 1,
+                column: parts[second][column].dtype
+                for column in RESEARCHERS_LIST_COLUMNS
+                if parts[first][column].isna().all() and len(parts[second])
             }
         )
-        workbook.add_format({"text_wrap": True, "valign": "top", "border": 1})
-        alternating_color = workbook.add_format({"fg_color": "#F2F2F2"})
-
-        # Apply formatting to headers (starting from the second row.)
-        for col_num, value in enumerate(updated_researchers_dataframe.columns.values):
-            worksheet.write(1, col_num, value, header_format)
-
-        # Apply alternating row color.
-        for row_num in range(
-            2, len(updated_researchers_dataframe) + 2
-        ):  # Start from the second row
-            if row_num % 2 == 0:
-                worksheet.set_row(row_num, None, alternating_color)
-
-        # Enable sorting by clicking on column headers.
-        worksheet.autofilter(
-            1,
-            0,
-            len(updated_researchers_dataframe) + 1,
-            len(updated_researchers_dataframe.columns) - 1,
+    merged_df = pd.concat([part for part in parts if len(part)] or parts[1:]).sort_index(
+        kind="stable"
+    )
+
+    return merged_df, ambiguous_matches, change_report
+
+
+def merge_similar_researchers(
+    merged_df: pd.DataFrame,
+    ambiguous_matches: pd.DataFrame,
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Takes over the information of the researchers list for the employees that the exact merge did not find, e.g.
+    because their name is spelled differently, when a row of the researchers list has a similar name. See
+    utils.match_researchers.link_similar_researchers.
+
+    Only the HR rows without a row of the researchers list with the same key are compared, and only with the rows
+    of the researchers list without an HR row with the same key. Ambiguous rows stay unlinked.
+
+    Args:
+        merged_df (pd.DataFrame): The merged dataframe of merge_two_df.
+        ambiguous_matches (pd.DataFrame): The report of the ambiguous matches of merge_two_df.
+        filtered_hr_df (pd.DataFrame): The hr list converted to a pandas dataframe.
+        researchers_df (pd.DataFrame): The researchers dataframe.
+        include_tussenvoegsel (bool): Whether the exact merge matched on the tussenvoegsel.
+        include_birth_date (bool): Whether the exact merge matched on the birth date.
+
+    Returns:
+        The merged dataframe with the linked rows filled in, and the report of the ambiguous matches with the linked
+        rows and the rows to review added.
+    """
+    hr_keys, researchers_keys = build_join_keys(
+        filtered_hr_df,
+        researchers_df,
+        include_tussenvoegsel=include_tussenvoegsel,
+        include_birth_date=include_birth_date,
+    )
+    unmatched = (
+        ~np.isin(hr_keys, researchers_keys)
+        & filtered_hr_df.index.isin(merged_df.index)
+        & ~filtered_hr_df.index.isin(ambiguous_matches.index)
+    )
+    unused = ~np.isin(researchers_keys, hr_keys)
+    if not unmatched.any() or not unused.any():
+        return merged_df, ambiguous_matches
+
+    linked_df, similar_matches = link_similar_researchers(
+        filtered_hr_df[unmatched], researchers_df[unused], columns=LOOKUP_COLUMNS
+    )
+    if len(linked_df):
+        merged_df = merged_df.copy()
+        # Like merge_two_df, the PhD date of the grants office comes first.
+        linked_df["PhD Defense Date"] = linked_df["PhD Defense Date"].fillna(
+            merged_df.loc[linked_df.index, "PhD Defense Date"]
         )
+        for column in LOOKUP_COLUMNS:
+            if isinstance(merged_df[column].dtype, pd.CategoricalDtype):
+                merged_df[column] = merged_df[column].astype(object)
+            merged_df.loc[linked_df.index, column] = linked_df[column]
+    ambiguous_matches = pd.concat([ambiguous_matches, similar_matches]).sort_index(kind="stable")
+    return merged_df, ambiguous_matches
+
+
+def create_researchers_list(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    incremental: bool = False,
+    workers: int = 1,
+    fuzzy_matching: bool = False,
+    **merge_options,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame | None]:
+    """Creates the new researchers list from the filtered HR list and the previous researchers list.
+
+    Args:
+        filtered_hr_df (pd.DataFrame): The HR list as returned by translate_hr_columns.
+        researchers_df (pd.DataFrame): The previous researchers list.
+        incremental (bool): Whether to only merge the employees that were added or changed, see
+            merge_two_df_incrementally.
+        workers (int): The number of worker processes that merge partitions of the lists, see
+            merge_two_df_partitioned. An incremental merge only merges the changed employees and is not partitioned.
+        fuzzy_matching (bool): Whether to also link the employees the merge did not find to a row of the researchers
+            list with a similar name, see merge_similar_researchers.
+        **merge_options: The matching options of merge_two_df.
+
+    Returns:
+        The new researchers list, a report of the ambiguous matches and, when incremental, a report of the added,
+        removed and modified employees (None otherwise).
+    """
+    # Merge both dataframes.
+    if incremental:
+        merged_df, ambiguous_matches, change_report = merge_two_df_incrementally(
+            researchers_df=researchers_df,
+            filtered_hr_df=filtered_hr_df,
+            **merge_options,
+        )
+    elif workers > 1 and len(filtered_hr_df) > 1:
+        merged_df, ambiguous_matches = merge_two_df_partitioned(
+            researchers_df=researchers_df,
+            filtered_hr_df=filtered_hr_df,
+            workers=workers,
+            **merge_options,
+        )
+        change_report = None
+    else:
+        merged_df, ambiguous_matches = merge_two_df(
+            researchers_df=researchers_df,
+            filtered_hr_df=filtered_hr_df,
+            **merge_options,
+        )
+        change_report = None
+
+    if fuzzy_matching:
+        merged_df, ambiguous_matches = merge_similar_researchers(
+            merged_df,
+            ambiguous_matches,
+            filtered_hr_df,
+            researchers_df,
+            include_tussenvoegsel=merge_options.get("include_tussenvoegsel", False),
+            include_birth_date=merge_options.get("include_birth_date", False),
+        )
+
+    # Calculate adjusted phd defense date based on children.
+    merged_df["Children corrected PhD date"] = calculate_phd_date_corrected_for_children(
+        merged_df
+    )
+    # Joining the two lists turns categoricals with different categories into object columns.
+    return compact_dtypes(merged_df), ambiguous_matches, change_report
 
-        # Adjust column width based on the length of the text.
-        for i, col in enumerate(updated_researchers_dataframe.columns):
-            column_len = max(
-                updated_researchers_dataframe[col].astype(str).map(len).max(), len(col)
-            )
-            worksheet.set_column(i, i, column_len)
 
-    excel_data = excel_buffer.getvalue()
+def run_update_pipeline(
+    timer: StageTimer,
+    hr_data: bytes,
+    researchers_data: bytes,
+    skip_invalid_rows: bool = False,
+    incremental: bool = False,
+    fuzzy_matching: bool = False,
+    export_excel: bool = True,
+    **merge_options,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame | None, bytes | None]:
+    """Runs all stages of the update, from reading the Excel files to the Excel export of the new researchers list.
 
-    return excel_data
+    Both Excel files are read at the same time. Every stage is measured by the timer and its output is cached on the
+    content of the files.
+
+    Args:
+        timer (StageTimer): Measures the stages, e.g. the timer of a utils.background_job.BackgroundJob.
+        hr_data (bytes): The content of the HR list Excel file.
+        researchers_data (bytes): The content of the researchers list Excel file.
+        skip_invalid_rows (bool): Whether to continue with the valid rows only, see validate_hr_and_researchers_lists.
+        incremental (bool): Whether to only merge the employees that were added or changed.
+        fuzzy_matching (bool): Whether to also link the employees on a similar name, see merge_similar_researchers.
+        export_excel (bool): Whether to write the new researchers list to Excel, turn this off when it is only handed
+            to the eligibility menu.
+        **merge_options: The matching options of merge_two_df.
+
+    Returns:
+        The report of the invalid values, the new researchers list, the report of the ambiguous matches, the change
+        report (None when not incremental) and the new researchers list as Excel file (None when not exported).
+    """
+    hr_hash = content_hash(hr_data)
+    researchers_hash = content_hash(researchers_data)
+
+    # Open HR and Researcher's Excel file at the same time.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Only the researchers of the HR list are read, the other employees are skipped while streaming the file.
+        hr_future = executor.submit(
+            timer.cached,
+            "read HR list",
+            ("read_hr_researchers", hr_hash),
+            lambda: parse_in_worker(
+                read_hr_researchers,
+                hr_data,
+                function_names_researchers,
+                function_names_excluded_researchers,
+                cancelled=timer.cancelled,
+            ),
+        )
+        researchers_future = executor.submit(
+            timer.cached,
+            "read researchers list",
+            ("read_researchers", researchers_hash),
+            lambda: parse_in_worker(
+                read_researchers_list,
+                io.BytesIO(researchers_data),
+                researchers_hash,
+                parse_dates=False,
+                cancelled=timer.cancelled,
+            ),
+        )
+        hr_df = hr_future.result()
+        raw_researchers_df = researchers_future.result()
+
+    # The HR list was filtered on the function names while reading, only its columns are translated.
+    raw_filtered_df = timer.cached(
+        "translate HR columns",
+        ("translate_hr", hr_hash),
+        lambda: translate_hr_columns(hr_df, parse_dates=False),
+        rows_in=len(hr_df),
+    )
+
+    # Check all values of both lists at once.
+    filtered_df, researchers_df, invalid_values = timer.cached(
+        "validate input",
+        ("validate_update", hr_hash, researchers_hash, skip_invalid_rows),
+        lambda: validate_hr_and_researchers_lists(
+            raw_filtered_df, raw_researchers_df, skip_invalid_rows=skip_invalid_rows
+        ),
+        rows_in=len(raw_filtered_df) + len(raw_researchers_df),
+    )
+
+    merge_key = (skip_invalid_rows, incremental, fuzzy_matching, tuple(merge_options.items()))
+    merged_df, ambiguous_matches, change_report = timer.cached(
+        "merge and correct PhD date",
+        ("merge", hr_hash, researchers_hash, merge_key),
+        lambda: create_researchers_list(
+            filtered_df,
+            researchers_df,
+            incremental=incremental,
+            fuzzy_matching=fuzzy_matching,
+            **merge_options,
+        ),
+        rows_in=len(filtered_df),
+    )
+    if not export_excel:
+        return invalid_values, merged_df, ambiguous_matches, change_report, None
+
+    # Format merged tables as excel data.
+    excel_data = timer.cached(
+        "export to Excel",
+        ("export_researchers", hr_hash, researchers_hash, merge_key),
+        lambda: save_and_format_df_as_excel(merged_df),
+        rows_in=len(merged_df),
+    )
+    # Store the typed list, so it is not parsed from Excel when the downloaded file is uploaded again.
+    timer.measure(
+        "save snapshot",
+        lambda: save_snapshot(merged_df, content_hash(excel_data)),
+        rows_in=len(merged_df),
+    )
+    return invalid_values, merged_df, ambiguous_matches, change_report, excel_data
 
 
 def update_researchers_list() -> None:
@@ -220,33 +605,90 @@ def update_researchers_list() -> None:
     researchers_file = st.file_uploader(
         "Upload the researchers excel file", type=["xlsx", "xls"]
     )
+    skip_invalid_rows = st.checkbox(
+        "Continue with the valid rows when some rows have invalid values",
+        help="Rows with an invalid date, gender or number of children are left out of the researchers list.",
+    )
+    incremental = st.checkbox(
+        "Only reprocess the employees that were added or changed since the researchers list",
+        help="The rows of unchanged employees are taken over from the researchers list and a change report is shown.",
+    )
+    with st.expander("Matching options"):
+        merge_options = dict(
+            validate=st.radio(
+                "How rows of the researchers list may be linked to the HR list",
+                VALIDATION_MODES,
+                format_func=lambda mode: {
+                    "one_to_many": "One researcher to one or more HR rows",
+                    "one_to_one": "One researcher to at most one HR row",
+                }[mode],
+            ),
+            include_tussenvoegsel=st.checkbox("Also match on the tussenvoegsel"),
+            include_birth_date=st.checkbox("Also match on the birth date"),
+        )
+        fuzzy_matching = st.checkbox(
+            "Also link employees with a similar name",
+            help="Employees that are not found on their exact name are linked to a researcher with a similar name "
+            "(e.g. another spelling or tussenvoegsel), when the match is clear. Less clear matches are listed for "
+            "review and not linked.",
+        )
+    keep_in_session = st.checkbox(
+        "Only keep the researchers list for the eligibility list, without writing it to Excel",
+        help="The new researchers list stays in this session and is used by Create Eligibility List directly, so it "
+        "is not downloaded and uploaded again. Only the eligibility list is written to Excel.",
+    )
     st.write("---\n")
 
-    # Open HR file and perform filtering
+    # Run the update in the background, so it keeps running when a widget is clicked.
     if hr_file and researchers_file:
-        try:
-
-            # Open HR and Researcher's Excel file
-            hr_df = pd.read_excel(io=hr_file, header=2)
-            researchers_df = pd.read_excel(io=researchers_file, header=1)
-
-            # Filter the HR list.
-            filtered_df = filter_df_add_column(
-                hr_df, function_name_parts=function_names_researchers
-            )
-
-            # Merge both dataframes.
-            merged_df = merge_two_df(
-                researchers_df=researchers_df, filtered_hr_df=filtered_df
-            )
-
-            # Calculate adjusted phd defense date based on children.
-            merged_df["Children corrected PhD date"] = merged_df.apply(
-                calculate_phd_date_corrected_for_children, axis=1
-            )
+        hr_data = hr_file.getvalue()
+        researchers_data = researchers_file.getvalue()
+        update_key = (
+            content_hash(hr_data),
+            content_hash(researchers_data),
+            skip_invalid_rows,
+            incremental,
+            fuzzy_matching,
+            tuple(merge_options.items()),
+        )
+        job = session_job(
+            "update_researchers_job",
+            update_key + (keep_in_session,),
+            "update_researchers_list",
+            lambda timer: run_update_pipeline(
+                timer,
+                hr_data,
+                researchers_data,
+                skip_invalid_rows=skip_invalid_rows,
+                incremental=incremental,
+                fuzzy_matching=fuzzy_matching,
+                export_excel=not keep_in_session,
+                **merge_options,
+            ),
+            total_stages=UPDATE_STAGES - EXPORT_STAGES if keep_in_session else UPDATE_STAGES,
+        )
+        if not job.done:
+            show_job_progress(job)
+            return
 
-            # Format merged tables as excel data.
-            excel_data = save_and_format_df_as_excel(merged_df)
+        try:
+            if job.error is not None:
+                raise job.error
+            (
+                invalid_values,
+                merged_df,
+                ambiguous_matches,
+                change_report,
+                excel_data,
+            ) = job.result
+            hand_over_researchers_list(update_key, merged_df)
+
+            if len(invalid_values):
+                st.warning(
+                    f"{count_invalid_rows(invalid_values)} rows with invalid values are left out:"
+                )
+                show_preview(invalid_values, key="skipped_rows")
+                st.write("---\n")
 
             st.write(
                 "The HR file has been filtered and the existing additional information from the provided "
@@ -254,19 +696,60 @@ def update_researchers_list() -> None:
                 "This is a preview, but you can download the file with all found "
                 "researchers below."
             )
-            st.write(merged_df)
+            show_preview(merged_df, key="researchers_preview")
             st.write("---\n")
 
+            if len(ambiguous_matches):
+                st.warning(
+                    f"{len(ambiguous_matches)} rows of the HR list could not be matched exactly with the "
+                    "researchers list. The reason shows whether their information from the researchers list has "
+                    "been taken over from a similar name, otherwise it has not been taken over."
+                )
+                show_preview(ambiguous_matches, key="ambiguous_matches")
+                st.write("---\n")
+
+            if change_report is not None:
+                st.write(
+                    f"Changes since the researchers list: {len(change_report)} employees were added, removed or "
+                    "modified. All other employees were taken over from the researchers list."
+                )
+                show_preview(change_report, key="change_report")
+                st.write("---\n")
+
             # Create a download button
-            st.download_button(
-                label="Download researchers list",
-                data=excel_data,
-                file_name="new_researchers_list.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="download_button",
+            if excel_data is not None:
+                st.download_button(
+                    label="Download researchers list",
+                    data=excel_data,
+                    file_name="new_researchers_list.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key="download_button",
+                )
+            st.button(
+                "Create the eligibility list of this researchers list",
+                help="Uses the researchers list of this session, without uploading it again.",
+                on_click=open_menu,
+                args=("Create Eligibility List",),
             )
 
+        except JobCancelled:
+            st.info("The update was cancelled.")
+            if st.button("Run the update again"):
+                restart_session_job("update_researchers_job")
+                st.rerun()
+
+        except InvalidInputError as e:
+            st.error(
+                f"{e}. Correct the values below in the Excel files, or continue with the valid rows only."
+            )
+            show_preview(e.report, key="invalid_values")
+
         except Exception as e:
             st.error(
                 f"An error occurred. Feel free to contact me with this error code: {e}"
             )
+
+        if st.sidebar.checkbox("Show stage timings", key="show_stage_timings"):
+            st.sidebar.dataframe(job.timer.to_dataframe(), hide_index=True)
+        if st.sidebar.checkbox("Show memory per session", key="show_memory_report"):
+            st.sidebar.dataframe(memory_report(job.timer.frames), hide_index=True)
@@ -6,6 +6,9 @@ function_names_researchers = [
     "universitair",
 ]
 
+# Functions that contain one of the researcher function names, but are not researchers.
+function_names_excluded_researchers = []
+
 function_names_education_grants_advisor = [
     "docent",
     "teacher",
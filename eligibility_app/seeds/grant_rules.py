@@ -0,0 +1,131 @@
+# Every rule describes one grant of a scheme. The rules of a scheme are checked in order and the first rule a
+# researcher matches determines the label in the scheme's column.
+#
+# column:               The column of the eligibility list the scheme is written to.
+# grant:                The name of the grant.
+# phd_column:           The PhD date column to count the years from.
+# female_phd_column:    (optional) The PhD date column to use instead for female researchers.
+# reference_year:       (optional) Fixed year of the reference date, defaults to the year of the calculation.
+# reference_month/day:  The month and day of the reference date (e.g. the call deadline).
+# min_years:            (optional) The minimum number of years between the PhD date and the reference date.
+# min_inclusive:        (optional) Whether min_years itself is eligible, defaults to True.
+# max_years:            (optional) The (exclusive) maximum number of years since the PhD date.
+# max_months_employed:  (optional) The maximum number of months employed at the reference date.
+# years_eligible:       (optional) The number of years after the PhD year the researcher remains eligible.
+# label:                The label format, {last_eligible_year} is replaced by the PhD year + years_eligible.
+
+grant_rules = [
+    # NWO talent programme.
+    {
+        "column": "Eligible NWO Talent",
+        "grant": "Veni",
+        "phd_column": "Children corrected PhD date",
+        "reference_month": 1,
+        "reference_day": 1,
+        "min_years": -5,
+        "max_years": 3,
+        "years_eligible": 3,
+        "label": "Veni {last_eligible_year}",
+    },
+    {
+        "column": "Eligible NWO Talent",
+        "grant": "Vidi",
+        "phd_column": "Children corrected PhD date",
+        "reference_month": 10,
+        "reference_day": 1,
+        "min_years": 3,
+        "max_years": 8,
+        "years_eligible": 8,
+        "label": "Vidi {last_eligible_year}",
+    },
+    {
+        "column": "Eligible NWO Talent",
+        "grant": "Vici",
+        "phd_column": "Children corrected PhD date",
+        "reference_month": 3,
+        "reference_day": 1,
+        "min_years": 8,
+        "max_years": 15,
+        "years_eligible": 15,
+        "label": "Vici {last_eligible_year}",
+    },
+    # NWO open competition.
+    {
+        "column": "Eligible NWO OC",
+        "grant": "XS",
+        "phd_column": "PhD Defense Date",
+        "reference_month": 3,
+        "reference_day": 19,
+        "min_years": 5,
+        "max_years": 10,
+        "years_eligible": 10,
+        "label": "Xs {last_eligible_year}",
+    },
+    {
+        "column": "Eligible NWO OC",
+        "grant": "L",
+        "phd_column": "PhD Defense Date",
+        "reference_month": 9,
+        "reference_day": 1,
+        "min_years": 16,
+        "min_inclusive": False,
+        "label": "M/L",
+    },
+    {
+        "column": "Eligible NWO OC",
+        "grant": "M",
+        "phd_column": "PhD Defense Date",
+        "reference_month": 11,
+        "reference_day": 1,
+        "min_years": 10,
+        "min_inclusive": False,
+        "label": "M",
+    },
+    # ERC, female researchers are corrected for their children for the StG and CoG.
+    {
+        "column": "Eligible ERC",
+        "grant": "StG",
+        "phd_column": "PhD Defense Date",
+        "female_phd_column": "Children corrected PhD date",
+        "reference_month": 1,
+        "reference_day": 1,
+        "min_years": 2,
+        "max_years": 7,
+        "years_eligible": 7,
+        "label": "StG {last_eligible_year}",
+    },
+    {
+        "column": "Eligible ERC",
+        "grant": "CoG",
+        "phd_column": "PhD Defense Date",
+        "female_phd_column": "Children corrected PhD date",
+        "reference_month": 1,
+        "reference_day": 1,
+        "min_years": 7,
+        "max_years": 12,
+        "years_eligible": 12,
+        "label": "CoG {last_eligible_year}",
+    },
+    {
+        "column": "Eligible ERC",
+        "grant": "AdG",
+        "phd_column": "PhD Defense Date",
+        "reference_month": 1,
+        "reference_day": 1,
+        "min_years": 12,
+        "label": "AdG",
+    },
+    # MSCA postdoctoral fellowship, at most 12 months in NL at the deadline for submission.
+    {
+        "column": "eligible MSCA",
+        "grant": "MSCA PF",
+        "phd_column": "PhD Defense Date",
+        "reference_year": 2024,
+        "reference_month": 9,
+        "reference_day": 11,
+        "max_years": 8,
+        "max_months_employed": 12,
+        "years_eligible": 8,
+        "label": "Eligible until {last_eligible_year}",
+    },
+]
@@ -1,8 +1,11 @@
-"""The entry point of the streamlit application."""
+"""The entry point of the streamlit application.
+
+The menus are only imported when they are selected, so the home page is shown without loading pandas and the Excel
+libraries. Check the import time with `python -m benchmarks.benchmark_import_time`.
+"""
 
 import streamlit as st
-from menu_eligibility_list_creation import calculate_eligibility
-from menu_hr_researcher_update import update_researchers_list
+from utils.session_handoff import MENU_KEY
 
 # from menu_hr_education_update import update_education_list
 
@@ -21,6 +24,7 @@ def eligibility_app():
             "Update researchers list with HR list",
             "Create Eligibility List",
         ],
+        key=MENU_KEY,
     )
 
     # Homepage
@@ -41,10 +45,14 @@ def eligibility_app():
 
     # Routes to menu_hr_update
     elif menu_selection == "Update researchers list with HR list":
+        from menu_hr_researcher_update import update_researchers_list
+
         update_researchers_list()
 
     # Routes to menu_eligibility_list_creation
     elif menu_selection == "Create Eligibility List":
+        from menu_eligibility_list_creation import calculate_eligibility
+
         calculate_eligibility()
 
 
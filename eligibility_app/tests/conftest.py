@@ -0,0 +1,6 @@
+"""The app imports its modules from the eligibility_app directory, so the tests do as well."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from utils import background_job
+from utils.background_job import BackgroundJob, JobCancelled, parse_in_worker
+
+
+class RecordingPool(ThreadPoolExecutor):
+    """A pool of one thread that keeps the futures it returns."""
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.futures = []
+
+    def submit(self, *args, **kwargs):
+        self.futures.append(super().submit(*args, **kwargs))
+        return self.futures[-1]
+
+
+def test_cancelled_job_stops_before_its_next_stage():
+    in_first_stage, finish_first_stage = threading.Event(), threading.Event()
+    stages_run = []
+
+    def first_stage():
+        in_first_stage.set()
+        finish_first_stage.wait(5)
+        stages_run.append("first")
+
+    def run(timer):
+        timer.measure("first", first_stage)
+        timer.measure("second", lambda: stages_run.append("second"))
+
+    job = BackgroundJob("key", "test", run, total_stages=2).start()
+    assert in_first_stage.wait(5)
+    job.cancel()
+    finish_first_stage.set()
+    job._thread.join(5)
+
+    assert job.done and job.cancelled
+    assert stages_run == ["first"]
+    assert [record["stage"] for record in job.timer.records] == ["first"]
+
+
+def test_cancelled_job_stops_waiting_for_a_parse(monkeypatch):
+    pool = RecordingPool()
+    monkeypatch.setattr(background_job, "parse_pool", lambda: pool)
+    monkeypatch.setattr(background_job, "POLL_SECONDS", 0.01)
+    release_worker, cancelled = threading.Event(), threading.Event()
+    try:
+        # The only worker is busy, so the second parse waits in the queue.
+        pool.submit(release_worker.wait, 5)
+        threading.Timer(0.1, cancelled.set).start()
+        start = time.perf_counter()
+        with pytest.raises(JobCancelled):
+            parse_in_worker(release_worker.wait, 5, cancelled=cancelled)
+
+        assert time.perf_counter() - start < 2
+        assert pool.futures[-1].cancelled()
+    finally:
+        release_worker.set()
+        pool.shutdown()
+
+
+def test_parse_without_cancel_returns_the_output(monkeypatch):
+    pool = RecordingPool()
+    monkeypatch.setattr(background_job, "parse_pool", lambda: pool)
+    try:
+        assert parse_in_worker(sorted, [3, 1, 2], cancelled=threading.Event()) == [
+            1,
+            2,
+            3,
+        ]
+        assert parse_in_worker(sorted, [3, 1, 2], reverse=True) == [3, 2, 1]
+    finally:
+        pool.shutdown()
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pandas as pd
+from batch import main
+from utils.create_test_dataset import (
+    create_hr_dataset,
+    create_researchers_dataset,
+    save_hr_dataset,
+)
+from utils.save_df_as_excel import save_and_format_df_as_excel
+
+
+def run_batch_command(monkeypatch, *arguments) -> int:
+    monkeypatch.setattr(sys, "argv", ["batch.py", *arguments])
+    return main()
+
+
+def test_documented_update_and_eligibility_commands(tmp_path, monkeypatch):
+    exports_dir = tmp_path / "exports"
+    output_dir = tmp_path / "output"
+    exports_dir.mkdir()
+    for number in range(2):
+        save_hr_dataset(
+            create_hr_dataset(40, seed=number, malformed_date_fraction=0),
+            exports_dir / f"hr_{number}.xlsx",
+        )
+    researchers_path = tmp_path / "researchers_list.xlsx"
+    researchers_path.write_bytes(
+        save_and_format_df_as_excel(create_researchers_dataset(40, malformed_date_fraction=0))
+    )
+
+    assert run_batch_command(
+        monkeypatch,
+        "update",
+        str(exports_dir / "*.xlsx"),
+        "--researchers-list",
+        str(researchers_path),
+        "--output-dir",
+        str(output_dir),
+        "--workers",
+        "1",
+    ) == 0
+    assert run_batch_command(
+        monkeypatch,
+        "eligibility",
+        str(output_dir / "*_researchers_list.xlsx"),
+        "--output-dir",
+        str(output_dir),
+        "--workers",
+        "1",
+    ) == 0
+
+    combined_researchers = pd.read_excel(output_dir / "combined_researchers_list.xlsx", header=1)
+    combined_eligibility = pd.read_excel(output_dir / "combined_eligibility_list.xlsx", header=1)
+    # Every researcher once, the combined researchers list is not an input of the eligibility command.
+    assert len(combined_eligibility) == len(combined_researchers)
+    assert sorted(combined_eligibility["Source file"].unique()) == [
+        "hr_0_researchers_list.xlsx",
+        "hr_1_researchers_list.xlsx",
+    ]
+    assert not os.path.exists(output_dir / "combined_researchers_list_eligibility_list.xlsx")
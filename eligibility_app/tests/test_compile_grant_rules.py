@@ -0,0 +1,19 @@
+import pandas as pd
+from menu_eligibility_list_creation import create_eligibility_list
+
+
+def test_erc_needs_a_phd_defense_date():
+    researchers_df = pd.DataFrame(
+        {
+            "Gender": ["Female", "Female"],
+            "PhD Defense Date": pd.to_datetime([None, "2019-03-01"]),
+            "Children corrected PhD date": pd.to_datetime(["2015-03-01", "2020-03-01"]),
+            "Employment Start Date": pd.to_datetime(["2024-01-01", "2024-01-01"]),
+        }
+    )
+
+    eligibility_df = create_eligibility_list(researchers_df, 2026)
+
+    assert pd.isna(eligibility_df.loc[0, "Eligible ERC"])
+    # With a PhD defense date the children corrected date of a female researcher counts.
+    assert eligibility_df.loc[1, "Eligible ERC"] == "StG 2027"
@@ -0,0 +1,57 @@
+import warnings
+
+import pandas as pd
+import pytest
+from menu_hr_researcher_update import (
+    merge_two_df,
+    merge_two_df_incrementally,
+    translate_hr_columns,
+    validate_hr_and_researchers_lists,
+)
+from utils.create_test_dataset import create_hr_dataset, create_researchers_dataset
+
+
+def typed_lists(hr_df: pd.DataFrame, researchers_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    filtered_hr_df, researchers_df, _ = validate_hr_and_researchers_lists(
+        translate_hr_columns(hr_df, parse_dates=False), researchers_df
+    )
+    return filtered_hr_df, researchers_df
+
+
+def merge_without_future_warnings(researchers_df, filtered_hr_df, **merge_options):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        return merge_two_df_incrementally(researchers_df, filtered_hr_df, **merge_options)
+
+
+# A concatenated object column without any value holds None where the merge leaves NaN, both are blank in Excel.
+@pytest.mark.filterwarnings("ignore:Mismatched null-like values:FutureWarning")
+@pytest.mark.parametrize("validate", ["one_to_many", "one_to_one"])
+def test_incremental_update_equals_full_merge_with_duplicate_names(validate):
+    hr_df = create_hr_dataset(2000, duplicate_name_fraction=0.02)
+    # Change some employees, leave some out and add a namesake of an unchanged employee.
+    hr_df.loc[::50, "FTE"] = 0.05
+    hr_df = pd.concat([hr_df.iloc[100:], hr_df.iloc[[101]].assign(Geboortedatum=pd.Timestamp("1970-01-01"))])
+    filtered_hr_df, researchers_df = typed_lists(
+        hr_df.reset_index(drop=True), create_researchers_dataset(2000, duplicate_name_fraction=0.02)
+    )
+
+    merged_df, ambiguous_matches, _ = merge_without_future_warnings(
+        researchers_df, filtered_hr_df, validate=validate
+    )
+    expected_df, expected_ambiguous = merge_two_df(researchers_df, filtered_hr_df, validate=validate)
+
+    assert len(expected_ambiguous)
+    pd.testing.assert_frame_equal(merged_df, expected_df)
+    pd.testing.assert_frame_equal(ambiguous_matches.sort_index(), expected_ambiguous.sort_index())
+
+
+@pytest.mark.parametrize("hr_rows", [0, 200])
+def test_incremental_update_with_all_or_no_employees_unchanged(hr_rows):
+    filtered_hr_df, researchers_df = typed_lists(
+        create_hr_dataset(200).iloc[:hr_rows], create_researchers_dataset(200)
+    )
+
+    merged_df, _, _ = merge_without_future_warnings(researchers_df, filtered_hr_df)
+
+    pd.testing.assert_frame_equal(merged_df, merge_two_df(researchers_df, filtered_hr_df)[0])
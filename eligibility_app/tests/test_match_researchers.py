@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import match_researchers
+from utils.match_researchers import (
+    block_candidates,
+    link_researchers,
+    link_similar_researchers,
+)
+
+
+def hr_list(*names) -> pd.DataFrame:
+    """An HR list with a row per (tussenvoegsel, last name, initials, birth date)."""
+    return pd.DataFrame(
+        [
+            {
+                "Tussenv.": tussenvoegsel,
+                "Last name": last_name,
+                "Initials": initials,
+                "Birth Date": pd.Timestamp(birth_date),
+                "Function": "Onderzoeker",
+            }
+            for tussenvoegsel, last_name, initials, birth_date in names
+        ]
+    ).set_axis(np.arange(len(names)) * 10)
+
+
+def researchers_list(*names) -> pd.DataFrame:
+    """A researchers list with a row per (tussenvoegsel, last name, initials, birth date, first name)."""
+    researchers_df = hr_list(*(name[:4] for name in names)).reset_index(drop=True)
+    researchers_df["First Name"] = [name[4] for name in names]
+    return researchers_df
+
+
+def test_link_on_the_exact_key():
+    hr_df = hr_list(
+        (None, "Bakker", "A", "1970-01-01"),
+        (None, "Visser", "B", "1980-01-01"),
+        (None, "Smit", "C", "1990-01-01"),
+    )
+    researchers_df = researchers_list(
+        (None, "Visser", "B", "1980-01-01", "Bram"),
+        (None, "Bakker", "A", "1970-01-01", "Anna"),
+    )
+
+    linked_df, ambiguous_matches = link_researchers(
+        hr_df, researchers_df, ["First Name"]
+    )
+
+    assert linked_df.index.equals(hr_df.index)
+    assert linked_df["First Name"].tolist()[:2] == ["Anna", "Bram"]
+    assert pd.isna(linked_df.loc[20, "First Name"])
+    assert ambiguous_matches.empty
+
+
+def test_link_ignores_accents_case_dots_and_the_case_of_the_tussenvoegsel():
+    hr_df = hr_list(
+        ("van der", "Müller", "J.P.", "1970-01-01"),
+        (None, "BAKKER", "a", "1980-01-01"),
+    )
+    researchers_df = researchers_list(
+        ("Van Der", "Muller", "JP", "1970-01-01", "Jan"),
+        (None, "Bakker", "A", "1980-01-01", "Anna"),
+    )
+
+    linked_df, _ = link_researchers(
+        hr_df, researchers_df, ["First Name"], include_tussenvoegsel=True
+    )
+
+    assert linked_df["First Name"].tolist() == ["Jan", "Anna"]
+
+
+def test_tussenvoegsel_and_birth_date_are_only_matched_when_included():
+    hr_df = hr_list(("van", "Dijk", "A", "1970-01-01"))
+    researchers_df = researchers_list(("de", "Dijk", "A", "1971-01-01", "Anna"))
+
+    assert (
+        link_researchers(hr_df, researchers_df, ["First Name"])[0].loc[0, "First Name"]
+        == "Anna"
+    )
+    for option in ("include_tussenvoegsel", "include_birth_date"):
+        linked_df, _ = link_researchers(
+            hr_df, researchers_df, ["First Name"], **{option: True}
+        )
+        assert pd.isna(linked_df.loc[0, "First Name"])
+
+
+def test_ambiguous_keys_are_not_linked_and_reported():
+    hr_df = hr_list(
+        (None, "Jansen", "A", "1970-01-01"),
+        (None, "Visser", "B", "1980-01-01"),
+    )
+    researchers_df = researchers_list(
+        (None, "Jansen", "A", "1970-01-01", "Anna"),
+        (None, "jansen", "A.", "1975-01-01", "Anouk"),
+        # The same row twice is not ambiguous.
+        (None, "Visser", "B", "1980-01-01", "Bram"),
+        (None, "Visser", "B", "1980-01-01", "Bram"),
+    )
+
+    linked_df, ambiguous_matches = link_researchers(
+        hr_df, researchers_df, ["First Name"]
+    )
+
+    assert pd.isna(linked_df.loc[0, "First Name"])
+    assert linked_df.loc[10, "First Name"] == "Bram"
+    assert ambiguous_matches.index.tolist() == [0]
+    assert (
+        ambiguous_matches.loc[0, "Reason"]
+        == "Matches 2 different rows of the researchers list"
+    )
+
+
+def test_one_to_one_reports_hr_rows_that_share_a_researcher():
+    hr_df = hr_list(
+        (None, "Smit", "C", "1970-01-01"),
+        (None, "Smit", "C", "1990-01-01"),
+        (None, "Bos", "D", "1980-01-01"),
+    )
+    researchers_df = researchers_list(
+        (None, "Smit", "C", "1970-01-01", "Carla"),
+        (None, "Bos", "D", "1980-01-01", "Daan"),
+    )
+
+    linked_df, ambiguous_matches = link_researchers(
+        hr_df, researchers_df, ["First Name"], validate="one_to_one"
+    )
+
+    assert linked_df["First Name"].isna().tolist() == [True, True, False]
+    assert (
+        ambiguous_matches["Reason"].tolist()
+        == ["Shares a researchers list row with 1 other rows of the HR list"] * 2
+    )
+
+    # one_to_many links both appointments.
+    linked_df, ambiguous_matches = link_researchers(
+        hr_df, researchers_df, ["First Name"]
+    )
+    assert linked_df["First Name"].tolist() == ["Carla", "Carla", "Daan"]
+    assert ambiguous_matches.empty
+
+
+def test_unknown_validation():
+    hr_df = hr_list((None, "Bos", "D", "1980-01-01"))
+    with pytest.raises(ValueError, match="Unknown validation"):
+        link_researchers(
+            hr_df, researchers_list(), ["First Name"], validate="many_to_many"
+        )
+
+
+def test_link_a_similar_name():
+    hr_df = hr_list(
+        (None, "Meyer", "J", "1970-01-01"),
+        (None, "Berg, van den", "K", "1980-01-01"),
+    )
+    researchers_df = researchers_list(
+        (None, "Meijer", "J", "1970-01-01", "Jan"),
+        ("van den", "Berg", "K", "1980-01-01", "Kees"),
+    )
+
+    linked_df, report = link_similar_researchers(hr_df, researchers_df, ["First Name"])
+
+    assert linked_df["First Name"].tolist() == ["Jan", "Kees"]
+    assert (
+        report.loc[0, "Reason"]
+        == "Linked on a similar name to J Meijer (1970-01-01) (score 1.00)"
+    )
+    assert report.loc[10, "Reason"].startswith(
+        "Linked on a similar name to K van den Berg"
+    )
+
+
+def test_similar_names_without_a_clear_best_candidate_are_reviewed():
+    hr_df = hr_list((None, "Jansen", "P", "1970-01-01"))
+    researchers_df = researchers_list(
+        (None, "Janssen", "P", "1970-01-01", "Piet"),
+        (None, "Jansens", "P", "1970-01-01", "Paul"),
+    )
+
+    linked_df, report = link_similar_researchers(hr_df, researchers_df, ["First Name"])
+
+    assert linked_df.empty
+    assert report.loc[0, "Reason"].startswith(
+        "Not linked, similar to P Janssen (1970-01-01)"
+    )
+
+
+def test_similar_names_are_only_compared_within_their_blocks():
+    hr_df = hr_list(
+        # Another phonetic key and no birth date: never compared, although the pair would score 0.82.
+        (None, "Kansen", "A", None),
+        # Another phonetic key and the same birth date: compared.
+        (None, "Kanssen", "B", "1980-01-01"),
+    )
+    researchers_df = researchers_list(
+        (None, "Jansen", "A", "1975-01-01", "Anna"),
+        (None, "Janssen", "B", "1980-01-01", "Bram"),
+    )
+
+    linked_df, report = link_similar_researchers(hr_df, researchers_df, ["First Name"])
+
+    assert linked_df.empty
+    assert report.index.tolist() == [10]
+    assert report.loc[10, "Reason"].startswith("Not linked, similar to B Janssen")
+
+
+def test_block_candidates_skips_missing_and_large_blocks(monkeypatch):
+    hr_blocks = np.array(["a", "b", None, "c"], dtype=object)
+    researchers_blocks = np.array(["b", "a", "a", None, "c", "c", "c"], dtype=object)
+
+    candidates = block_candidates(hr_blocks, researchers_blocks)
+    assert sorted(map(tuple, candidates.to_numpy())) == [
+        (0, 1),
+        (0, 2),
+        (1, 0),
+        (3, 4),
+        (3, 5),
+        (3, 6),
+    ]
+
+    monkeypatch.setattr(match_researchers, "MAX_BLOCK_SIZE", 2)
+    candidates = block_candidates(hr_blocks, researchers_blocks)
+    assert sorted(map(tuple, candidates.to_numpy())) == [(0, 1), (0, 2), (1, 0)]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from menu_eligibility_list_creation import create_eligibility_list
+from utils.create_test_dataset import create_researchers_dataset
+from utils.dtype_schema import compact_dtypes
+
+
+@pytest.mark.parametrize("partition_mode", ["chunks", "faculty"])
+def test_partitioned_eligibility_list_equals_a_single_process(partition_mode):
+    researchers_df = compact_dtypes(
+        create_researchers_dataset(300, malformed_date_fraction=0)
+    )
+    # The rows come back in the order of the list, also when the index is not sorted.
+    researchers_df.index = np.random.default_rng(0).permutation(1000)[:300]
+
+    expected_df = create_eligibility_list(researchers_df, 2025, workers=1)
+    eligibility_df = create_eligibility_list(
+        researchers_df, 2025, workers=2, partition_mode=partition_mode
+    )
+
+    assert eligibility_df.dtypes.equals(expected_df.dtypes)
+    pd.testing.assert_frame_equal(eligibility_df, expected_df)
+
+
+def test_unknown_partition_mode():
+    researchers_df = compact_dtypes(
+        create_researchers_dataset(10, malformed_date_fraction=0)
+    )
+    with pytest.raises(ValueError, match="Unknown partition mode"):
+        create_eligibility_list(researchers_df, 2025, workers=2, partition_mode="rows")
@@ -0,0 +1,57 @@
+import os
+import shutil
+
+from utils.pipeline_cache import (
+    APP_DIRECTORY,
+    CODE_DIRECTORIES,
+    PipelineCache,
+    code_version,
+)
+
+
+def test_code_version_changes_with_a_stage_or_the_grant_rules(tmp_path):
+    for directory in CODE_DIRECTORIES:
+        os.makedirs(tmp_path / directory, exist_ok=True)
+        for name in os.listdir(os.path.join(APP_DIRECTORY, directory)):
+            if name.endswith(".py"):
+                shutil.copy(
+                    os.path.join(APP_DIRECTORY, directory, name), tmp_path / directory
+                )
+    version = code_version(str(tmp_path))
+    assert version == code_version()
+
+    for source in ("utils/validate_input.py", "seeds/grant_rules.py"):
+        with open(tmp_path / source, "a") as source_file:
+            source_file.write("\n# changed\n")
+        changed_version = code_version(str(tmp_path))
+        assert changed_version != version
+        version = changed_version
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PipelineCache()
+    cache.max_bytes = 250
+    calls = []
+
+    def output(name: str):
+        return lambda: calls.append(name) or bytes(100)
+
+    for name in ("first", "second", "first", "third"):
+        cache.get_or_compute(name, output(name))
+    assert calls == ["first", "second", "third"]
+    assert cache.current_bytes == 200
+
+    # "second" was used least recently and was evicted.
+    for name in ("first", "third", "second"):
+        cache.get_or_compute(name, output(name))
+    assert calls == ["first", "second", "third", "second"]
+
+
+def test_outputs_larger_than_the_cache_are_not_kept():
+    cache = PipelineCache()
+    cache.max_bytes = 50
+    calls = []
+    for _ in range(2):
+        cache.get_or_compute("stage", lambda: calls.append(1) or bytes(100))
+    assert len(calls) == 2
+    assert cache.current_bytes == 0
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from seeds.function_names import (
+    function_names_excluded_researchers,
+    function_names_researchers,
+)
+from utils.create_test_dataset import create_hr_dataset, save_hr_dataset
+from utils.filter_hr_list import filter_out_function_names
+from utils.read_excel_file import available_engines, read_hr_excel, read_hr_researchers
+
+
+@pytest.mark.parametrize("engine", available_engines())
+def test_streamed_researchers_equal_the_filtered_hr_list(tmp_path, engine):
+    path = tmp_path / "hr.xlsx"
+    save_hr_dataset(create_hr_dataset(500, malformed_date_fraction=0.05), path)
+
+    streamed_df = read_hr_researchers(
+        path,
+        function_names_researchers,
+        function_names_excluded_researchers,
+        engine=engine,
+        chunk_rows=64,
+    )
+    expected_df = filter_out_function_names(
+        hr_list=read_hr_excel(path, engine=engine),
+        function_names=function_names_researchers,
+        excluded_function_names=function_names_excluded_researchers,
+    )
+
+    # The streamed categoricals only have the categories of the kept rows.
+    assert streamed_df.dtypes.astype(str).equals(expected_df.dtypes.astype(str))
+    pd.testing.assert_frame_equal(
+        streamed_df.astype(object), expected_df.astype(object)
+    )
+
+
+def test_unknown_engine(tmp_path):
+    path = tmp_path / "hr.xlsx"
+    save_hr_dataset(create_hr_dataset(10), path)
+    with pytest.raises(ValueError, match="Unknown Excel reader engine"):
+        read_hr_researchers(path, function_names_researchers, engine="unknown")
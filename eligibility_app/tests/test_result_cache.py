@@ -0,0 +1,96 @@
+import logging
+
+import pandas as pd
+import pytest
+from utils import result_cache
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture
+def cache(tmp_path) -> ResultCache:
+    return ResultCache(str(tmp_path / "results.sqlite"))
+
+
+def typed_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Faculty": pd.Categorical(["TSX", "TSY", "TSX"]),
+            "Birth Date": pd.to_datetime(["1970-01-01", None, "1990-05-17"]).astype(
+                "datetime64[s]"
+            ),
+            "Count of children applicable": pd.array([0, None, 2], dtype="UInt8"),
+            "FTE": pd.array([1.0, 0.5, 0.8], dtype="float32"),
+        }
+    )
+
+
+def test_round_trip_keeps_values_and_dtypes(cache):
+    cache.put(("frame",), typed_frame())
+    cache.put(("bytes",), b"excel data")
+    cache.put(("tuple",), (typed_frame(), b"excel data"))
+
+    found, frame = cache.get(("frame",))
+    assert found
+    pd.testing.assert_frame_equal(frame, typed_frame())
+    assert cache.get(("bytes",)) == (True, b"excel data")
+    found, (frame, excel_data) = cache.get(("tuple",))
+    pd.testing.assert_frame_equal(frame, typed_frame())
+    assert excel_data == b"excel data"
+
+
+def test_other_key_or_code_version_misses(cache, monkeypatch):
+    cache.put(("stage", "hash"), b"output")
+
+    assert cache.get(("stage", "other hash")) == (False, None)
+    monkeypatch.setattr(result_cache, "PIPELINE_VERSION", "changed code")
+    assert cache.get(("stage", "hash")) == (False, None)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        (typed_frame(), None),
+        {"not": "a frame"},
+        pd.DataFrame({"mixed": [1, "text"]}),
+    ],
+)
+def test_unsupported_value_is_not_stored(cache, caplog, value):
+    with caplog.at_level(logging.WARNING, logger="eligibility_app.result_cache"):
+        cache.put(("stage",), value)
+
+    assert cache.get(("stage",)) == (False, None)
+    assert "Not storing the output of ('stage',)" in caplog.text
+
+
+def test_get_or_compute_computes_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (typed_frame(), None)
+
+    for _ in range(2):
+        frame, nothing = cache.get_or_compute(("stage",), compute)
+    # An output with None is computed again, a stored one is not.
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(frame, typed_frame())
+
+    calls.clear()
+    for _ in range(2):
+        assert (
+            cache.get_or_compute(("bytes",), lambda: calls.append(1) or b"output")
+            == b"output"
+        )
+    assert len(calls) == 1
+
+
+def test_least_recently_used_results_are_evicted(cache):
+    cache.max_bytes = 250
+    for name in ("first", "second"):
+        cache.put((name,), bytes(100))
+    cache.get(("first",))
+    cache.put(("third",), bytes(100))
+
+    assert cache.get(("first",))[0]
+    assert not cache.get(("second",))[0]
+    assert cache.get(("third",))[0]
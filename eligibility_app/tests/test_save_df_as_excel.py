@@ -0,0 +1,27 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils import save_df_as_excel
+from utils.create_test_dataset import create_researchers_dataset
+from utils.dtype_schema import compact_dtypes, without_schema
+from utils.save_df_as_excel import save_and_format_df_as_excel
+
+
+@pytest.mark.parametrize("constant_memory", [False, True])
+def test_rows_are_written_in_blocks(monkeypatch, constant_memory):
+    monkeypatch.setattr(save_df_as_excel, "WRITE_BLOCK_ROWS", 7)
+    researchers_df = compact_dtypes(create_researchers_dataset(25))
+
+    excel_data = save_and_format_df_as_excel(
+        researchers_df, constant_memory=constant_memory
+    )
+
+    # Empty cells are read as NaN, whole numbers as int64.
+    expected_df = without_schema(researchers_df).reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        pd.read_excel(io.BytesIO(excel_data), header=1),
+        expected_df.where(expected_df.notna(), np.nan),
+        check_dtype=False,
+    )
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from menu_eligibility_list_creation import REQUIRED_COLUMNS, create_eligibility_list
+from menu_hr_researcher_update import calculate_phd_date_corrected_for_children
+from utils.create_test_dataset import create_researchers_dataset
+from utils.read_excel_file import RESEARCHERS_HEADER_ROW
+from utils.validate_input import InvalidInputError, validate_input
+
+
+@pytest.fixture
+def researchers_df() -> pd.DataFrame:
+    researchers_df = create_researchers_dataset(20, malformed_date_fraction=0)
+    researchers_df["Gender"] = researchers_df["Gender"].astype(object)
+    researchers_df.loc[3, ["Gender", "Count of children applicable", "PhD Defense Date"]] = [
+        "Non-binary",
+        2,
+        "2020-05-01",
+    ]
+    return researchers_df
+
+
+def test_non_binary_gender_is_valid(researchers_df):
+    valid_df, report = validate_input(
+        researchers_df, header=RESEARCHERS_HEADER_ROW, required_columns=["Gender"]
+    )
+
+    assert report.empty
+    assert valid_df.loc[3, "Gender"] == "Non-binary"
+    # Only Female and Male move the PhD date.
+    corrected = calculate_phd_date_corrected_for_children(valid_df)
+    assert corrected[3] == pd.Timestamp("2020-05-01")
+
+    valid_df["Children corrected PhD date"] = corrected
+    eligibility_df = create_eligibility_list(valid_df[REQUIRED_COLUMNS + ["Last name"]], 2026)
+    assert 3 in eligibility_df.index
+
+
+def test_gender_that_is_not_text_is_invalid(researchers_df):
+    researchers_df.loc[5, "Gender"] = 1
+
+    with pytest.raises(InvalidInputError) as error:
+        validate_input(researchers_df, header=RESEARCHERS_HEADER_ROW)
+
+    assert error.value.report[["Column", "Problem"]].values.tolist() == [["Gender", "Not a text"]]
@@ -0,0 +1,195 @@
+"""Runs a pipeline in a background thread, so it keeps running when the Streamlit script reruns and can be cancelled.
+
+A rerun (e.g. after clicking a widget) stops the script thread, but not the job. The job of a session is kept in the
+session state and shows the progress of its stages until it is done. Cancelling a job stops it before its next stage,
+or while it waits for an upload to be parsed.
+
+Excel parsing holds the GIL, so the uploads are parsed in worker processes to read them at the same time. The number
+of worker processes is set with the ELIGIBILITY_PARSE_WORKERS environment variable, 0 parses in the job thread.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, Callable, Hashable
+
+import streamlit as st
+from utils.stage_timer import StageTimer
+
+PARSE_WORKERS = int(os.environ.get("ELIGIBILITY_PARSE_WORKERS", "2"))
+
+# The number of seconds between two updates of the progress of a running job.
+POLL_SECONDS = 0.5
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised in the job thread at the start of the next stage after the job is cancelled, or while it waits for a
+    parse."""
+
+
+def parse_pool() -> ProcessPoolExecutor | None:
+    """Returns the worker processes that parse the uploads, shared by all sessions. None when they are turned off."""
+    global _parse_pool
+    if PARSE_WORKERS < 1:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # The server runs many threads, forking it directly could copy a held lock into the workers.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn"
+            )
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=context
+            )
+        return _parse_pool
+
+
+def parse_in_worker(
+    read: Callable, *args, cancelled: threading.Event | None = None, **kwargs
+) -> Any:
+    """Calls an Excel reader in a worker process and waits for the dataframe.
+
+    The worker processes are shared by all sessions, so a cancelled job does not stop them: a parse that has not
+    started yet is cancelled, a running parse is finished by its worker and its output is dropped.
+
+    Args:
+        read (Callable): A module-level reader function, e.g. utils.read_excel_file.read_hr_excel.
+        *args, **kwargs: The arguments of the reader, file-like objects have to be in memory (e.g. io.BytesIO).
+        cancelled (threading.Event | None): Stops waiting with JobCancelled once it is set, e.g. StageTimer.cancelled.
+
+    Returns:
+        The output of the reader.
+    """
+    pool = parse_pool()
+    if pool is None:
+        return read(*args, **kwargs)
+    future = pool.submit(read, *args, **kwargs)
+    if cancelled is None:
+        return future.result()
+    while not wait([future], timeout=POLL_SECONDS).done:
+        if cancelled.is_set():
+            future.cancel()
+            raise JobCancelled("Cancelled while parsing")
+    return future.result()
+
+
+class BackgroundJob:
+    """One run of a pipeline in a background thread, with the stage timer of the run.
+
+    Args:
+        key (Hashable): The inputs of the run, a rerun with other inputs starts a new job.
+        pipeline (str): The name of the pipeline, see StageTimer.
+        run (Callable): Runs the pipeline with the stage timer of the job and returns its outputs.
+        total_stages (int): The number of stages of a complete run, to calculate the progress.
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        pipeline: str,
+        run: Callable[[StageTimer], Any],
+        total_stages: int,
+    ):
+        self.key = key
+        self.total_stages = total_stages
+        self._cancelled = threading.Event()
+        self.timer = StageTimer(
+            pipeline, on_stage=self._start_stage, cancelled=self._cancelled
+        )
+        self.current_stage = None
+        self.result = None
+        self.error = None
+        self._run = run
+        self._thread = threading.Thread(
+            target=self._target, name=f"{pipeline} job", daemon=True
+        )
+
+    def _target(self) -> None:
+        try:
+            self.result = self._run(self.timer)
+        except BaseException as e:
+            self.error = e
+
+    def _start_stage(self, stage: str) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Cancelled before {stage}")
+        self.current_stage = stage
+
+    def start(self) -> "BackgroundJob":
+        """Starts the job thread."""
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Stops the job before its next stage, the current stage is finished first unless it waits for a parse."""
+        self._cancelled.set()
+
+    @property
+    def done(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    @property
+    def cancelled(self) -> bool:
+        return isinstance(self.error, JobCancelled)
+
+    @property
+    def progress(self) -> float:
+        """The part of the stages that is finished, from 0 to 1."""
+        return min(len(self.timer.records) / self.total_stages, 1.0)
+
+
+def session_job(
+    name: str,
+    key: Hashable,
+    pipeline: str,
+    run: Callable[[StageTimer], Any],
+    total_stages: int,
+) -> BackgroundJob:
+    """Returns the job of this session for these inputs, and starts it when there is none.
+
+    A running job for other inputs is cancelled, a job for the same inputs is kept until restart_session_job.
+
+    Args:
+        name (str): The name of the job in the session state, one per menu.
+        key (Hashable): The inputs of the run.
+        pipeline (str): The name of the pipeline, see StageTimer.
+        run (Callable): Runs the pipeline with the stage timer of the job and returns its outputs.
+        total_stages (int): The number of stages of a complete run.
+
+    Returns:
+        The running or finished job.
+    """
+    job = st.session_state.get(name)
+    if job is not None and job.key == key:
+        return job
+    if job is not None:
+        job.cancel()
+    job = BackgroundJob(key, pipeline, run, total_stages).start()
+    st.session_state[name] = job
+    return job
+
+
+def restart_session_job(name: str) -> None:
+    """Forgets the job of this session, so the next rerun starts it again."""
+    job = st.session_state.pop(name, None)
+    if job is not None:
+        job.cancel()
+
+
+@st.experimental_fragment(run_every=POLL_SECONDS)
+def show_job_progress(job: BackgroundJob) -> None:
+    """Shows the progress of a running job with a button to cancel it, the page is rerun when the job is done."""
+    if job.done:
+        st.rerun()
+    stage = job.current_stage or "starting"
+    st.progress(
+        job.progress,
+        text=f"Running: {stage} ({len(job.timer.records)} of {job.total_stages} stages done)",
+    )
+    if st.button("Cancel", key=f"cancel_{id(job)}"):
+        job.cancel()
@@ -0,0 +1,329 @@
+"""Compiles the declarative grant rules into a single pass eligibility evaluator."""
+
+import hashlib
+import json
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from utils.parse_dates import to_date_column
+
+REQUIRED_RULE_KEYS = {
+    "column",
+    "grant",
+    "phd_column",
+    "reference_month",
+    "reference_day",
+    "label",
+}
+OPTIONAL_RULE_KEYS = {
+    "female_phd_column": None,
+    "reference_year": None,
+    "min_years": None,
+    "min_inclusive": True,
+    "max_years": None,
+    "max_months_employed": None,
+    "years_eligible": 0,
+}
+EMPLOYMENT_START_COLUMN = "Employment Start Date"
+GENDER_COLUMN = "Gender"
+
+
+def parse_date_column(researchers_df: pd.DataFrame, column: str) -> np.ndarray:
+    """Returns a date column of the researchers dataframe as an array of days.
+
+    Args:
+        researchers_df (pd.DataFrame): The researchers dataframe.
+        column (str): The name of the date column.
+
+    Returns:
+        A datetime64[D] array, with NaT for missing or unparseable dates.
+    """
+    return to_date_column(researchers_df[column]).to_numpy(dtype="datetime64[D]")
+
+
+def years_between(reference_date: np.datetime64, dates: np.ndarray) -> np.ndarray:
+    """Calculates the number of years between the dates and the reference date, NaN where the date is missing."""
+    return (reference_date - dates) / np.timedelta64(1, "D") / 365.25
+
+
+def calendar_years(dates: np.ndarray) -> np.ndarray:
+    """Returns the calendar year of every date."""
+    return dates.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def grant_labels(prefix: str, years: np.ndarray, suffix: str = "") -> np.ndarray:
+    """Builds labels like "Veni 2027" for every year in the array."""
+    return np.char.add(np.char.add(prefix, years.astype(str)), suffix).astype(object)
+
+
+def check_grant_rule(rule: Dict) -> Dict:
+    """Checks a grant rule for missing or unknown keys and fills in the defaults of the optional keys.
+
+    Args:
+        rule (Dict): A single grant rule, see seeds/grant_rules.py.
+
+    Returns:
+        The grant rule with all optional keys filled in.
+    """
+    missing_keys = REQUIRED_RULE_KEYS - rule.keys()
+    unknown_keys = rule.keys() - REQUIRED_RULE_KEYS - OPTIONAL_RULE_KEYS.keys()
+    if missing_keys or unknown_keys:
+        raise ValueError(
+            f"Grant rule {rule.get('grant')} is invalid, missing keys: {sorted(missing_keys)}, "
+            f"unknown keys: {sorted(unknown_keys)}"
+        )
+    return {**OPTIONAL_RULE_KEYS, **rule}
+
+
+def grant_rules_version(grant_rules: List[Dict]) -> str:
+    """Returns an identifier of the content of the grant rules, which changes whenever a rule changes."""
+    return hashlib.sha256(
+        json.dumps(grant_rules, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def grant_rule_columns(grant_rules: List[Dict]) -> List[str]:
+    """Returns the columns of the researchers list that the grant rules read, sorted by name.
+
+    Args:
+        grant_rules (List): The grant rules, see seeds/grant_rules.py.
+    """
+    columns = set()
+    for rule in grant_rules:
+        rule = {**OPTIONAL_RULE_KEYS, **rule}
+        columns.add(rule["phd_column"])
+        if rule["female_phd_column"]:
+            columns.update((rule["female_phd_column"], GENDER_COLUMN))
+        if rule["max_months_employed"] is not None:
+            columns.add(EMPLOYMENT_START_COLUMN)
+    return sorted(columns)
+
+
+def prepare_grant_rules(grant_rules: List[Dict]) -> List[Dict]:
+    """Checks the grant rules and splits their label formats around the last eligible year.
+
+    Args:
+        grant_rules (List): The grant rules, see seeds/grant_rules.py.
+
+    Returns:
+        The checked rules with their "label_parts", None for a fixed label.
+    """
+    rules = [check_grant_rule(rule) for rule in grant_rules]
+    for rule in rules:
+        label_prefix, year_field, label_suffix = rule["label"].partition(
+            "{last_eligible_year}"
+        )
+        rule["label_parts"] = (label_prefix, label_suffix) if year_field else None
+    return rules
+
+
+def evaluate_rules_matrix(
+    rules: List[Dict], researchers_df: pd.DataFrame, reference_dates: List[np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """Calculates for every researcher and every reference date which grant of each scheme they can apply for.
+
+    The date columns used by the rules are parsed once and the years since the PhD are shared between rules with the
+    same PhD date and reference dates. All reference dates are evaluated at once as the columns of a matrix.
+
+    Args:
+        rules (List): The grant rules as returned by prepare_grant_rules.
+        researchers_df (pd.DataFrame): The researchers dataframe.
+        reference_dates (List): For every rule a datetime64[D] array with the reference dates to evaluate, all of
+            the same length.
+
+    Returns:
+        For every scheme column a (researchers x reference dates) object array, None where not eligible.
+    """
+    input_columns = grant_rule_columns(rules)
+    number_of_researchers = len(researchers_df)
+    number_of_dates = len(reference_dates[0]) if reference_dates else 0
+
+    dates = {
+        column: parse_date_column(researchers_df, column)
+        for column in input_columns
+        if column != GENDER_COLUMN
+    }
+    if GENDER_COLUMN in input_columns:
+        is_female = researchers_df[GENDER_COLUMN].eq("Female").to_numpy()
+
+    phd_dates_cache = {}
+    years_cache = {}
+    shape = (number_of_researchers, number_of_dates)
+    eligibility = {}
+    undecided = {}
+    for rule in rules:
+        eligibility.setdefault(rule["column"], np.full(shape, None, dtype=object))
+        undecided.setdefault(rule["column"], np.ones(shape, dtype=bool))
+
+    for rule, rule_reference_dates in zip(rules, reference_dates):
+        phd_key = (rule["phd_column"], rule["female_phd_column"])
+        if phd_key not in phd_dates_cache:
+            phd_dates = dates[rule["phd_column"]]
+            if rule["female_phd_column"]:
+                # Without a date in the PhD column there is no PhD, whatever the female PhD column says.
+                phd_dates = np.where(
+                    is_female & ~np.isnat(phd_dates), dates[rule["female_phd_column"]], phd_dates
+                )
+            phd_dates_cache[phd_key] = phd_dates
+        phd_dates = phd_dates_cache[phd_key]
+
+        years_key = (phd_key, rule_reference_dates.tobytes())
+        if years_key not in years_cache:
+            years_cache[years_key] = years_between(
+                rule_reference_dates[np.newaxis, :], phd_dates[:, np.newaxis]
+            )
+        years_since_phd = years_cache[years_key]
+
+        matches = undecided[rule["column"]] & ~np.isnan(years_since_phd)
+        if rule["min_years"] is not None:
+            if rule["min_inclusive"]:
+                matches &= years_since_phd >= rule["min_years"]
+            else:
+                matches &= years_since_phd > rule["min_years"]
+        if rule["max_years"] is not None:
+            matches &= years_since_phd < rule["max_years"]
+        if rule["max_months_employed"] is not None:
+            months_employed = (
+                (
+                    rule_reference_dates[np.newaxis, :]
+                    - dates[EMPLOYMENT_START_COLUMN][:, np.newaxis]
+                )
+                / np.timedelta64(1, "D")
+                / 30.44
+            )
+            matches &= months_employed <= rule["max_months_employed"]
+
+        if rule["label_parts"]:
+            # The label only depends on the researcher, so it is built once for every researcher that matches.
+            label_prefix, label_suffix = rule["label_parts"]
+            matched_researchers = np.flatnonzero(matches.any(axis=1))
+            labels = np.full(number_of_researchers, None, dtype=object)
+            labels[matched_researchers] = grant_labels(
+                label_prefix,
+                calendar_years(phd_dates[matched_researchers]) + rule["years_eligible"],
+                label_suffix,
+            )
+            eligibility[rule["column"]][matches] = np.broadcast_to(
+                labels[:, np.newaxis], shape
+            )[matches]
+        else:
+            eligibility[rule["column"]][matches] = rule["label"]
+        undecided[rule["column"]] &= ~matches
+
+    return eligibility
+
+
+def reference_date(year: int, month: int, day: int) -> np.datetime64:
+    """Returns the date as a datetime64[D]."""
+    return np.datetime64(f"{year:04d}-{month:02d}-{day:02d}", "D")
+
+
+def compile_grant_rules(
+    grant_rules: List[Dict],
+) -> Callable[[pd.DataFrame, int], pd.DataFrame]:
+    """Compiles the grant rules into one function that evaluates every scheme in a single pass.
+
+    Args:
+        grant_rules (List): The grant rules, see seeds/grant_rules.py.
+
+    Returns:
+        A function that takes the researchers dataframe and the reference year and returns a dataframe with one
+        eligibility column per scheme.
+    """
+    rules = prepare_grant_rules(grant_rules)
+
+    def evaluate_grant_rules(
+        researchers_df: pd.DataFrame, reference_year: int
+    ) -> pd.DataFrame:
+        """Calculates for every researcher which grant of each scheme they can apply for and until when.
+
+        Args:
+            researchers_df (pd.DataFrame): The researchers dataframe.
+            reference_year (int): The year of the grant calls.
+
+        Returns:
+            A dataframe with one column per scheme, None where the researcher is not eligible.
+        """
+        reference_dates = [
+            np.array(
+                [
+                    reference_date(
+                        rule["reference_year"] or reference_year,
+                        rule["reference_month"],
+                        rule["reference_day"],
+                    )
+                ]
+            )
+            for rule in rules
+        ]
+        eligibility = evaluate_rules_matrix(rules, researchers_df, reference_dates)
+        return pd.DataFrame(
+            {column: matrix[:, 0] for column, matrix in eligibility.items()},
+            index=researchers_df.index,
+        )
+
+    return evaluate_grant_rules
+
+
+def compile_grant_projection(
+    grant_rules: List[Dict],
+) -> Callable[..., pd.DataFrame]:
+    """Compiles the grant rules into one function that evaluates every scheme for a range of call years at once.
+
+    In a projection every rule uses the call year for its reference date, also the rules with a fixed
+    reference_year. A call deadline that is known for a grant and year replaces the reference month and day.
+
+    Args:
+        grant_rules (List): The grant rules, see seeds/grant_rules.py.
+
+    Returns:
+        A function that takes the researchers dataframe, the call years and the known call deadlines and returns
+        the eligibility of every researcher in every call year.
+    """
+    rules = prepare_grant_rules(grant_rules)
+
+    def project_grant_rules(
+        researchers_df: pd.DataFrame,
+        call_years: List[int],
+        call_deadlines: Dict[str, Dict[int, str]] | None = None,
+    ) -> pd.DataFrame:
+        """Calculates for every researcher and call year which grant of each scheme they can apply for.
+
+        Args:
+            researchers_df (pd.DataFrame): The researchers dataframe.
+            call_years (List): The call years to project.
+            call_deadlines (Dict | None): Known deadlines by grant name and call year, e.g.
+                {"MSCA PF": {2025: "2025-09-10"}}.
+
+        Returns:
+            A long dataframe with a row per researcher and call year, with the index of the researcher, a "Call
+            year" column and one column per scheme.
+        """
+        call_deadlines = call_deadlines or {}
+        unknown_grants = call_deadlines.keys() - {rule["grant"] for rule in rules}
+        if unknown_grants:
+            raise ValueError(f"Call deadlines of unknown grants {sorted(unknown_grants)}")
+
+        call_years = list(call_years)
+        reference_dates = [
+            np.array(
+                [
+                    np.datetime64(call_deadlines[rule["grant"]][year], "D")
+                    if year in call_deadlines.get(rule["grant"], {})
+                    else reference_date(year, rule["reference_month"], rule["reference_day"])
+                    for year in call_years
+                ]
+            )
+            for rule in rules
+        ]
+        eligibility = evaluate_rules_matrix(rules, researchers_df, reference_dates)
+        return pd.DataFrame(
+            {
+                "Call year": np.tile(call_years, len(researchers_df)),
+                **{column: matrix.ravel() for column, matrix in eligibility.items()},
+            },
+            index=researchers_df.index.repeat(len(call_years)),
+        )
+
+    return project_grant_rules
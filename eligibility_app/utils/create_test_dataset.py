@@ -1,51 +1,342 @@
+import argparse
+import os
+
+import numpy as np
 import pandas as pd
-from datetime import timedelta, datetime
+from seeds.translation_dutch_english import translation_dict
+from utils.parse_dates import parse_date_columns
+from utils.save_df_as_excel import save_and_format_df_as_excel
+
+# Values to draw from for the HR list, the function names are a mix of researchers and support staff.
+FACULTIES = ["TSX: Tilburg School X", "TSY: Tilburg School Y", "CvB: Executive Board"]
+DEPARTMENTS = ["Department A", "Department B", "Department C", "Department D"]
+RESEARCHER_FUNCTION_NAMES = [
+    "Universitair docent",
+    "Universitair hoofddocent",
+    "Hoogleraar",
+    "Onderzoeker",
+    "Researcher/Teacher",
+    "Postdoctoral researcher",
+]
+OTHER_FUNCTION_NAMES = [
+    "Docent",
+    "Teacher / PhD Candidate",
+    "Projectcoördinator",
+    "Beleidsmedewerker",
+    "Secretaresse",
+    "Medewerker ICT",
+]
+FUNCTION_NAMES = RESEARCHER_FUNCTION_NAMES + OTHER_FUNCTION_NAMES
+LAST_NAMES = [
+    "Adams",
+    "Bakker",
+    "Jansen",
+    "Visser",
+    "Smit",
+    "Meijer",
+    "Mulder",
+    "Bos",
+    "Peters",
+    "Hendriks",
+]
+TUSSENVOEGSELS = [None, None, None, None, "de", "van", "van de", "van der"]
+
+# Distributions of the information the grants office adds to the researchers list.
+GENDERS = ["Female", "Male", None]
+GENDER_PROBABILITIES = [0.45, 0.5, 0.05]
+MEAN_CHILDREN = 0.8
+MAX_CHILDREN = 5
+
+# Dates as they are sometimes typed into the HR system, these cannot be parsed.
+MALFORMED_DATES = ["31-02-2020", "unknown", "2020-13-01", "n.v.t."]
+
+# How a name can be written differently in the HR system than in the researchers list:
+# accents:  a vowel of the last name gets an accent, e.g. "Peters" and "Péters".
+# case:     the tussenvoegsel is capitalized, e.g. "van der" and "Van Der", or the last name in capitals without one.
+# initials: all initials are registered, with dots, e.g. "J" and "J.P.".
+# typo:     two letters of the last name are swapped, or one is left out.
+NAME_VARIANTS = ["accents", "case", "initials", "typo"]
+ACCENTED_VOWELS = {"a": "ä", "e": "é", "i": "ï", "o": "ö", "u": "ü"}
+
+
+def create_hr_dataset(
+    num_rows: int,
+    seed: int = 0,
+    researcher_fraction: float | None = None,
+    missing_date_fraction: float = 0.3,
+    malformed_date_fraction: float = 0.0,
+    duplicate_name_fraction: float = 0.0,
+    name_variant_fraction: float = 0.0,
+) -> pd.DataFrame:
+    """Create an HR list with random employees, with the columns of the HR system export.
+
+    Args:
+        num_rows (int): The number of employees.
+        seed (int): The seed of the random generator.
+        researcher_fraction (float | None): The fraction of employees with a researcher function, by default every
+            function name of FUNCTION_NAMES is equally likely.
+        missing_date_fraction (float): The fraction of employees without a PhD defense date.
+        malformed_date_fraction (float): The fraction of dates in the date columns that cannot be parsed.
+        duplicate_name_fraction (float): The fraction of employees that get the last name and initials of another
+            employee.
+        name_variant_fraction (float): The fraction of employees whose name is written differently than in the
+            researchers list created with the same options, see NAME_VARIANTS.
 
-# Constants
-NUM_ROWS = 7670  # Approximately 20 years, considering leap years
-START_DATE = datetime(2005, 1, 1)  # Starting from January 1, 2003
+    Returns:
+        The HR list as a dataframe.
+    """
+    rng = np.random.default_rng(seed)
 
+    def random_dates(start: str, days: int) -> pd.Series:
+        return pd.Series(
+            np.datetime64(start, "s")
+            + rng.integers(0, days, num_rows).astype("timedelta64[D]")
+        )
 
-def create_test_dataset():
-    """Create a test dataset with a range of approx 20 years"""
-    df = pd.DataFrame(
+    faculties = rng.choice(FACULTIES, num_rows)
+    phd_dates = random_dates("1985-01-01", 14000)
+    phd_dates[rng.random(num_rows) < missing_date_fraction] = pd.NaT
+    termination_dates = random_dates("2024-01-01", 3000)
+    termination_dates[rng.random(num_rows) < 0.4] = np.datetime64("9999-12-31", "s")
+
+    if researcher_fraction is None:
+        function_names = rng.choice(FUNCTION_NAMES, num_rows)
+    else:
+        function_names = np.where(
+            rng.random(num_rows) < researcher_fraction,
+            rng.choice(RESEARCHER_FUNCTION_NAMES, num_rows),
+            rng.choice(OTHER_FUNCTION_NAMES, num_rows),
+        )
+
+    hr_df = pd.DataFrame(
         {
-            "First Name": ["Test"] * NUM_ROWS,
-            "Tussenv.": ["T"] * NUM_ROWS,
-            "Last Name": ["User"] * NUM_ROWS,
-            "Initials": ["TU"] * NUM_ROWS,
-            "FTE": [1.0] * NUM_ROWS,
-            "Faculty": ["Test Faculty"] * NUM_ROWS,
-            "Research Group": ["Test Group"] * NUM_ROWS,
-            "PhD Defense Date": [
-                (START_DATE + timedelta(days=i)).strftime("%Y-%m-%d")
-                for i in range(NUM_ROWS)
+            "Faculteit/Dienst": faculties,
+            "Medewerkersgroep": "WP",
+            "Departement/afdeling": [
+                f"{faculty.split(':')[0]}: {department}"
+                for faculty, department in zip(
+                    faculties, rng.choice(DEPARTMENTS, num_rows)
+                )
+            ],
+            "Initialen": rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVW"), num_rows),
+            "Achternaam": [
+                f"{name}{number}"
+                for name, number in zip(
+                    rng.choice(LAST_NAMES, num_rows),
+                    rng.integers(0, max(num_rows // 10, 1), num_rows),
+                )
+            ],
+            "Geboortedatum": random_dates("1950-01-01", 18000),
+            "FTE": rng.integers(1, 11, num_rows) / 10,
+            "Oorspronkelijke indienst datum": random_dates("1990-01-01", 12000),
+            "Einddatum Contract (tot)": termination_dates,
+            "Promotiedatum": phd_dates,
+            "Tussenvoegsel": rng.choice(TUSSENVOEGSELS, num_rows),
+            "Functienaam": function_names,
+            # Columns of the HR system export that the app does not use.
+            "Personeelsnummer": rng.permutation(num_rows) + 100000,
+            "E-mailadres": [
+                f"employee{number}@tilburguniversity.edu" for number in range(num_rows)
             ],
-            "Employment Start Date": ["2024-01-01"] * NUM_ROWS,
-            "Employment Termination Date": [
-                (START_DATE + timedelta(days=NUM_ROWS)).strftime("%Y-%m-%d")
-            ]
-            * NUM_ROWS,
-            "Birth Date": [(START_DATE - timedelta(days=365 * 25)).strftime("%Y-%m-%d")]
-            * NUM_ROWS,
-            # Assuming 25 years old at start
-            "Gender": ["Non-binary"] * NUM_ROWS,
-            "Count of children applicable": [0] * NUM_ROWS,
-            "Remarks": ["No remarks"] * NUM_ROWS,
-            "Children corrected PhD date": ["2023-01-01"] * NUM_ROWS,
+            "Kostenplaats": rng.integers(1000, 9999, num_rows).astype(str),
+            "Salarisschaal": rng.integers(7, 19, num_rows),
+            "Trede": rng.integers(0, 12, num_rows),
+            "Contractsoort": rng.choice(["Vast", "Tijdelijk"], num_rows),
+            "Werkplek": rng.choice(
+                ["Cobbenhagen", "Dante", "Esplanade", "Goldschmeding"], num_rows
+            ),
         }
     )
 
-    # Define the Excel writer using xlsxwriter as the engine
-    writer = pd.ExcelWriter("test_data.xlsx", engine="xlsxwriter")
+    if duplicate_name_fraction:
+        duplicates = np.flatnonzero(rng.random(num_rows) < duplicate_name_fraction)
+        originals = rng.integers(0, num_rows, len(duplicates))
+        name_columns = ["Achternaam", "Initialen"]
+        hr_df.loc[duplicates, name_columns] = hr_df.loc[
+            originals, name_columns
+        ].to_numpy()
+
+    if malformed_date_fraction:
+        for column in [
+            "Geboortedatum",
+            "Oorspronkelijke indienst datum",
+            "Promotiedatum",
+        ]:
+            malformed = rng.random(num_rows) < malformed_date_fraction
+            hr_df[column] = hr_df[column].astype(object)
+            hr_df.loc[malformed, column] = rng.choice(MALFORMED_DATES, malformed.sum())
+
+    # The variants are drawn last, so the other values are the same as in the researchers list.
+    if name_variant_fraction:
+        variants = np.flatnonzero(rng.random(num_rows) < name_variant_fraction)
+        name_columns = ["Achternaam", "Initialen", "Tussenvoegsel"]
+        hr_df.loc[variants, name_columns] = [
+            write_name_variant(rng, variant, *name)
+            for variant, name in zip(
+                rng.choice(NAME_VARIANTS, len(variants)),
+                hr_df.loc[variants, name_columns].itertuples(index=False),
+            )
+        ]
+
+    return hr_df
 
-    # Convert the dataframe to an XlsxWriter Excel object.
-    # Use `startrow=1` to start writing from the second row.
-    df.to_excel(writer, sheet_name="Sheet1", index=False, startrow=1)
 
-    # Close the Pandas Excel writer and output the Excel file
-    writer._save()
+def write_name_variant(
+    rng: np.random.Generator,
+    variant: str,
+    last_name: str,
+    initials: str,
+    tussenvoegsel: str | None,
+) -> tuple[str, str, str | None]:
+    """Writes the name of an employee differently, see NAME_VARIANTS.
+
+    Returns:
+        The last name, initials and tussenvoegsel.
+    """
+    # The letters of the last name, without the number that makes it unique.
+    letters = len(last_name.rstrip("0123456789"))
+    if variant == "accents":
+        vowels = [
+            position
+            for position in range(letters)
+            if last_name[position] in ACCENTED_VOWELS
+        ]
+        position = rng.choice(vowels)
+        last_name = (
+            last_name[:position]
+            + ACCENTED_VOWELS[last_name[position]]
+            + last_name[position + 1 :]
+        )
+    elif variant == "case":
+        if tussenvoegsel:
+            tussenvoegsel = tussenvoegsel.title()
+        else:
+            last_name = last_name.upper()
+    elif variant == "initials":
+        initials = (
+            ".".join(
+                [
+                    initials,
+                    *rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVW"), rng.integers(1, 3)),
+                ]
+            )
+            + "."
+        )
+    else:
+        position = rng.integers(1, letters - 1)
+        if rng.random() < 0.5:
+            last_name = (
+                last_name[:position]
+                + last_name[position + 1]
+                + last_name[position]
+                + last_name[position + 2 :]
+            )
+        else:
+            last_name = last_name[:position] + last_name[position + 1 :]
+    return last_name, initials, tussenvoegsel
+
+
+def save_hr_dataset(hr_df: pd.DataFrame, path: str) -> None:
+    """Save an HR list in the layout of the HR system export, the table starts on the third row.
+
+    Args:
+        hr_df (pd.DataFrame): The HR list.
+        path (str): Where to save the Excel file.
+    """
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        hr_df.to_excel(writer, sheet_name="Sheet1", index=False, startrow=2)
+        writer.sheets["Sheet1"].write(0, 0, "Geëxporteerd naar Excel")
+
+
+def create_researchers_dataset(
+    num_rows: int, seed: int = 0, **hr_options
+) -> pd.DataFrame:
+    """Create a researchers list with random researchers, with the columns of the researchers list of this app. The
+    employees are the same as in the HR list created with the same number of rows, seed and options.
+
+    Args:
+        num_rows (int): The number of researchers.
+        seed (int): The seed of the random generator.
+        **hr_options: The options of create_hr_dataset, the names are written without variants.
+
+    Returns:
+        The researchers list as a dataframe with typed date columns.
+    """
+    rng = np.random.default_rng(seed)
+    researchers_df = parse_date_columns(
+        create_hr_dataset(
+            num_rows, seed=seed, **{**hr_options, "name_variant_fraction": 0.0}
+        ).rename(columns=translation_dict)
+    )
+    researchers_df.insert(
+        0, "First Name", [f"Researcher{number}" for number in range(num_rows)]
+    )
+    researchers_df["Gender"] = rng.choice(GENDERS, num_rows, p=GENDER_PROBABILITIES)
+    researchers_df["Count of children applicable"] = np.minimum(
+        rng.poisson(MEAN_CHILDREN, num_rows), MAX_CHILDREN
+    )
+    researchers_df["Remarks"] = None
+    researchers_df["Children corrected PhD date"] = researchers_df["PhD Defense Date"]
+    return researchers_df[
+        [
+            "First Name",
+            "Tussenv.",
+            "Last name",
+            "Initials",
+            "FTE",
+            "Faculty",
+            "Research Group",
+            "PhD Defense Date",
+            "Employment Start Date",
+            "Employment Termination Date",
+            "Function",
+            "Birth Date",
+            "Gender",
+            "Count of children applicable",
+            "Remarks",
+            "Children corrected PhD date",
+        ]
+    ]
 
 
 if __name__ == "__main__":
-    create_test_dataset()
+    parser = argparse.ArgumentParser(
+        description="Create an HR list and a researchers list with random employees."
+    )
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--researcher-fraction", type=float)
+    parser.add_argument("--missing-date-fraction", type=float, default=0.3)
+    parser.add_argument("--malformed-date-fraction", type=float, default=0.0)
+    parser.add_argument("--duplicate-name-fraction", type=float, default=0.0)
+    parser.add_argument("--name-variant-fraction", type=float, default=0.0)
+    parser.add_argument("--directory", default=".")
+    arguments = parser.parse_args()
+
+    dataset_options = {
+        "researcher_fraction": arguments.researcher_fraction,
+        "missing_date_fraction": arguments.missing_date_fraction,
+        "malformed_date_fraction": arguments.malformed_date_fraction,
+        "duplicate_name_fraction": arguments.duplicate_name_fraction,
+    }
+    os.makedirs(arguments.directory, exist_ok=True)
+    hr_path = os.path.join(arguments.directory, "test_hr_list.xlsx")
+    save_hr_dataset(
+        create_hr_dataset(
+            arguments.rows,
+            seed=arguments.seed,
+            name_variant_fraction=arguments.name_variant_fraction,
+            **dataset_options,
+        ),
+        hr_path,
+    )
+    researchers_path = os.path.join(arguments.directory, "test_researchers_list.xlsx")
+    with open(researchers_path, "wb") as researchers_file:
+        researchers_file.write(
+            save_and_format_df_as_excel(
+                create_researchers_dataset(
+                    arguments.rows, seed=arguments.seed, **dataset_options
+                )
+            )
+        )
+    print(f"Saved {hr_path} and {researchers_path}")
@@ -0,0 +1,100 @@
+"""The compact dtypes of the researchers frames, to limit the memory every session holds.
+
+Columns with few distinct values are categoricals, the FTE is a float32 and the children count a nullable uint8.
+Dates are datetime64[s], see utils.parse_dates.
+"""
+
+import numpy as np
+import pandas as pd
+from seeds.grant_rules import grant_rules
+from utils.parse_dates import format_date_columns
+
+# The organisational columns, the gender and the eligibility labels repeat a few values over many rows.
+CATEGORY_COLUMNS = ["Faculty", "Research Group", "Function", "Gender"] + list(
+    dict.fromkeys(rule["column"] for rule in grant_rules)
+)
+FTE_COLUMN = "FTE"
+FTE_DTYPE = "float32"
+CHILDREN_COLUMN = "Count of children applicable"
+CHILDREN_DTYPE = "UInt8"
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Applies the compact dtypes to the columns of the schema that are in the dataframe.
+
+    A numeric column with values that do not fit its compact dtype (e.g. a children count of 1.5) is left as it is,
+    utils.validate_input reports those values.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers list with English column names.
+
+    Returns:
+        A copy of the dataframe with the compact dtypes.
+    """
+    dtypes = {
+        column: "category"
+        for column in CATEGORY_COLUMNS
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+    if FTE_COLUMN in df.columns and pd.api.types.is_float_dtype(df[FTE_COLUMN]):
+        dtypes[FTE_COLUMN] = FTE_DTYPE
+    if CHILDREN_COLUMN in df.columns and pd.api.types.is_numeric_dtype(df[CHILDREN_COLUMN]):
+        children_count = df[CHILDREN_COLUMN].dropna()
+        limits = np.iinfo(CHILDREN_DTYPE.lower())
+        if (
+            children_count.mod(1).eq(0).all()
+            and children_count.between(limits.min, limits.max).all()
+        ):
+            dtypes[CHILDREN_COLUMN] = CHILDREN_DTYPE
+    return df.astype(dtypes)
+
+
+def widen_float32(values: pd.Series) -> pd.Series:
+    """Converts a float32 column to float64 with the numbers it shows, 0.8 instead of 0.800000011920929. Other
+    columns are returned as they are."""
+    if values.dtype != np.float32:
+        return values
+    return values.astype(str).astype("float64")
+
+
+def without_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the dataframe with the dtypes pd.read_excel gives without a schema, text columns and dates as objects
+    and numbers as float64."""
+    df = format_date_columns(df)
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            df[column] = df[column].astype("float64")
+    return df
+
+
+def frame_megabytes(df: pd.DataFrame) -> float:
+    """Returns the memory of the dataframe in megabytes, including the text in object columns."""
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def memory_report(frames: list) -> pd.DataFrame:
+    """Compares the memory of the frames a session holds with the memory they would need without the schema.
+
+    Args:
+        frames (list): The name and dataframe of every frame, e.g. StageTimer.frames.
+
+    Returns:
+        One row per frame and a total row.
+    """
+    report = pd.DataFrame(
+        [
+            {
+                "Frame": name,
+                "Rows": len(df),
+                "Memory (MB)": frame_megabytes(df),
+                "Without schema (MB)": frame_megabytes(without_schema(df)),
+            }
+            for name, df in frames
+        ],
+        columns=["Frame", "Rows", "Memory (MB)", "Without schema (MB)"],
+    )
+    total = report[["Memory (MB)", "Without schema (MB)"]].sum()
+    report.loc[len(report)] = ["Total", report["Rows"].sum(), *total]
+    return report.round(2)
@@ -1,24 +1,76 @@
 """Helper functions for the eligibility project."""
 
+import re
+from functools import lru_cache
 from typing import List
 
+import numpy as np
 import pandas as pd
 
 
+@lru_cache(maxsize=32)
+def compile_function_name_pattern(function_names: tuple) -> re.Pattern:
+    """Compiles the function names into one case-insensitive pattern that matches any of them.
+
+    Args:
+        function_names (tuple): The function names (or regular expressions) to match.
+
+    Returns:
+        The compiled pattern.
+    """
+    return re.compile("|".join(function_names), flags=re.IGNORECASE)
+
+
+def match_function_names(
+    functions: pd.Series, function_names: List, excluded_function_names: List = ()
+) -> np.ndarray:
+    """
+    Checks for every row whether the function contains any of the function names and none of the excluded names.
+    Every distinct function is only matched once, so this scales with the number of distinct functions.
+
+    Args:
+        functions (pd.Series): The functions of the employees.
+        function_names (List): The function names to include.
+        excluded_function_names (List): The function names to exclude, even when an included name matches.
+
+    Returns:
+        A boolean array, True for the rows to keep. Missing functions are never kept.
+    """
+    codes, distinct_functions = pd.factorize(functions)
+    pattern = compile_function_name_pattern(tuple(function_names))
+    keep = np.array(
+        [bool(pattern.search(str(function))) for function in distinct_functions],
+        dtype=bool,
+    )
+    if excluded_function_names:
+        excluded_pattern = compile_function_name_pattern(tuple(excluded_function_names))
+        keep &= np.array(
+            [not excluded_pattern.search(str(function)) for function in distinct_functions],
+            dtype=bool,
+        )
+
+    # Missing functions get code -1, which picks the appended False.
+    return np.append(keep, False)[codes]
+
+
 def filter_out_function_names(
-    hr_list: pd.DataFrame, function_names: List
+    hr_list: pd.DataFrame, function_names: List, excluded_function_names: List = ()
 ) -> pd.DataFrame:
     """
-    filters out all functions that do not at least contain any part of the entries in the function_name list.
+    filters out all functions that do not at least contain any part of the entries in the function_name list, or
+    that contain any part of the entries in the excluded_function_names list.
 
     Args:
         hr_list (pd.Dataframe): The hr-list df. Needs to contain column "Functienaam"
         function_names (List): A list of all function names to filter on.
+        excluded_function_names (List): A list of function names to filter out.
 
     Returns:
         A filtered hr list dataframe.
     """
     filtered_df = hr_list[
-        hr_list["Functienaam"].str.contains("|".join(function_names), case=False)
+        match_function_names(
+            hr_list["Functienaam"], function_names, excluded_function_names
+        )
     ]
     return filtered_df
@@ -0,0 +1,135 @@
+"""Functions to find the employees that changed between the previous researchers list and a new HR list."""
+
+import numpy as np
+import pandas as pd
+from utils.dtype_schema import widen_float32
+
+# Identifies an employee in both lists.
+EMPLOYEE_KEY = ["Last name", "Initials", "Birth Date"]
+
+# The columns of the researchers list that come from the HR list. The PhD defense date is left out, as the grants
+# office's PhD date has priority over the HR list.
+HR_FIELDS = [
+    "Tussenv.",
+    "Last name",
+    "Initials",
+    "FTE",
+    "Faculty",
+    "Research Group",
+    "Employment Start Date",
+    "Employment Termination Date",
+    "Function",
+    "Birth Date",
+]
+
+
+def fingerprint_rows(df: pd.DataFrame, columns: list) -> pd.Series:
+    """Calculates a hash of the given columns for every row.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers dataframe.
+        columns (list): The columns to include in the hash.
+
+    Returns:
+        A uint64 hash for every row.
+    """
+    return pd.util.hash_pandas_object(df[columns], index=False)
+
+
+def describe_changed_fields(
+    new_rows: pd.DataFrame, previous_rows: pd.DataFrame
+) -> pd.Series:
+    """Describes for every pair of rows which HR fields changed, like "FTE: 0.8 -> 1.0".
+
+    Args:
+        new_rows (pd.DataFrame): The rows of the new HR list.
+        previous_rows (pd.DataFrame): The matching rows of the previous researchers list, in the same order.
+
+    Returns:
+        The description of the changed fields of every row.
+    """
+    descriptions = [[] for _ in range(len(new_rows))]
+    for field in HR_FIELDS:
+        # Categoricals of the two lists have different categories, which cannot be compared directly.
+        new_values = widen_float32(new_rows[field]).reset_index(drop=True).astype(object)
+        previous_values = (
+            widen_float32(previous_rows[field]).reset_index(drop=True).astype(object)
+        )
+        changed = new_values.ne(previous_values) & ~(
+            new_values.isna() & previous_values.isna()
+        )
+        for position in np.flatnonzero(changed.to_numpy()):
+            descriptions[position].append(
+                f"{field}: {previous_values[position]} -> {new_values[position]}"
+            )
+    return pd.Series(["; ".join(fields) for fields in descriptions], index=new_rows.index)
+
+
+def compare_hr_lists(
+    filtered_hr_df: pd.DataFrame, researchers_df: pd.DataFrame
+) -> tuple[pd.Series, pd.DataFrame]:
+    """Compares the new filtered HR list with the previous researchers list.
+
+    Employees whose name, initials and birth date occur more than once in either list are always reprocessed.
+
+    Args:
+        filtered_hr_df (pd.DataFrame): The new HR list, filtered on researchers and with English column names.
+        researchers_df (pd.DataFrame): The previous researchers list.
+
+    Returns:
+        For every row of the HR list the position of the unchanged row in the researchers list, -1 when the row has
+        to be reprocessed. And a change report with the added, removed and modified employees.
+    """
+    new_keys = fingerprint_rows(filtered_hr_df, EMPLOYEE_KEY)
+    previous_keys = fingerprint_rows(researchers_df, EMPLOYEE_KEY)
+
+    # Look up the previous row of every employee with a unique key in both lists.
+    unique_previous = ~previous_keys.duplicated(keep=False).to_numpy()
+    previous_lookup = pd.Series(
+        np.flatnonzero(unique_previous), index=previous_keys[unique_previous].to_numpy()
+    )
+    previous_positions = (
+        new_keys.map(previous_lookup)
+        .where(~new_keys.duplicated(keep=False))
+        .fillna(-1)
+        .astype(np.int64)
+    )
+    matched = previous_positions.ge(0)
+
+    new_fingerprints = fingerprint_rows(filtered_hr_df, HR_FIELDS)
+    previous_fingerprints = fingerprint_rows(researchers_df, HR_FIELDS)
+    unchanged = matched.copy()
+    unchanged[matched] = (
+        new_fingerprints[matched].to_numpy()
+        == previous_fingerprints.iloc[previous_positions[matched]].to_numpy()
+    )
+
+    added = ~new_keys.isin(previous_keys)
+    modified = ~added & ~unchanged
+    removed = ~previous_keys.isin(new_keys)
+
+    changed_fields = pd.Series(
+        "Occurs more than once, reprocessed", index=filtered_hr_df.index
+    )
+    modified_and_matched = modified & matched
+    changed_fields[modified_and_matched] = describe_changed_fields(
+        filtered_hr_df[modified_and_matched],
+        researchers_df.iloc[previous_positions[modified_and_matched]],
+    )
+
+    change_report = pd.concat(
+        [
+            filtered_hr_df.loc[added, EMPLOYEE_KEY].assign(
+                Change="Added", **{"Changed fields": ""}
+            ),
+            researchers_df.loc[removed, EMPLOYEE_KEY].assign(
+                Change="Removed", **{"Changed fields": ""}
+            ),
+            filtered_hr_df.loc[modified, EMPLOYEE_KEY].assign(
+                Change="Modified", **{"Changed fields": changed_fields[modified]}
+            ),
+        ],
+        ignore_index=True,
+    )[["Change"] + EMPLOYEE_KEY + ["Changed fields"]]
+
+    return previous_positions.where(unchanged, -1), change_report
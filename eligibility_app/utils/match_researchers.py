@@ -0,0 +1,469 @@
+"""Functions to match the rows of the HR list with the rows of the researchers list."""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# How the researchers list may be linked to the HR list:
+# one_to_one:  every row of the researchers list links to at most one row of the HR list.
+# one_to_many: a row of the researchers list may link to several rows of the HR list (e.g. multiple appointments).
+VALIDATION_MODES = ["one_to_many", "one_to_one"]
+
+# Words of a name that are part of a tussenvoegsel, wherever they are written (e.g. "Berg, van den" or "van den Berg").
+NAME_PARTICLES = {
+    "aan", "da", "de", "del", "den", "der", "du", "het", "in", "la", "le", "op", "t", "te", "ten", "ter", "van",
+    "von", "zu",
+}
+
+# Spellings that sound the same in Dutch names, replaced in order by the phonetic key.
+PHONETIC_REPLACEMENTS = [
+    ("sch", "s"), ("ij", "y"), ("ei", "y"), ("ck", "k"), ("ph", "f"), ("dt", "t"), ("th", "t"), ("c", "k"),
+    ("z", "s"), ("w", "v"), ("q", "k"), ("x", "ks"),
+]
+
+# Blocks with more rows of the researchers list than this give no candidates, so a very common surname does not make
+# the comparison quadratic. Those rows can still be candidates on their birth date.
+MAX_BLOCK_SIZE = 500
+
+# How much every part of a candidate counts in its score, the birth date only when both rows have one.
+SCORE_WEIGHTS = {"surname": 0.5, "particles": 0.1, "initials": 0.2, "birth_date": 0.3}
+
+# Candidates from this score on are linked, when they are clearly the best candidate of both rows.
+AUTO_LINK_SCORE = 0.9
+# Candidates from this score on are reported for review.
+REVIEW_SCORE = 0.7
+# The minimal difference with the next best candidate of both rows to link a candidate.
+AUTO_LINK_MARGIN = 0.05
+
+
+def normalize_name(name: str) -> str:
+    """Normalizes a name for matching: casefolded, without diacritics and with single spaces."""
+    if not name.isascii():
+        name = "".join(
+            character
+            for character in unicodedata.normalize("NFKD", name)
+            if not unicodedata.combining(character)
+        )
+    return " ".join(name.casefold().split())
+
+
+def factorize_normalized(values: pd.Series, remove: str = "") -> np.ndarray:
+    """Gives every row a code for its normalized name, every distinct value is normalized only once.
+
+    Args:
+        values (pd.Series): The names.
+        remove (str): Characters to remove from the names as well, e.g. the dots between initials.
+
+    Returns:
+        The code of every row, -1 for missing names.
+    """
+    codes, uniques = pd.factorize(values)
+    normalized = [normalize_name(str(name)) for name in uniques]
+    if remove:
+        removal_table = str.maketrans("", "", remove)
+        normalized = [name.translate(removal_table) for name in normalized]
+    normalized_codes = pd.factorize(np.array(normalized, dtype=object))[0]
+    return np.append(normalized_codes, -1)[codes]
+
+
+def build_join_keys(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Builds the integer keys to match employees on from the normalized last name and initials.
+
+    Args:
+        filtered_hr_df (pd.DataFrame): The HR list, filtered on researchers and with English column names.
+        researchers_df (pd.DataFrame): The researchers list.
+        include_tussenvoegsel (bool): Whether the tussenvoegsel (e.g. "van der") is part of the key.
+        include_birth_date (bool): Whether the birth date is part of the key.
+
+    Returns:
+        The keys of the rows of the HR list and of the researchers list, equal keys mean the same employee.
+    """
+
+    def both_lists(column: str) -> pd.Series:
+        return pd.concat(
+            [filtered_hr_df[column], researchers_df[column]], ignore_index=True
+        )
+
+    parts = [
+        factorize_normalized(both_lists("Last name")),
+        factorize_normalized(both_lists("Initials"), remove=". "),
+    ]
+    if include_tussenvoegsel:
+        parts.append(factorize_normalized(both_lists("Tussenv.")))
+    if include_birth_date:
+        parts.append(pd.factorize(both_lists("Birth Date"))[0])
+
+    # Combine the codes of the parts into a single code per distinct combination.
+    keys = parts[0]
+    for codes in parts[1:]:
+        keys = pd.factorize(keys * (codes.max() + 2) + codes + 1)[0]
+    return keys[: len(filtered_hr_df)], keys[len(filtered_hr_df) :]
+
+
+def index_join_keys(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    columns: list,
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[pd.Series, pd.DataFrame, pd.Series]:
+    """Builds the join keys of both lists and counts the different rows of the researchers list per key.
+
+    Returns:
+        The key of every row of the HR list, the distinct rows of the researchers list (the looked up columns and
+        the key in "join_key") and the number of those rows per key.
+    """
+    hr_keys, researchers_keys = build_join_keys(
+        filtered_hr_df,
+        researchers_df,
+        include_tussenvoegsel=include_tussenvoegsel,
+        include_birth_date=include_birth_date,
+    )
+    researchers_rows = (
+        researchers_df[columns].assign(join_key=researchers_keys).drop_duplicates()
+    )
+    return (
+        pd.Series(hr_keys, index=filtered_hr_df.index),
+        researchers_rows,
+        researchers_rows["join_key"].value_counts(),
+    )
+
+
+def ambiguity_reasons(
+    hr_keys: pd.Series, researchers_key_counts: pd.Series, validate: str = "one_to_many"
+) -> pd.Series:
+    """Explains for every row of the HR list why it cannot be linked unambiguously, see link_researchers.
+
+    Args:
+        hr_keys (pd.Series): The join key of every row of the HR list.
+        researchers_key_counts (pd.Series): The number of different rows of the researchers list per key.
+        validate (str): one_to_many or one_to_one, see VALIDATION_MODES.
+
+    Returns:
+        The reason of every row of the HR list, empty when the row is not ambiguous.
+    """
+    matches = hr_keys.map(researchers_key_counts).fillna(0).astype(np.int64)
+    reasons = pd.Series("", index=hr_keys.index)
+    reasons[matches.gt(1)] = (
+        "Matches " + matches[matches.gt(1)].astype(str) + " different rows of the researchers list"
+    )
+    if validate == "one_to_one":
+        shared = hr_keys.duplicated(keep=False) & matches.eq(1)
+        hr_key_counts = hr_keys.map(hr_keys.value_counts())
+        reasons[shared] = (
+            "Shares a researchers list row with "
+            + (hr_key_counts[shared] - 1).astype(str)
+            + " other rows of the HR list"
+        )
+    return reasons
+
+
+def find_ambiguous_rows(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    columns: list,
+    validate: str = "one_to_many",
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> pd.Series:
+    """Returns for every row of the HR list whether link_researchers leaves it unlinked as ambiguous, with the same
+    arguments."""
+    hr_keys, _, researchers_key_counts = index_join_keys(
+        filtered_hr_df, researchers_df, columns, include_tussenvoegsel, include_birth_date
+    )
+    return ambiguity_reasons(hr_keys, researchers_key_counts, validate).ne("")
+
+
+def link_researchers(
+    filtered_hr_df: pd.DataFrame,
+    researchers_df: pd.DataFrame,
+    columns: list,
+    validate: str = "one_to_many",
+    include_tussenvoegsel: bool = False,
+    include_birth_date: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Looks up the row of the researchers list of every row of the HR list in a hash index on the join key.
+
+    Rows of the researchers list with exactly the same information count as one. Rows of the HR list that match
+    several different rows of the researchers list (or, with one_to_one, share their key with other rows of the HR
+    list) are ambiguous. They are not linked and reported instead.
+
+    Args:
+        filtered_hr_df (pd.DataFrame): The HR list, filtered on researchers and with English column names.
+        researchers_df (pd.DataFrame): The researchers list.
+        columns (list): The columns of the researchers list to look up.
+        validate (str): one_to_many or one_to_one, see VALIDATION_MODES.
+        include_tussenvoegsel (bool): Whether the tussenvoegsel is part of the join key.
+        include_birth_date (bool): Whether the birth date is part of the join key.
+
+    Returns:
+        The looked up columns for every row of the HR list (empty when not linked), with the index of the HR list.
+        And a report of the ambiguous rows of the HR list.
+    """
+    if validate not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation {validate}, choose from {VALIDATION_MODES}")
+
+    hr_keys, researchers_rows, researchers_key_counts = index_join_keys(
+        filtered_hr_df, researchers_df, columns, include_tussenvoegsel, include_birth_date
+    )
+
+    # Build the hash index of the researchers list on the keys that occur once.
+    unique_rows = researchers_rows[
+        researchers_rows["join_key"].map(researchers_key_counts).eq(1)
+    ]
+    index = unique_rows.set_index("join_key")[columns]
+
+    linked_df = index.reindex(hr_keys.to_numpy()).set_axis(filtered_hr_df.index)
+
+    reasons = ambiguity_reasons(hr_keys, researchers_key_counts, validate)
+    ambiguous = reasons.ne("")
+    linked_df.loc[ambiguous] = np.nan
+
+    ambiguous_matches = filtered_hr_df.loc[
+        ambiguous, ["Last name", "Initials", "Tussenv.", "Birth Date", "Function"]
+    ].assign(Reason=reasons[ambiguous])
+
+    return linked_df, ambiguous_matches
+
+
+def split_surname(tussenvoegsels: pd.Series, last_names: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Splits the tussenvoegsel and last name of every row in the core surname and the name particles, so it does not
+    matter in which column a particle is written.
+
+    Returns:
+        The core surname (normalized, without spaces and punctuation) and the sorted particles of every row. Every
+        distinct name is only split once.
+    """
+    full_names = tussenvoegsels.fillna("").astype(str) + " " + last_names.fillna("").astype(str)
+    codes, uniques = pd.factorize(full_names)
+    cores, particles = [], []
+    for name in uniques:
+        words = re.sub(r"[^\w ]", " ", normalize_name(name)).split()
+        core_words = [word for word in words if word not in NAME_PARTICLES]
+        cores.append("".join(core_words or words))
+        particles.append(" ".join(sorted(word for word in words if word in NAME_PARTICLES)))
+    return np.array(cores, dtype=object)[codes], np.array(particles, dtype=object)[codes]
+
+
+def spelling_key(surname: str) -> str:
+    """Writes the spellings of a core surname that sound the same in one way, e.g. Meijer and Meyer."""
+    for spelling, sound in PHONETIC_REPLACEMENTS:
+        surname = surname.replace(spelling, sound)
+    return surname
+
+
+def phonetic_key(surname: str) -> str:
+    """Reduces a core surname to how it sounds: the same key for e.g. Janssen and Jansen or Bakker and Backer."""
+    surname = spelling_key(surname)
+    if not surname:
+        return ""
+    # Keep the first letter, drop the other vowels and repeated letters.
+    key = surname[0] + re.sub("[aeiouy]", "", surname[1:])
+    return re.sub(r"(.)\1+", r"\1", key)
+
+
+def name_bigrams(name: str) -> frozenset:
+    """Returns the pairs of consecutive characters of a name, including its first and last character."""
+    padded = f" {name} "
+    return frozenset(padded[position : position + 2] for position in range(len(padded) - 1))
+
+
+def block_candidates(hr_blocks: np.ndarray, researchers_blocks: np.ndarray) -> pd.DataFrame:
+    """Pairs the rows of both lists that are in the same block, rows without a block (None) are not paired.
+
+    Returns:
+        The positions of the paired rows in the HR rows ("hr") and in the researchers rows ("researchers").
+    """
+    hr_rows = pd.DataFrame({"block": hr_blocks, "hr": np.arange(len(hr_blocks))}).dropna()
+    researchers_rows = pd.DataFrame(
+        {"block": researchers_blocks, "researchers": np.arange(len(researchers_blocks))}
+    ).dropna()
+    block_sizes = researchers_rows["block"].map(researchers_rows["block"].value_counts())
+    researchers_rows = researchers_rows[block_sizes.le(MAX_BLOCK_SIZE)]
+    return hr_rows.merge(researchers_rows, on="block")[["hr", "researchers"]]
+
+
+def score_candidates(
+    candidates: pd.DataFrame, hr_rows: pd.DataFrame, researchers_rows: pd.DataFrame
+) -> np.ndarray:
+    """Scores how likely every candidate pair is the same employee, from 0 to 1.
+
+    The score is the weighted average of the similarity of the core surnames (the Dice coefficient of the character
+    pairs of their spelling keys), equal name particles, equal initials (0.5 when only the first initial is equal) and an equal
+    birth date. The birth date only counts when both rows have one.
+
+    Args:
+        candidates (pd.DataFrame): The positions of the paired rows, see block_candidates.
+        hr_rows (pd.DataFrame): The core surname, particles, initials and birth date of the HR rows.
+        researchers_rows (pd.DataFrame): The same of the researchers rows.
+
+    Returns:
+        The score of every candidate.
+    """
+    hr = hr_rows.iloc[candidates["hr"].to_numpy()].reset_index(drop=True)
+    researchers = researchers_rows.iloc[candidates["researchers"].to_numpy()].reset_index(drop=True)
+
+    # Compare every distinct pair of surnames once.
+    surname_pairs = hr["surname"] + "|" + researchers["surname"]
+    codes, uniques = pd.factorize(surname_pairs)
+    bigrams = {}
+    for pair in uniques:
+        for name in pair.split("|"):
+            if name not in bigrams:
+                bigrams[name] = name_bigrams(spelling_key(name))
+    dice = np.array(
+        [
+            2 * len(bigrams[first] & bigrams[second]) / (len(bigrams[first]) + len(bigrams[second]))
+            for first, second in (pair.split("|") for pair in uniques)
+        ],
+        dtype=np.float64,
+    )
+    surname_scores = dice[codes] if len(codes) else np.zeros(0)
+
+    particle_scores = (hr["particles"] == researchers["particles"]).to_numpy(dtype=np.float64)
+
+    both_initials = hr["initials"].ne("") & researchers["initials"].ne("")
+    initial_scores = np.where(
+        hr["initials"] == researchers["initials"],
+        1.0,
+        np.where(hr["initials"].str[:1] == researchers["initials"].str[:1], 0.5, 0.0),
+    )
+
+    both_birth_dates = (hr["birth_date"].notna() & researchers["birth_date"].notna()).to_numpy()
+    birth_date_scores = (hr["birth_date"] == researchers["birth_date"]).to_numpy(dtype=np.float64)
+
+    weighted = (
+        SCORE_WEIGHTS["surname"] * surname_scores
+        + SCORE_WEIGHTS["particles"] * particle_scores
+        + SCORE_WEIGHTS["initials"] * np.where(both_initials, initial_scores, 0.0)
+        + SCORE_WEIGHTS["birth_date"] * np.where(both_birth_dates, birth_date_scores, 0.0)
+    )
+    total_weight = (
+        SCORE_WEIGHTS["surname"]
+        + SCORE_WEIGHTS["particles"]
+        + SCORE_WEIGHTS["initials"] * both_initials.to_numpy()
+        + SCORE_WEIGHTS["birth_date"] * both_birth_dates
+    )
+    return weighted / total_weight
+
+
+def name_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the parts of the names and the birth date that candidates are blocked and scored on."""
+    surnames, particles = split_surname(df["Tussenv."], df["Last name"])
+    codes, uniques = pd.factorize(df["Initials"])
+    initials = np.array(
+        [normalize_name(str(value)).translate(str.maketrans("", "", ". ")) for value in uniques] + [""],
+        dtype=object,
+    )
+    return pd.DataFrame(
+        {
+            "surname": surnames,
+            "particles": particles,
+            "initials": initials[codes],
+            "birth_date": df["Birth Date"].to_numpy(),
+        },
+        index=df.index,
+    )
+
+
+def describe_researchers(df: pd.DataFrame) -> pd.Series:
+    """Describes the rows of the researchers list by their name and birth date, for the review report."""
+    name_parts = [df[column].astype(object).fillna("").astype(str) for column in ("Initials", "Tussenv.", "Last name")]
+    names = (name_parts[0] + " " + name_parts[1] + " " + name_parts[2]).str.split().str.join(" ")
+    birth_dates = pd.to_datetime(df["Birth Date"]).dt.strftime(" (%Y-%m-%d)").fillna("")
+    return names + birth_dates
+
+
+def link_similar_researchers(
+    unmatched_hr_df: pd.DataFrame,
+    unused_researchers_df: pd.DataFrame,
+    columns: list,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Links the HR rows that have no exact match to the researchers list rows with a similar name, e.g. after a
+    change in the spelling of the name or in the column of the tussenvoegsel.
+
+    Only rows in the same block are compared: rows with the same phonetic key of the core surname, and rows with the
+    same birth date. A pair is linked when its score is at least AUTO_LINK_SCORE and it is clearly the best candidate
+    of both rows. The other HR rows with a candidate from REVIEW_SCORE on are reported for review and not linked.
+
+    Args:
+        unmatched_hr_df (pd.DataFrame): The rows of the HR list without an exact match.
+        unused_researchers_df (pd.DataFrame): The rows of the researchers list that no HR row matches exactly.
+        columns (list): The columns of the researchers list to look up.
+
+    Returns:
+        The looked up columns of the linked HR rows, with the index of the HR list. And a report of the linked and
+        the reviewed HR rows with the reason.
+    """
+    report_columns = ["Last name", "Initials", "Tussenv.", "Birth Date", "Function"]
+    hr_rows = name_features(unmatched_hr_df)
+    researchers_rows = name_features(unused_researchers_df)
+
+    def blocks(rows: pd.DataFrame, column: str) -> np.ndarray:
+        if column == "surname":
+            codes, uniques = pd.factorize(rows["surname"])
+            keys = np.array([phonetic_key(name) or None for name in uniques] + [None], dtype=object)
+            return keys[codes]
+        return rows["birth_date"].astype(object).where(rows["birth_date"].notna(), None).to_numpy()
+
+    candidates = (
+        pd.concat(
+            [
+                block_candidates(blocks(hr_rows, column), blocks(researchers_rows, column))
+                for column in ("surname", "birth_date")
+            ]
+        )
+        .drop_duplicates()
+        .reset_index(drop=True)
+    )
+    candidates["score"] = score_candidates(candidates, hr_rows, researchers_rows)
+    candidates = candidates[candidates["score"].ge(REVIEW_SCORE)]
+
+    # The margin of every candidate to the next best candidate of its HR row and of its researchers row.
+    candidates = candidates.sort_values("score", ascending=False, kind="stable")
+    margins = []
+    for side in ("hr", "researchers"):
+        second = candidates[candidates.groupby(side).cumcount().eq(1)]
+        next_best = candidates[side].map(second.set_index(side)["score"]).fillna(0.0)
+        margins.append(candidates["score"] - next_best)
+    best_of_both = ~candidates.duplicated("hr") & ~candidates.duplicated("researchers")
+    linked = (
+        best_of_both
+        & candidates["score"].ge(AUTO_LINK_SCORE)
+        & margins[0].ge(AUTO_LINK_MARGIN)
+        & margins[1].ge(AUTO_LINK_MARGIN)
+    )
+
+    linked_pairs = candidates[linked]
+    linked_index = unmatched_hr_df.index[linked_pairs["hr"].to_numpy()]
+    linked_df = (
+        unused_researchers_df[columns]
+        .iloc[linked_pairs["researchers"].to_numpy()]
+        .set_axis(linked_index)
+    )
+
+    # Report every HR row with a candidate once, with its best candidate.
+    best = candidates[~candidates.duplicated("hr")]
+    best_linked = linked.loc[best.index]
+    descriptions = describe_researchers(
+        unused_researchers_df.iloc[best["researchers"].to_numpy()]
+    )
+    reasons = [
+        (f"Linked on a similar name to {description}" if is_linked else f"Not linked, similar to {description}")
+        + f" (score {score:.2f})"
+        for description, is_linked, score in zip(descriptions, best_linked, best["score"])
+    ]
+    report = (
+        unmatched_hr_df[report_columns]
+        .iloc[best["hr"].to_numpy()]
+        .assign(Reason=reasons)
+        .sort_index(kind="stable")
+    )
+    return linked_df.sort_index(kind="stable"), report
@@ -0,0 +1,72 @@
+"""Functions to keep the date columns typed from ingest until the export to Excel."""
+
+import numpy as np
+import pandas as pd
+
+# Seconds resolution instead of pandas' default nanoseconds, so the dates after 2262 fit.
+DATE_DTYPE = "datetime64[s]"
+
+# The HR system marks open-ended contracts with this termination date.
+OPEN_ENDED_DATE = np.datetime64("9999-12-31", "s")
+
+DATE_COLUMNS = [
+    "Birth Date",
+    "PhD Defense Date",
+    "Employment Start Date",
+    "Employment Termination Date",
+    "Children corrected PhD date",
+]
+
+EXPORT_DATE_FORMAT = "%Y-%m-%d"
+
+
+def to_date_column(values: pd.Series) -> pd.Series:
+    """Converts a column with dates, datetime objects or date strings to a typed date column.
+
+    Args:
+        values (pd.Series): The column to convert.
+
+    Returns:
+        A datetime64[s] column, with NaT for missing or unparseable dates. Open-ended dates keep the OPEN_ENDED_DATE.
+    """
+    try:
+        return values.astype(DATE_DTYPE)
+    except (ValueError, TypeError):
+        # Fall back to a tolerant parse. This only works in nanoseconds, so the open-ended dates are set afterwards.
+        open_ended = values.astype(str).str.startswith("9999-12-31")
+        dates = pd.to_datetime(
+            values.where(~open_ended), format="ISO8601", errors="coerce"
+        ).astype(DATE_DTYPE)
+        dates[open_ended] = OPEN_ENDED_DATE
+        return dates
+
+
+def parse_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts all known date columns of the dataframe to typed date columns.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers dataframe with English column names.
+
+    Returns:
+        The dataframe with typed date columns.
+    """
+    df = df.copy()
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = to_date_column(df[column])
+    return df
+
+
+def format_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Formats all typed date columns as "%Y-%m-%d" strings, only meant for the export to Excel.
+
+    Args:
+        df (pd.DataFrame): The dataframe to export.
+
+    Returns:
+        A copy of the dataframe with the date columns as strings.
+    """
+    df = df.copy()
+    for column in df.select_dtypes(include="datetime").columns:
+        df[column] = df[column].dt.strftime(EXPORT_DATE_FORMAT)
+    return df
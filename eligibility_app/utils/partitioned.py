@@ -0,0 +1,143 @@
+"""Runs the stages of the pipelines on partitions of a large list in parallel worker processes.
+
+The rows of a list are split in partitions, either by the values of a column (e.g. the faculty) or in chunks of about
+equal size. Every partition is processed by a worker process and the results are put back in the order of the list,
+so the output is the same as processing the whole list at once.
+
+Where the platform can fork, the workers inherit the lists from the parent process and only receive the positions of
+their rows, so the lists are not copied to the workers. Elsewhere every partition is sent to its worker.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# How the rows of a list can be partitioned, by faculty or in chunks of about equal size.
+PARTITION_MODES = ["chunks", "faculty"]
+
+# The faculty column of the HR list and of the researchers list.
+FACULTY_COLUMNS = ["Faculteit/Dienst", "Faculty"]
+
+# The lists of a running partitioned stage, inherited by the forked workers.
+_shared_frames = ()
+
+
+def partition_positions(
+    df: pd.DataFrame, partitions: int, mode: str = "chunks"
+) -> list[np.ndarray]:
+    """Splits the rows of the dataframe in partitions.
+
+    Args:
+        df (pd.DataFrame): The list to partition.
+        partitions (int): The number of partitions in chunks mode.
+        mode (str): chunks or faculty, see PARTITION_MODES. In faculty mode every faculty is a partition, the rows
+            without a faculty are one partition together.
+
+    Returns:
+        The positions of the rows of every partition, in the order of the dataframe. Empty partitions are left out.
+    """
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode {mode}, choose from {PARTITION_MODES}")
+    if mode == "faculty":
+        column = next((column for column in FACULTY_COLUMNS if column in df.columns), None)
+        if column is None:
+            raise ValueError(f"The list has none of the faculty columns {FACULTY_COLUMNS}")
+        codes = pd.factorize(df[column], use_na_sentinel=False)[0]
+        faculties = codes.max() + 1 if len(codes) else 0
+        return [positions[0] for positions in key_partitions((codes,), faculties)]
+    return [
+        positions
+        for positions in np.array_split(np.arange(len(df)), max(partitions, 1))
+        if len(positions)
+    ]
+
+
+def key_partitions(keys: tuple, partitions: int) -> list[tuple]:
+    """Splits the rows of several lists in partitions on a key, the rows of all lists with the same key are in the
+    same partition.
+
+    Args:
+        keys (tuple): For every list the non-negative integer key of every row, e.g. the join keys of
+            utils.match_researchers.build_join_keys.
+        partitions (int): The number of partitions.
+
+    Returns:
+        For every partition a tuple with the positions of its rows in every list. Partitions without rows in the first
+        list are left out.
+    """
+    partition_of_rows = [np.asarray(list_keys) % max(partitions, 1) for list_keys in keys]
+    partitioned_positions = [
+        tuple(np.flatnonzero(partition_of_row == number) for partition_of_row in partition_of_rows)
+        for number in range(partitions)
+    ]
+    return [positions for positions in partitioned_positions if len(positions[0])]
+
+
+def partition_frames(frames: tuple, positions: tuple) -> tuple:
+    """Returns the rows of every frame at the positions of the partition."""
+    return tuple(frame.iloc[frame_positions] for frame, frame_positions in zip(frames, positions))
+
+
+def _run_forked_partition(function: Callable, positions: tuple, kwargs: dict):
+    return function(*partition_frames(_shared_frames, positions), **kwargs)
+
+
+def run_partitioned(
+    function: Callable,
+    frames: tuple,
+    partitions: list,
+    workers: int,
+    **kwargs,
+) -> list:
+    """Calls the function on every partition of the frames in a pool of worker processes.
+
+    Args:
+        function (Callable): A module-level function that takes the partitions of the frames as its first arguments.
+        frames (tuple): The dataframes to partition.
+        partitions (list): For every partition a tuple with the positions of its rows in every frame.
+        workers (int): The number of worker processes, with 1 the partitions are processed in this process.
+        **kwargs: The other arguments of the function.
+
+    Returns:
+        The output of the function for every partition, in the order of the partitions.
+    """
+    global _shared_frames
+    if workers <= 1 or len(partitions) <= 1:
+        return [function(*partition_frames(frames, positions), **kwargs) for positions in partitions]
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    if fork:
+        # The workers are forked after this, so they see the frames without copying them.
+        _shared_frames = frames
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(partitions)),
+            mp_context=multiprocessing.get_context("fork" if fork else "spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(_run_forked_partition, function, positions, kwargs)
+                if fork
+                else executor.submit(function, *partition_frames(frames, positions), **kwargs)
+                for positions in partitions
+            ]
+            return [future.result() for future in futures]
+    finally:
+        _shared_frames = ()
+
+
+def concat_in_order(results: list, index: pd.Index) -> pd.DataFrame:
+    """Concatenates the outputs of the partitions and puts their rows in the order of the list they come from.
+
+    Args:
+        results (list): The dataframes with the rows of every partition, with the index labels of the list.
+        index (pd.Index): The unique index of the list.
+
+    Returns:
+        The rows of all partitions in the order of the index.
+    """
+    combined = pd.concat(results)
+    order = np.argsort(index.get_indexer(combined.index), kind="stable")
+    return combined.iloc[order]
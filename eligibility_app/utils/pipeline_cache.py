@@ -0,0 +1,119 @@
+"""Cache of the pipeline stage outputs, keyed on the content of the uploaded files."""
+
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+# The eligibility_app directory and the directories in it with the code of the pipeline stages and the grant rules.
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIRECTORIES = [".", "utils", "seeds"]
+
+
+def code_version(app_directory: str = APP_DIRECTORY) -> str:
+    """Returns an identifier of the source code of the app, which changes whenever a module or a seed changes.
+
+    Args:
+        app_directory (str): The eligibility_app directory.
+    """
+    digest = hashlib.sha256()
+    for directory in CODE_DIRECTORIES:
+        for path in sorted(glob.glob(os.path.join(app_directory, directory, "*.py"))):
+            digest.update(os.path.relpath(path, app_directory).encode())
+            with open(path, "rb") as source_file:
+                digest.update(source_file.read())
+    return digest.hexdigest()[:16]
+
+
+# Part of every cache key, so the results of a stage are not used anymore after its code or the grant rules change.
+# The persistent utils.result_cache keeps results of the same code across restarts.
+PIPELINE_VERSION = code_version()
+
+# The maximum memory of the cache in megabytes, can be configured on the server with an environment variable.
+DEFAULT_MAX_MEGABYTES = int(os.environ.get("ELIGIBILITY_CACHE_MAX_MB", "512"))
+
+
+def content_hash(uploaded_file) -> str:
+    """Calculates the hash of the content of an uploaded file.
+
+    Args:
+        uploaded_file: The file uploaded through streamlit (or any other BytesIO), a path or the content as bytes.
+
+    Returns:
+        The sha256 hex digest of the file content.
+    """
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return hashlib.sha256(uploaded_file).hexdigest()
+    if isinstance(uploaded_file, (str, os.PathLike)):
+        with open(uploaded_file, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    """Estimates the memory used by a cached value in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    return 0
+
+
+class PipelineCache:
+    """A least recently used cache of pipeline stage outputs, bounded by the memory it uses.
+
+    Cached values are shared between sessions, so callers should never modify a value they got from the cache.
+    """
+
+    def __init__(self, max_megabytes: int = DEFAULT_MAX_MEGABYTES):
+        self.max_bytes = max_megabytes * 1024 * 1024
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for the key or computes and caches it.
+
+        Args:
+            key (Hashable): The stage name and the hashes of its inputs.
+            compute (Callable): Computes the value when it is not cached.
+
+        Returns:
+            The (cached) output of the stage.
+        """
+        key = (PIPELINE_VERSION, key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        value = compute()
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.current_bytes += size
+            # Evict the least recently used entries until the cache fits again.
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return value
+
+    def clear(self) -> None:
+        """Removes all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+# Modules are imported once per server process, so this cache is shared between all sessions.
+pipeline_cache = PipelineCache()
@@ -0,0 +1,145 @@
+"""A preview of a dataframe that only sends one page of rows to the browser.
+
+Filtering, sorting and the summary are calculated on the server, so the size of what the browser receives does not
+depend on the number of rows of the dataframe.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [25, 100, 500]
+DEFAULT_PAGE_SIZE = 100
+
+NO_COLUMN = "(none)"
+
+
+def filter_positions(values: pd.Series, text: str) -> np.ndarray:
+    """Finds the rows whose value contains the text, ignoring case. Every distinct value is only checked once.
+
+    Args:
+        values (pd.Series): The column to filter on.
+        text (str): The text to look for.
+
+    Returns:
+        The positions of the matching rows.
+    """
+    codes, uniques = pd.factorize(values)
+    text = text.casefold()
+    matches = np.array([text in str(value).casefold() for value in uniques], dtype=bool)
+    # Missing values get code -1, which picks the appended False.
+    return np.flatnonzero(np.append(matches, False)[codes])
+
+
+def select_positions(
+    df: pd.DataFrame,
+    sort_column: str | None = None,
+    descending: bool = False,
+    filter_column: str | None = None,
+    filter_text: str = "",
+) -> np.ndarray:
+    """Determines which rows of the dataframe are shown and in what order.
+
+    Args:
+        df (pd.DataFrame): The dataframe to preview.
+        sort_column (str | None): The column to sort on, None keeps the order of the dataframe.
+        descending (bool): Whether to sort from high to low, missing values are always last.
+        filter_column (str | None): The column to filter on, None shows all rows.
+        filter_text (str): The text the filter column has to contain.
+
+    Returns:
+        The positions of the shown rows, in the order they are shown.
+    """
+    positions = np.arange(len(df))
+    if filter_column is not None and filter_text:
+        positions = filter_positions(df[filter_column], filter_text)
+    if sort_column is not None:
+        order = (
+            df[sort_column]
+            .iloc[positions]
+            .reset_index(drop=True)
+            .sort_values(ascending=not descending, kind="stable", na_position="last")
+            .index.to_numpy()
+        )
+        positions = positions[order]
+    return positions
+
+
+def summarize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Describes every column of the dataframe with its type, number of filled and distinct values and range.
+
+    Args:
+        df (pd.DataFrame): The dataframe to summarize.
+
+    Returns:
+        One row per column of the dataframe.
+    """
+    summary = pd.DataFrame(
+        {
+            "Column": df.columns,
+            "Type": df.dtypes.astype(str).to_numpy(),
+            "Filled": df.notna().sum().to_numpy(),
+            "Distinct": df.nunique().to_numpy(),
+            "Minimum": None,
+            "Maximum": None,
+        }
+    )
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            summary.loc[position, ["Minimum", "Maximum"]] = [str(values.min()), str(values.max())]
+    return summary
+
+
+def show_preview(df: pd.DataFrame, key: str) -> None:
+    """Shows one page of the dataframe with controls to page, sort and filter, and a summary of all rows.
+
+    Args:
+        df (pd.DataFrame): The dataframe to preview.
+        key (str): Identifies the widgets of this preview, every preview on a page needs its own key.
+    """
+    columns = [NO_COLUMN] + list(df.columns)
+    filter_control, text_control, sort_control, order_control = st.columns([3, 3, 3, 2])
+    filter_column = filter_control.selectbox("Filter on", columns, key=f"{key}_filter_column")
+    filter_text = text_control.text_input(
+        "Containing", key=f"{key}_filter_text", disabled=filter_column == NO_COLUMN
+    )
+    sort_column = sort_control.selectbox("Sort on", columns, key=f"{key}_sort_column")
+    descending = order_control.checkbox(
+        "Descending", key=f"{key}_descending", disabled=sort_column == NO_COLUMN
+    )
+
+    positions = select_positions(
+        df,
+        sort_column=None if sort_column == NO_COLUMN else sort_column,
+        descending=descending,
+        filter_column=None if filter_column == NO_COLUMN else filter_column,
+        filter_text=filter_text,
+    )
+
+    page_size_control, page_control = st.columns([1, 1])
+    page_size = page_size_control.selectbox(
+        "Rows per page",
+        PAGE_SIZES,
+        index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+        key=f"{key}_page_size",
+    )
+    number_of_pages = max(1, -(-len(positions) // page_size))
+    page = page_control.number_input(
+        f"Page (of {number_of_pages})",
+        min_value=1,
+        max_value=number_of_pages,
+        key=f"{key}_page",
+    )
+
+    # Only the rows of the page are sent to the browser.
+    start = (min(page, number_of_pages) - 1) * page_size
+    page_rows = positions[start : start + page_size]
+    st.dataframe(df.iloc[page_rows])
+    st.caption(
+        f"Rows {start + 1 if len(page_rows) else 0}-{start + len(page_rows)} of {len(positions)}"
+        + (f" (filtered from {len(df)})" if len(positions) != len(df) else "")
+    )
+
+    if st.checkbox("Show a summary of all rows", key=f"{key}_summary"):
+        st.dataframe(summarize_frame(df), hide_index=True)
@@ -0,0 +1,326 @@
+"""Functions to read the HR list and researchers list Excel files.
+
+The fastest installed reader engine is used. python-calamine (pip install python-calamine) reads both .xls and .xlsx
+files many times faster than the default readers; without it pandas falls back to xlrd (.xls) and openpyxl (.xlsx).
+
+The HR list can also be streamed with read_hr_researchers, which filters the rows on function name while reading, so
+only the researchers are ever built into a dataframe. It reads the rows with the same engine.
+"""
+
+import io
+import math
+from datetime import date, time, timedelta
+from importlib.util import find_spec
+from itertools import chain, islice, repeat
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from seeds.translation_dutch_english import translation_dict
+from utils.dtype_schema import FTE_DTYPE, compact_dtypes
+from utils.filter_hr_list import match_function_names
+from utils.parse_dates import parse_date_columns
+
+# Reader engines from fastest to slowest with the module they need. The default engine lets pandas choose xlrd or
+# openpyxl based on the file type.
+ENGINES = {
+    "calamine": "python_calamine",
+    "default": None,
+}
+
+# The columns of the HR list that are used, all other columns are never read.
+HR_COLUMNS = list(translation_dict) + ["Medewerkersgroep"]
+
+# The row of the column names in the Excel files (0-based), the rows above it are titles.
+HR_HEADER_ROW = 2
+RESEARCHERS_HEADER_ROW = 1
+
+# The number of rows of the HR list that are filtered at once by read_hr_researchers.
+STREAM_CHUNK_ROWS = 10_000
+
+# Dtypes that cannot be inferred reliably, e.g. FTE becomes an object column when a single cell is text. The other
+# dtypes are the compact dtypes of utils.dtype_schema, so the HR list is compact from the start.
+HR_COLUMN_DTYPES = {
+    "FTE": FTE_DTYPE,
+    "Faculteit/Dienst": "category",
+    "Departement/afdeling": "category",
+    "Functienaam": "category",
+    "Medewerkersgroep": "category",
+}
+
+
+def available_engines() -> list:
+    """Returns the reader engines that are installed, from fastest to slowest."""
+    return [
+        engine
+        for engine, module in ENGINES.items()
+        if module is None or find_spec(module) is not None
+    ]
+
+
+def pandas_engine(engine: str | None) -> str | None:
+    """Translates the name of a reader engine to the engine argument of pd.read_excel.
+
+    Args:
+        engine (str | None): The reader engine, None selects the fastest installed engine.
+    """
+    engine = engine or available_engines()[0]
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown Excel reader engine {engine}, choose from {list(ENGINES)}")
+    return None if engine == "default" else engine
+
+
+def read_hr_excel(hr_file, engine: str | None = None) -> pd.DataFrame:
+    """Reads the HR list, only the used columns are read and the dtypes are set up front.
+
+    Args:
+        hr_file: The HR list Excel file, a path or a file-like object.
+        engine (str | None): The reader engine to use, defaults to the fastest installed engine.
+
+    Returns:
+        The HR list as a dataframe with the original Dutch column names.
+    """
+    return pd.read_excel(
+        io=hr_file,
+        header=HR_HEADER_ROW,
+        usecols=HR_COLUMNS,
+        dtype=HR_COLUMN_DTYPES,
+        engine=pandas_engine(engine),
+    )
+
+
+def read_file_content(excel_file) -> bytes:
+    """Returns the content of an Excel file given as a path or a file-like object."""
+    if isinstance(excel_file, (bytes, bytearray)):
+        return bytes(excel_file)
+    if hasattr(excel_file, "read"):
+        excel_file.seek(0)
+        return excel_file.read()
+    with open(excel_file, "rb") as file:
+        return file.read()
+
+
+def convert_openpyxl_cell(cell):
+    """Converts a cell like pandas does: empty cells become "", errors NaN and whole numbers int."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        whole_number = int(cell.value)
+        return whole_number if whole_number == cell.value else float(cell.value)
+    return cell.value
+
+
+def iter_xlsx_rows(content: bytes, columns: list | None = None) -> Iterator[list]:
+    """Yields the values of every row of the first sheet of an .xlsx file, in read-only mode.
+
+    Args:
+        content (bytes): The content of the file.
+        columns (list | None): Set to the positions of the columns to convert only those, in every row after the
+            first (e.g. the header row) that is yielded. All columns are converted while it is None.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(
+        io.BytesIO(content), read_only=True, data_only=True, keep_links=False
+    )
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        for row in sheet.rows:
+            if columns is None:
+                columns = yield [convert_openpyxl_cell(cell) for cell in row]
+            else:
+                yield [
+                    convert_openpyxl_cell(row[position]) if position < len(row) else ""
+                    for position in columns
+                ]
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(content: bytes, columns: list | None = None) -> Iterator[list]:
+    """Like iter_xlsx_rows for an .xls file, the cells are converted like pandas converts them.
+
+    xlrd cannot stream the rows of a sheet, on_demand only skips loading the other sheets. The whole first sheet is
+    loaded, only the dataframe is limited to the rows that are kept.
+    """
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_contents=content, on_demand=True)
+    epoch1904 = workbook.datemode
+
+    def convert(value, cell_type):
+        if cell_type == xlrd.XL_CELL_DATE:
+            try:
+                value = xlrd.xldate.xldate_as_datetime(value, epoch1904)
+            except OverflowError:
+                return value
+            # A date on the epoch is a time only.
+            if value.timetuple()[0:3] == ((1904, 1, 1) if epoch1904 else (1899, 12, 31)):
+                value = time(value.hour, value.minute, value.second, value.microsecond)
+        elif cell_type == xlrd.XL_CELL_ERROR:
+            value = np.nan
+        elif cell_type == xlrd.XL_CELL_BOOLEAN:
+            value = bool(value)
+        elif cell_type == xlrd.XL_CELL_NUMBER and math.isfinite(value):
+            whole_number = int(value)
+            if whole_number == value:
+                value = whole_number
+        return value
+
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for row_number in range(sheet.nrows):
+            values = sheet.row_values(row_number)
+            types = sheet.row_types(row_number)
+            if columns is None:
+                columns = yield [
+                    convert(value, cell_type) for value, cell_type in zip(values, types)
+                ]
+            else:
+                yield [
+                    convert(values[position], types[position])
+                    if position < len(values)
+                    else ""
+                    for position in columns
+                ]
+    finally:
+        workbook.release_resources()
+
+
+def convert_calamine_cell(value):
+    """Converts a cell like pandas does: dates become Timestamps, durations Timedeltas and whole numbers int."""
+    if isinstance(value, float):
+        whole_number = int(value) if math.isfinite(value) else None
+        return whole_number if whole_number == value else value
+    if isinstance(value, date):
+        return pd.Timestamp(value)
+    if isinstance(value, timedelta):
+        return pd.Timedelta(value)
+    return value
+
+
+def iter_calamine_rows(content: bytes, columns: list | None = None) -> Iterator[list]:
+    """Like iter_xlsx_rows for .xlsx and .xls files, read with python-calamine.
+
+    calamine loads the cells of the sheet in its own compact form, only the rows that are iterated are converted to
+    Python values.
+    """
+    from python_calamine import load_workbook
+
+    workbook = load_workbook(io.BytesIO(content))
+    try:
+        sheet = workbook.get_sheet_by_index(0)
+        # The cells start at the first used cell, the empty rows and columns before it are added like pandas does.
+        first_row, first_column = sheet.start or (0, 0)
+        padding = [""] * first_column
+        for row in chain(repeat([], first_row), sheet.iter_rows()):
+            row = padding + row
+            if columns is None:
+                columns = yield [convert_calamine_cell(value) for value in row]
+            else:
+                yield [
+                    convert_calamine_cell(row[position]) if position < len(row) else ""
+                    for position in columns
+                ]
+    finally:
+        workbook.close()
+
+
+def iter_rows(content: bytes, engine: str | None = None) -> Iterator[list]:
+    """Yields the rows of the first sheet of an Excel file with the reader engine, see iter_xlsx_rows.
+
+    Args:
+        content (bytes): The content of the file.
+        engine (str | None): The reader engine to use, defaults to the fastest installed engine.
+    """
+    if pandas_engine(engine) == "calamine":
+        return iter_calamine_rows(content)
+    # .xlsx files are zip archives, .xls files OLE2 compound documents.
+    return iter_xlsx_rows(content) if content.startswith(b"PK") else iter_xls_rows(content)
+
+
+def read_hr_researchers(
+    hr_file,
+    function_name_parts: List,
+    excluded_function_name_parts: List = (),
+    engine: str | None = None,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> pd.DataFrame:
+    """Reads only the rows of the HR list with a researcher function, without building the other rows.
+
+    The rows are streamed from the file and filtered on function name per chunk of rows, only the used columns of the
+    rows that are kept are collected and typed with the dtypes of read_hr_excel. The result has the same values as
+    filtering the output of read_hr_excel with utils.filter_hr_list.filter_out_function_names with the same engine,
+    including the index of the rows, but its categoricals only have the categories of the kept rows. An .xls file
+    read without calamine is loaded whole by xlrd, see iter_xls_rows.
+
+    Args:
+        hr_file: The HR list Excel file, a path or a file-like object.
+        function_name_parts (List): The function names to keep.
+        excluded_function_name_parts (List): The function names to leave out.
+        engine (str | None): The reader engine to use, defaults to the fastest installed engine.
+        chunk_rows (int): The number of rows that are filtered at once.
+
+    Returns:
+        The researchers of the HR list as a dataframe with the original Dutch column names.
+    """
+    rows = iter_rows(read_file_content(hr_file), engine)
+    try:
+        # Skip the title rows above the column names.
+        header = next(islice(rows, HR_HEADER_ROW, None), [])
+        missing_columns = [column for column in HR_COLUMNS if column not in header]
+        if missing_columns:
+            raise ValueError(f"The HR list misses the columns {missing_columns}")
+        # From here on only the used columns are converted, in the order of the file like pd.read_excel.
+        positions = sorted(header.index(column) for column in HR_COLUMNS)
+        columns = [header[position] for position in positions]
+        function_position = columns.index("Functienaam")
+
+        kept_rows, kept_index = [], []
+        chunk_start = 0
+        first_row = rows.send(positions)
+        chunk = [first_row] + list(islice(rows, chunk_rows - 1))
+        while chunk:
+            functions = pd.Series([row[function_position] for row in chunk], dtype=object)
+            keep = match_function_names(
+                functions.replace("", None), function_name_parts, excluded_function_name_parts
+            )
+            kept_rows.extend(row for row, kept in zip(chunk, keep) if kept)
+            kept_index.extend(chunk_start + np.flatnonzero(keep))
+            chunk_start += len(chunk)
+            chunk = list(islice(rows, chunk_rows))
+    except StopIteration:
+        # The HR list has no rows below the column names.
+        kept_rows, kept_index = [], []
+    finally:
+        rows.close()
+
+    # The parser of pd.read_excel infers and sets the dtypes like for the whole list.
+    hr_df = TextParser([columns] + kept_rows, header=0, dtype=HR_COLUMN_DTYPES).read()
+    return hr_df.set_axis(pd.Index(kept_index, dtype=np.int64))
+
+
+def read_researchers_excel(
+    researchers_file, engine: str | None = None, parse_dates: bool = True
+) -> pd.DataFrame:
+    """Reads a researchers list (or eligibility list) as created by this app.
+
+    Args:
+        researchers_file: The researchers list Excel file, a path or a file-like object.
+        engine (str | None): The reader engine to use, defaults to the fastest installed engine.
+        parse_dates (bool): Whether to type the date columns and apply the compact dtypes, turn this off to check
+            the values with utils.validate_input first.
+
+    Returns:
+        The researchers list as a dataframe with typed date columns and compact dtypes.
+    """
+    researchers_df = pd.read_excel(
+        io=researchers_file, header=RESEARCHERS_HEADER_ROW, engine=pandas_engine(engine)
+    )
+    if not parse_dates:
+        return researchers_df
+    return compact_dtypes(parse_date_columns(researchers_df))
@@ -0,0 +1,189 @@
+"""A persistent cache of pipeline stage outputs on disk, shared by all sessions and kept across restarts.
+
+The in-memory pipeline cache (utils.pipeline_cache) only lives as long as the server process. Stages that are
+persisted are also stored in a SQLite database, so a list that was processed before by anyone is not computed again.
+Dataframes are stored in the Arrow IPC format, so their dtypes are kept.
+
+The database is the file set with the ELIGIBILITY_RESULT_CACHE environment variable, by default in the temporary
+directory. Setting it to an empty string turns the cache off. The least recently used results are removed when the
+stored results exceed ELIGIBILITY_RESULT_CACHE_MAX_MB.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator
+
+import pandas as pd
+import pyarrow as pa
+from utils.pipeline_cache import PIPELINE_VERSION
+
+RESULT_CACHE_PATH = os.environ.get(
+    "ELIGIBILITY_RESULT_CACHE", os.path.join(tempfile.gettempdir(), "eligibility_results.sqlite")
+)
+DEFAULT_MAX_MEGABYTES = int(os.environ.get("ELIGIBILITY_RESULT_CACHE_MAX_MB", "1024"))
+
+logger = logging.getLogger("eligibility_app.result_cache")
+
+# A value that is not a tuple is stored as a single part with this number.
+SINGLE_PART = -1
+
+
+def encode_part(value: Any) -> tuple[str, bytes]:
+    """Encodes a dataframe or bytes for the database.
+
+    Returns:
+        The kind of value ("frame" or "bytes") and the encoded value.
+    """
+    if isinstance(value, pd.DataFrame):
+        sink = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(value)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return "frame", sink.getvalue().to_pybytes()
+    if isinstance(value, (bytes, bytearray)):
+        return "bytes", bytes(value)
+    raise TypeError(f"Cannot store a {type(value).__name__} in the result cache")
+
+
+def decode_part(kind: str, value: bytes) -> Any:
+    """Decodes a value encoded with encode_part."""
+    if kind == "frame":
+        return pa.ipc.open_stream(value).read_all().to_pandas()
+    return value
+
+
+class ResultCache:
+    """A least recently used cache of stage outputs in a SQLite database, bounded by the size of the outputs.
+
+    Only dataframes, bytes and tuples of those can be stored. Every call opens its own connection, so the cache can
+    be used from all sessions and from several processes at once.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_megabytes: int = DEFAULT_MAX_MEGABYTES):
+        self.path = path
+        self.max_bytes = max_megabytes * 1024 * 1024
+        if path:
+            with self._connect() as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT, part INTEGER, kind TEXT, value BLOB, size INTEGER, last_used REAL, "
+                    "PRIMARY KEY (key, part))"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+                )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def database_key(key: Hashable) -> str:
+        """Turns a stage key (the stage name and the hashes of its inputs) into the key of the database."""
+        return hashlib.sha256(repr((PIPELINE_VERSION, key)).encode()).hexdigest()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Looks up the output of a stage.
+
+        Returns:
+            Whether the output was found, and the output.
+        """
+        database_key = self.database_key(key)
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT part, kind, value FROM results WHERE key = ? ORDER BY part",
+                (database_key,),
+            ).fetchall()
+            if not rows:
+                return False, None
+            connection.execute(
+                "UPDATE results SET last_used = ? WHERE key = ?", (time.time(), database_key)
+            )
+
+        parts = [decode_part(kind, value) for _, kind, value in rows]
+        if rows[0][0] == SINGLE_PART:
+            return True, parts[0]
+        return True, tuple(parts)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Stores the output of a stage and removes the least recently used outputs when the cache is full. An output
+        that cannot be stored (see encode_part) is skipped, it is computed again next time."""
+        parts = list(value) if isinstance(value, tuple) else [value]
+        numbers = range(len(parts)) if isinstance(value, tuple) else [SINGLE_PART]
+        try:
+            encoded = [encode_part(part) for part in parts]
+        except (pa.ArrowException, TypeError) as error:
+            # E.g. a column Arrow cannot type (numbers and text mixed) or None in a tuple of outputs.
+            logger.warning("Not storing the output of %r in the result cache: %s", key, error)
+            return
+        size = sum(len(encoded_value) for _, encoded_value in encoded)
+        if size > self.max_bytes:
+            return
+
+        database_key = self.database_key(key)
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (database_key, number, kind, encoded_value, len(encoded_value), now)
+                    for number, (kind, encoded_value) in zip(numbers, encoded)
+                ],
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        # Remove whole results, the least recently used first, until the cache fits again.
+        entries = connection.execute(
+            "SELECT key, SUM(size) FROM results GROUP BY key ORDER BY MAX(last_used)"
+        ).fetchall()
+        evicted = []
+        for evicted_key, evicted_size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            evicted.append((evicted_key,))
+            total_bytes -= evicted_size
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns the stored output of a stage or computes and stores it.
+
+        Args:
+            key (Hashable): The stage name and the hashes of its inputs, its repr has to be the same in every process.
+            compute (Callable): Computes the output when it is not stored.
+
+        Returns:
+            The (stored) output of the stage.
+        """
+        if not self.path:
+            return compute()
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Removes all results from the cache."""
+        if self.path:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM results")
+
+
+# Shared by all sessions of the server process, other processes use the same database.
+result_cache = ResultCache()
@@ -3,68 +3,120 @@
 from io import BytesIO
 
 import pandas as pd
+from utils.dtype_schema import widen_float32
+from utils.parse_dates import format_date_columns
 
+# From this number of rows the rows are streamed to temporary files instead of kept in memory.
+CONSTANT_MEMORY_ROWS = 50_000
 
-def save_and_format_df_as_excel(updated_researchers_dataframe: pd.DataFrame) -> bytes:
+# The number of rows the column widths are estimated from.
+WIDTH_SAMPLE_ROWS = 1_000
+
+# The number of rows that are converted to cell values and written at once, so the cell values of only one block are
+# in memory next to the dataframe.
+WRITE_BLOCK_ROWS = 10_000
+
+
+def format_for_export(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns a copy of (a part of) the dataframe with the values as they are written: dates as text and float32
+    numbers as they are shown."""
+    df = format_date_columns(df)
+    for column in df.select_dtypes(include="float32").columns:
+        df[column] = widen_float32(df[column])
+    return df
+
+
+def estimate_column_widths(df: pd.DataFrame) -> list:
+    """Estimates the width of every column from the length of the header and the text of a sample of the rows.
+
+    Args:
+        df (pd.DataFrame): The dataframe to export.
+
+    Returns:
+        The width of every column.
+    """
+    sample = format_for_export(df.iloc[:: max(len(df) // WIDTH_SAMPLE_ROWS, 1)])
+    return [
+        max(sample[column].astype(str).str.len().max(), len(column))
+        if len(sample)
+        else len(column)
+        for column in df.columns
+    ]
+
+
+def save_and_format_df_as_excel(
+    updated_researchers_dataframe: pd.DataFrame, constant_memory: bool | None = None
+) -> bytes:
     """Function to save the updated hr dataframe as an Excel file with the correct formatting.
 
     Args:
         updated_researchers_dataframe (pd.DataFrame): The updated researchers dataframe.
+        constant_memory (bool | None): Whether to stream the rows to temporary files to limit the memory use, by
+            default only for dataframes with at least CONSTANT_MEMORY_ROWS rows.
 
     Returns:
-        BytesIO: The Excel file in the requested format.
+        bytes: The Excel file in the requested format.
     """
+    # Only imported when a list is exported, so opening the app does not load it.
+    import xlsxwriter
+
+    if constant_memory is None:
+        constant_memory = len(updated_researchers_dataframe) >= CONSTANT_MEMORY_ROWS
+
+    number_of_rows, number_of_columns = updated_researchers_dataframe.shape
     excel_buffer = BytesIO()
 
-    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-        # Write the DataFrame to Excel starting from the second row.
-        updated_researchers_dataframe.to_excel(
-            writer, startrow=1, index=False, sheet_name="Sheet1"
-        )
+    workbook = xlsxwriter.Workbook(
+        excel_buffer, {"constant_memory": constant_memory, "in_memory": not constant_memory}
+    )
+    worksheet = workbook.add_worksheet("Sheet1")
+
+    # Define cell formats.
+    header_format = workbook.add_format(
+        {
+            "bold": True,
+            "text_wrap": True,
+            "valign": "top",
+            "fg_color": "#D7E4BC",
+            "border": 1,
+        }
+    )
+    alternating_color = workbook.add_format({"bg_color": "#F2F2F2"})
 
-        # Get the xlsxwriter workbook and worksheet objects.
-        workbook = writer.book
-        worksheet = writer.sheets["Sheet1"]
-
-        # Define cell formats.
-        header_format = workbook.add_format(
-            {
-                "bold": True,
-                "text_wrap": True,
-                "valign": "top",
-                "fg_color": "#D7E4BC",
-                "border": 1,
-            }
+    # Adjust column width based on the length of the text.
+    for i, column_width in enumerate(
+        estimate_column_widths(updated_researchers_dataframe)
+    ):
+        worksheet.set_column(i, i, column_width)
+
+    # Write the headers and then the rows in order, starting from the second row. Missing values are left empty.
+    # Dates are kept typed throughout the pipeline and only formatted per block of rows for the export.
+    worksheet.write_row(1, 0, updated_researchers_dataframe.columns, header_format)
+    for block_start in range(0, number_of_rows, WRITE_BLOCK_ROWS):
+        block = format_for_export(
+            updated_researchers_dataframe.iloc[block_start : block_start + WRITE_BLOCK_ROWS]
         )
-        workbook.add_format({"text_wrap": True, "valign": "top", "border": 1})
-        alternating_color = workbook.add_format({"fg_color": "#F2F2F2"})
-
-        # Apply formatting to headers (starting from the second row.)
-        for col_num, value in enumerate(updated_researchers_dataframe.columns.values):
-            worksheet.write(1, col_num, value, header_format)
-
-        # Apply alternating row color.
-        for row_num in range(
-            2, len(updated_researchers_dataframe) + 2
-        ):  # Start from the second row
-            if row_num % 2 == 0:
-                worksheet.set_row(row_num, None, alternating_color)
-
-        # Enable sorting by clicking on column headers.
-        worksheet.autofilter(
-            1,
+        columns = [
+            series.astype(object).where(series.notna(), None).tolist()
+            for _, series in block.items()
+        ]
+        for row_num, row in enumerate(zip(*columns), start=block_start + 2):
+            worksheet.write_row(row_num, 0, row)
+
+    if number_of_rows and number_of_columns:
+        # Apply alternating row color to the rows with an even index (starting from the third row).
+        worksheet.conditional_format(
+            2,
             0,
-            len(updated_researchers_dataframe) + 1,
-            len(updated_researchers_dataframe.columns) - 1,
+            number_of_rows + 1,
+            number_of_columns - 1,
+            {"type": "formula", "criteria": "=MOD(ROW(),2)=1", "format": alternating_color},
         )
 
-        # Adjust column width based on the length of the text.
-        for i, col in enumerate(updated_researchers_dataframe.columns):
-            column_len = max(
-                updated_researchers_dataframe[col].astype(str).map(len).max(), len(col)
-            )
-            worksheet.set_column(i, i, column_len)
+    # Enable sorting by clicking on column headers.
+    worksheet.autofilter(1, 0, number_of_rows + 1, number_of_columns - 1)
 
+    workbook.close()
     excel_data = excel_buffer.getvalue()
 
     return excel_data
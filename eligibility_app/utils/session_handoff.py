@@ -0,0 +1,38 @@
+"""Hands the researchers list of the update menu to the eligibility menu within a session.
+
+The typed researchers list is kept in the session state, so the eligibility list is calculated from it directly
+instead of writing it to Excel, downloading it and uploading and parsing it again.
+"""
+
+from typing import TYPE_CHECKING, Hashable
+
+import streamlit as st
+
+if TYPE_CHECKING:
+    # The entry point imports this module, pandas is only loaded with the menus.
+    import pandas as pd
+
+# The session state of the menu selectbox of streamlit_app.
+MENU_KEY = "menu_selection"
+
+UPDATED_LIST_KEY = "updated_researchers_list"
+
+
+def hand_over_researchers_list(key: Hashable, researchers_df: "pd.DataFrame") -> None:
+    """Keeps the new researchers list in the session for the eligibility menu.
+
+    Args:
+        key (Hashable): The inputs the list was created from, part of the cache keys of the eligibility stages.
+        researchers_df (pd.DataFrame): The validated researchers list with typed date columns.
+    """
+    st.session_state[UPDATED_LIST_KEY] = (key, researchers_df)
+
+
+def updated_researchers_list() -> "tuple[Hashable, pd.DataFrame] | None":
+    """Returns the key and the researchers list handed over in this session, None when there is none."""
+    return st.session_state.get(UPDATED_LIST_KEY)
+
+
+def open_menu(menu: str) -> None:
+    """Selects another menu item, as a callback of a button so it is set before the menu is drawn."""
+    st.session_state[MENU_KEY] = menu
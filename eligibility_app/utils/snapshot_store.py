@@ -0,0 +1,128 @@
+"""A local store of typed columnar snapshots of the lists this app exports to Excel.
+
+Every exported researchers or eligibility list is also written as an uncompressed Arrow IPC file, named after the
+hash of the Excel file. When that Excel file is uploaded again, the snapshot is memory-mapped instead of parsing the
+Excel file, so Excel is only needed to hand the list to people.
+
+The store is in the directory set with the ELIGIBILITY_SNAPSHOT_DIR environment variable, by default in the
+temporary directory. Setting it to an empty string turns the store off. Only the most recently used snapshots are
+kept, see ELIGIBILITY_SNAPSHOT_MAX_FILES.
+"""
+
+import glob
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from utils.pipeline_cache import content_hash
+from utils.read_excel_file import read_researchers_excel
+
+SNAPSHOT_DIR = os.environ.get(
+    "ELIGIBILITY_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "eligibility_snapshots")
+)
+MAX_SNAPSHOT_FILES = int(os.environ.get("ELIGIBILITY_SNAPSHOT_MAX_FILES", "100"))
+
+SNAPSHOT_EXTENSION = ".arrow"
+
+
+def snapshot_path(excel_hash: str, directory: str = SNAPSHOT_DIR) -> str:
+    """Returns the path of the snapshot of the Excel file with the given content hash."""
+    return os.path.join(directory, excel_hash + SNAPSHOT_EXTENSION)
+
+
+def save_snapshot(
+    df: pd.DataFrame, excel_hash: str, directory: str = SNAPSHOT_DIR
+) -> str | None:
+    """Writes the dataframe as the snapshot of the Excel file it was exported to, an existing snapshot is kept.
+
+    Args:
+        df (pd.DataFrame): The exported dataframe, with typed date columns.
+        excel_hash (str): The content hash of the exported Excel file, see utils.pipeline_cache.content_hash.
+        directory (str): The directory of the store.
+
+    Returns:
+        The path of the snapshot, None when the store is turned off or the dataframe cannot be stored.
+    """
+    if not directory:
+        return None
+    path = snapshot_path(excel_hash, directory)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    # The index is reset like when reading the Excel file. Write to a temporary file first, so other sessions never
+    # read a half written snapshot.
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(
+            df.reset_index(drop=True), temporary_path, compression="uncompressed"
+        )
+        os.replace(temporary_path, path)
+    except (pa.ArrowException, OSError):
+        # A column Arrow cannot type (e.g. numbers and text mixed) only means this list is read from Excel again.
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return None
+    prune_snapshots(directory)
+    return path
+
+
+def load_snapshot(excel_hash: str, directory: str = SNAPSHOT_DIR) -> pd.DataFrame | None:
+    """Loads the snapshot of the Excel file with the given content hash with a memory-mapped read.
+
+    Args:
+        excel_hash (str): The content hash of the Excel file, see utils.pipeline_cache.content_hash.
+        directory (str): The directory of the store.
+
+    Returns:
+        The dataframe with the dtypes it was saved with, None when there is no snapshot of the file.
+    """
+    if not directory:
+        return None
+    path = snapshot_path(excel_hash, directory)
+    try:
+        with pa.memory_map(path) as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    # Mark the snapshot as recently used.
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return df
+
+
+def read_researchers_list(
+    researchers_file, excel_hash: str | None = None, parse_dates: bool = True
+) -> pd.DataFrame:
+    """Loads the snapshot of a researchers list (or eligibility list) exported by this app, and reads the Excel file
+    when there is none.
+
+    Args:
+        researchers_file: The researchers list Excel file, a path or a file-like object.
+        excel_hash (str | None): The content hash of the file, calculated when not given.
+        parse_dates (bool): Whether to type the date columns of the Excel file, see read_researchers_excel. The
+            dates of a snapshot are always typed.
+
+    Returns:
+        The researchers list as a dataframe.
+    """
+    snapshot = load_snapshot(excel_hash or content_hash(researchers_file))
+    if snapshot is not None:
+        return snapshot
+    return read_researchers_excel(researchers_file, parse_dates=parse_dates)
+
+
+def prune_snapshots(directory: str = SNAPSHOT_DIR, max_files: int = MAX_SNAPSHOT_FILES) -> None:
+    """Removes the least recently used snapshots until at most max_files are left."""
+    paths = glob.glob(os.path.join(directory, "*" + SNAPSHOT_EXTENSION))
+    if len(paths) <= max_files:
+        return
+    for path in sorted(paths, key=os.path.getmtime)[: len(paths) - max_files]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,210 @@
+"""Measures the wall-clock time, CPU time, memory and row counts of every pipeline stage.
+
+Every measured stage is written as one JSON line to the "eligibility_app.stages" logger, by default on stderr or in
+the file set with the ELIGIBILITY_STAGE_LOG environment variable.
+
+The peak memory of the Python allocations of a stage is only traced when ELIGIBILITY_TRACE_MEMORY=1, because
+tracemalloc makes the stages several times slower. The peak resident memory of the process is always recorded where
+the platform supports it.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+from utils.pipeline_cache import pipeline_cache
+from utils.result_cache import result_cache
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+TRACE_MEMORY = os.environ.get("ELIGIBILITY_TRACE_MEMORY") == "1"
+
+stage_logger = logging.getLogger("eligibility_app.stages")
+if not stage_logger.handlers:
+    stage_log_path = os.environ.get("ELIGIBILITY_STAGE_LOG")
+    stage_logger.addHandler(
+        logging.FileHandler(stage_log_path) if stage_log_path else logging.StreamHandler()
+    )
+    stage_logger.setLevel(logging.INFO)
+    stage_logger.propagate = False
+
+
+def count_rows(value: Any) -> int | None:
+    """Returns the number of rows of a stage output, the first dataframe counts when a stage returns several."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple) and value:
+        return count_rows(value[0])
+    return None
+
+
+def output_frames(value: Any) -> list:
+    """Returns the dataframes in a stage output, a stage may return several."""
+    if isinstance(value, pd.DataFrame):
+        return [value]
+    if isinstance(value, tuple):
+        return [frame for item in value for frame in output_frames(item)]
+    return []
+
+
+def max_rss_megabytes() -> float | None:
+    """Returns the peak resident memory of the process so far in megabytes."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024, 1)
+
+
+class StageTimer:
+    """Measures the stages of one run of a pipeline, e.g. one rerun of a menu with the uploaded files."""
+
+    def __init__(
+        self,
+        pipeline: str,
+        trace_memory: bool = TRACE_MEMORY,
+        on_stage: Callable[[str], None] | None = None,
+        cancelled: threading.Event | None = None,
+    ):
+        self.pipeline = pipeline
+        # Called with the name of every stage before it starts, it may raise to stop the pipeline.
+        self.on_stage = on_stage
+        # Set when the run is cancelled, for stages that wait on other processes (see
+        # utils.background_job.parse_in_worker).
+        self.cancelled = cancelled
+        self.run_id = uuid.uuid4().hex[:12]
+        self.trace_memory = trace_memory
+        self.records = []
+        # The name and dataframe of every stage output, for the memory report of utils.dtype_schema.
+        self.frames = []
+
+    def measure(
+        self, stage: str, compute: Callable[[], Any], rows_in: int | None = None
+    ) -> Any:
+        """Runs a stage, records its measurements and writes them to the log.
+
+        Args:
+            stage (str): The name of the stage.
+            compute (Callable): Runs the stage.
+            rows_in (int | None): The number of rows that go into the stage.
+
+        Returns:
+            The output of the stage. Errors are recorded and raised again.
+        """
+        return self._measure(stage, compute, rows_in, cached=False)
+
+    def cached(
+        self,
+        stage: str,
+        key: Hashable,
+        compute: Callable[[], Any],
+        rows_in: int | None = None,
+        persist: bool = False,
+    ) -> Any:
+        """Like measure, but the output is taken from the pipeline cache when possible. A cache hit is recorded as a
+        cached stage.
+
+        Args:
+            stage (str): The name of the stage.
+            key (Hashable): The key of the output in the pipeline cache.
+            compute (Callable): Runs the stage when the output is not cached.
+            rows_in (int | None): The number of rows that go into the stage.
+            persist (bool): Whether to also keep the output in the persistent result cache on disk, see
+                utils.result_cache. Only for outputs that are dataframes, bytes or tuples of those.
+
+        Returns:
+            The output of the stage.
+        """
+        computed = False
+
+        def compute_and_flag() -> Any:
+            nonlocal computed
+            computed = True
+            return compute()
+
+        def compute_or_load() -> Any:
+            if persist:
+                return result_cache.get_or_compute(key, compute_and_flag)
+            return compute_and_flag()
+
+        return self._measure(
+            stage,
+            lambda: pipeline_cache.get_or_compute(key, compute_or_load),
+            rows_in,
+            cached=lambda: not computed,
+        )
+
+    def _measure(self, stage, compute, rows_in, cached) -> Any:
+        if self.on_stage is not None:
+            self.on_stage(stage)
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+
+        record = {
+            "event": "pipeline_stage",
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "pipeline": self.pipeline,
+            "run_id": self.run_id,
+            "stage": stage,
+            "rows_in": rows_in,
+        }
+        try:
+            output = compute()
+            record.update(status="ok", rows_out=count_rows(output))
+            frames = output_frames(output)
+            self.frames.extend(
+                (stage if len(frames) == 1 else f"{stage} ({number})", frame)
+                for number, frame in enumerate(frames, start=1)
+            )
+            return output
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            record.update(
+                cached=cached() if callable(cached) else cached,
+                wall_seconds=round(time.perf_counter() - start_wall, 4),
+                cpu_seconds=round(time.process_time() - start_cpu, 4),
+                peak_traced_mb=None,
+                max_rss_mb=max_rss_megabytes(),
+            )
+            if tracing:
+                record["peak_traced_mb"] = round(
+                    tracemalloc.get_traced_memory()[1] / 1024**2, 1
+                )
+                tracemalloc.stop()
+            self.records.append(record)
+            stage_logger.info(json.dumps(record))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Returns the measurements of the stages so far as a table for the timing panel."""
+        columns = {
+            "stage": "Stage",
+            "status": "Status",
+            "cached": "Cached",
+            "wall_seconds": "Time (s)",
+            "cpu_seconds": "CPU (s)",
+            "peak_traced_mb": "Peak traced memory (MB)",
+            "max_rss_mb": "Process peak memory (MB)",
+            "rows_in": "Rows in",
+            "rows_out": "Rows out",
+        }
+        return (
+            pd.DataFrame(self.records, columns=list(columns))
+            .astype({"rows_in": "Int64", "rows_out": "Int64"})
+            .rename(columns=columns)
+        )
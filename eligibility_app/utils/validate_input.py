@@ -0,0 +1,202 @@
+"""Checks the values of the uploaded lists on whole columns at once, before anything is calculated with them."""
+
+import numpy as np
+import pandas as pd
+from utils.dtype_schema import compact_dtypes
+from utils.parse_dates import DATE_COLUMNS, to_date_column
+from utils.partitioned import concat_in_order, partition_positions, run_partitioned
+
+GENDER_COLUMN = "Gender"
+CHILDREN_COLUMN = "Count of children applicable"
+
+
+REPORT_COLUMNS = ["Excel row", "Column", "Value", "Problem"]
+
+# The number of invalid values that is described in the error message, the report has all of them.
+MAX_DESCRIBED_VALUES = 3
+
+
+class InvalidInputError(ValueError):
+    """Raised when a list has invalid values. The report has one row per invalid value."""
+
+    def __init__(self, report: pd.DataFrame):
+        self.report = report
+        described = "; ".join(
+            f"row {row} {column} {value!r}: {problem}"
+            for row, column, value, problem in report[REPORT_COLUMNS]
+            .head(MAX_DESCRIBED_VALUES)
+            .itertuples(index=False)
+        )
+        more = " ..." if len(report) > MAX_DESCRIBED_VALUES else ""
+        super().__init__(
+            f"{count_invalid_rows(report)} rows have invalid values ({described}{more})"
+        )
+
+    def __reduce__(self):
+        # Rebuild from the report, so the error can be sent back from a worker process.
+        return self.__class__, (self.report,)
+
+
+def count_invalid_rows(report: pd.DataFrame) -> int:
+    """Counts the distinct rows in a report of invalid values, a report may have extra columns like the list."""
+    row_columns = [column for column in report.columns if column not in REPORT_COLUMNS[1:]]
+    return len(report[row_columns].drop_duplicates())
+
+
+def is_blank(values: pd.Series) -> pd.Series:
+    """Returns True for missing values and for text that only has whitespace."""
+    blank = values.isna()
+    if values.dtype == object:
+        blank |= values.map(lambda value: isinstance(value, str) and not value.strip()).astype(bool)
+    return blank
+
+
+def excel_row_numbers(df: pd.DataFrame, header: int) -> np.ndarray:
+    """Returns the row number in the Excel file of every row of the dataframe, as shown in Excel."""
+    return df.index.to_numpy() + header + 2
+
+
+def check_required_columns(df: pd.DataFrame, required_columns: list) -> None:
+    """Raises a ValueError that lists all required columns that are missing from the dataframe."""
+    missing_columns = [column for column in required_columns if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"The Excel file misses the columns {missing_columns}")
+
+
+def type_checked_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Types the date columns and the children count of the dataframe, invalid values become missing.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers list with English column names and the date columns not parsed yet.
+
+    Returns:
+        A copy of the dataframe with typed date columns and a numeric children count.
+    """
+    typed_df = df.copy()
+    for column in DATE_COLUMNS:
+        if column in typed_df.columns:
+            typed_df[column] = to_date_column(typed_df[column])
+    if CHILDREN_COLUMN in typed_df.columns:
+        typed_df[CHILDREN_COLUMN] = pd.to_numeric(
+            typed_df[CHILDREN_COLUMN].where(~is_blank(typed_df[CHILDREN_COLUMN])),
+            errors="coerce",
+        )
+    return typed_df
+
+
+def find_invalid_values(
+    df: pd.DataFrame, typed_df: pd.DataFrame, header: int
+) -> pd.DataFrame:
+    """Checks the date, gender and children columns of the dataframe, the columns that are not there are skipped.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers list with English column names and the date columns not parsed yet.
+            The index must be the position of the row in the Excel file, as it is after reading.
+        typed_df (pd.DataFrame): The same dataframe as returned by type_checked_columns.
+        header (int): The row of the column names in the Excel file (0-based), see utils.read_excel_file.
+
+    Returns:
+        A report with the Excel row, column, value and problem of every invalid value, ordered by row.
+    """
+    invalid_columns = {}
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            invalid_columns[column] = (
+                typed_df[column].isna() & ~is_blank(df[column]),
+                "Not a date",
+            )
+    if GENDER_COLUMN in df.columns:
+        # Any gender is allowed, only Female and Male change the PhD date correction.
+        invalid_columns[GENDER_COLUMN] = (
+            ~is_blank(df[GENDER_COLUMN])
+            & ~df[GENDER_COLUMN].astype(object).map(lambda value: isinstance(value, str)).astype(bool),
+            "Not a text",
+        )
+    if CHILDREN_COLUMN in df.columns:
+        children_count = typed_df[CHILDREN_COLUMN]
+        invalid_columns[CHILDREN_COLUMN] = (
+            ~is_blank(df[CHILDREN_COLUMN])
+            & ~(children_count.ge(0) & children_count.mod(1).eq(0)),
+            "Not a whole number of 0 or more",
+        )
+
+    excel_rows = excel_row_numbers(df, header)
+    report = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Excel row": excel_rows[invalid.to_numpy()],
+                    "Column": column,
+                    "Value": df.loc[invalid, column].astype(str).to_numpy(),
+                    "Problem": problem,
+                },
+                columns=REPORT_COLUMNS,
+            )
+            for column, (invalid, problem) in invalid_columns.items()
+        ]
+        or [pd.DataFrame(columns=REPORT_COLUMNS)],
+        ignore_index=True,
+    )
+    return report.sort_values("Excel row", kind="stable", ignore_index=True)
+
+
+def check_values(df: pd.DataFrame, header: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Types the checked columns of the dataframe and finds its invalid values.
+
+    Returns:
+        The dataframe as returned by type_checked_columns and the report of find_invalid_values.
+    """
+    typed_df = type_checked_columns(df)
+    return typed_df, find_invalid_values(df, typed_df, header)
+
+
+def check_values_partitioned(
+    df: pd.DataFrame, header: int, workers: int, partition_mode: str = "chunks"
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Like check_values, but checks partitions of the dataframe in parallel worker processes, see
+    utils.partitioned."""
+    results = run_partitioned(
+        check_values,
+        (df,),
+        [(positions,) for positions in partition_positions(df, workers, partition_mode)],
+        workers,
+        header=header,
+    )
+    typed_df = concat_in_order([typed_part for typed_part, _ in results], df.index)
+    report = pd.concat([report_part for _, report_part in results], ignore_index=True)
+    return typed_df, report.sort_values("Excel row", kind="stable", ignore_index=True)
+
+
+def validate_input(
+    df: pd.DataFrame,
+    header: int,
+    required_columns: list = (),
+    skip_invalid_rows: bool = False,
+    workers: int = 1,
+    partition_mode: str = "chunks",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Checks the required columns and all values of the dataframe at once and types the checked columns.
+
+    Args:
+        df (pd.DataFrame): The HR or researchers list with English column names and the date columns not parsed yet.
+        header (int): The row of the column names in the Excel file (0-based), see utils.read_excel_file.
+        required_columns (list): The columns that must be in the dataframe.
+        skip_invalid_rows (bool): Whether to continue with the valid rows only instead of raising an error.
+        workers (int): The number of worker processes that check partitions of the dataframe, see utils.partitioned.
+        partition_mode (str): How the dataframe is partitioned, see utils.partitioned.PARTITION_MODES.
+
+    Returns:
+        The (valid rows of the) dataframe with typed date columns and the compact dtypes of utils.dtype_schema. And
+        the report of the invalid values, see find_invalid_values.
+    """
+    check_required_columns(df, required_columns)
+    if workers > 1 and len(df) > 1:
+        typed_df, report = check_values_partitioned(df, header, workers, partition_mode)
+    else:
+        typed_df, report = check_values(df, header)
+    if len(report) and not skip_invalid_rows:
+        raise InvalidInputError(report)
+
+    if len(report):
+        typed_df = typed_df[~np.isin(excel_row_numbers(df, header), report["Excel row"])]
+    return compact_dtypes(typed_df), report